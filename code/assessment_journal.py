@@ -0,0 +1,167 @@
+"""
+Assessment Journal for Refugee Assessment System
+
+This module provides a crash-safe, append-only JSONL journal. Every finished
+row is written and flushed as soon as it completes, so a long dataset run can
+be interrupted and resumed without losing or repeating work.
+
+The journal holds what resuming needs: keys, scores, reasoning and validator
+verdicts. Prompts and backend call spans stay in the (compressible) trace
+file; each journaled trace refers to its prompt by prompt_ref. Records are
+flushed to the OS on every write, and fsynced at most once per interval.
+"""
+
+import os
+import json
+import time
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import pandas as pd
+
+from trace_writer import prompt_ref
+
+logger = logging.getLogger(__name__)
+
+def row_keys(df: pd.DataFrame, id_columns: Optional[List[str]] = None) -> pd.Series:
+    """
+    Stable identities for every row of a DataFrame
+
+    Uses the given id columns when they are present and non-null, otherwise the
+    row position in the source file.
+
+    Args:
+        df: DataFrame indexed by row position in the source CSV
+        id_columns: Optional columns that uniquely identify a respondent
+
+    Returns:
+        Series of row key strings such as "row:42" or "pid=1234|hhid=77", indexed like df
+    """
+    keys = pd.Series([f"row:{index}" for index in df.index], index=df.index, dtype=object)
+    if not id_columns or not all(col in df.columns for col in id_columns):
+        return keys
+
+    complete = df[id_columns].notna().all(axis=1)
+    id_keys = pd.Series("", index=df.index, dtype=object)
+    for position, col in enumerate(id_columns):
+        id_keys = id_keys + ("|" if position else "") + f"{col}=" + df[col].astype(str)
+    return id_keys.where(complete, keys)
+
+def compact_assessment(assessment: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The journal form of an assessment's asdict shape: each trace keeps its scores and
+    verdicts, while its prompt is replaced by its prompt_ref and its call spans and
+    feature list (the assessment's available_features) are left out
+    """
+    omitted = {"prompt_used", "llm_calls", "profile_features"}
+    traces = []
+    for trace in assessment.get("assessment_traces", []):
+        compact = {key: value for key, value in trace.items() if key not in omitted}
+        if trace.get("prompt_used"):
+            compact["prompt_ref"] = prompt_ref(trace["prompt_used"])
+        traces.append(compact)
+    return {**assessment, "assessment_traces": traces}
+
+class AssessmentJournal:
+    """
+    Append-only JSONL journal of finished rows
+
+    Each line holds the row key, row index, status ("assessed", "duplicate" or
+    "rejected") and, for assessed rows, the assessment in compact form (see
+    compact_assessment). Duplicate rows only carry their own identity and the row
+    key of the assessment they reuse.
+
+    Args:
+        path: Journal file
+        resume: Append to an existing journal instead of starting a new one
+        fsync: Force records to disk, not only to the OS
+        fsync_interval_s: Minimum seconds between fsyncs; records written since the
+            last fsync survive a process crash but not a power loss (0 to fsync every record)
+    """
+
+    def __init__(self, path: str, resume: bool = False, fsync: bool = True, fsync_interval_s: float = 1.0):
+        self.path = Path(path)
+        self.fsync = fsync
+        self.fsync_interval_s = fsync_interval_s
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.path.exists():
+            self._repair_tail()
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+
+    def _repair_tail(self):
+        """Terminate a line torn by a crash so new records start cleanly"""
+        with open(self.path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over journal records, skipping lines torn by a crash"""
+        if not self.path.exists():
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable journal line {line_no} in {self.path}")
+
+    def completed_keys(self) -> Set[str]:
+        """Row keys already recorded in the journal"""
+        return {record["row_key"] for record in self.records()}
+
+    def append(self, key: str, index: Any, status: str, assessment: Optional[Dict[str, Any]] = None):
+        """Write one finished row and flush it (assessments are stored in compact form)"""
+        if status == "assessed" and assessment is not None:
+            assessment = compact_assessment(assessment)
+        record = {
+            "row_key": key,
+            "row_index": index,
+            "status": status,
+            "journaled_at": datetime.now().isoformat(),
+            "assessment": assessment
+        }
+        line = json.dumps(record, default=str) + "\n"
+
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._unsynced = True
+            if self.fsync and time.monotonic() - self._last_fsync >= self.fsync_interval_s:
+                self._sync()
+
+    def _sync(self):
+        """fsync pending records (caller holds the lock)"""
+        os.fsync(self._file.fileno())
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+                if self.fsync and self._unsynced:
+                    self._sync()
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
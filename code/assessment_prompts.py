@@ -8,7 +8,10 @@ This module provides comprehensive prompting system that ensures:
 - Clear perspective-specific guidance
 """
 
-from typing import Dict, List, Optional
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
 
 # Comprehensive assessment prompt
 REFUGEE_ASSESSMENT_PROMPT = """# Refugee Employment Assessment Prompt
@@ -90,48 +93,187 @@ Provide the assessment in a structured Markdown format with clear sections for e
 By following all the above guidelines, produce the comprehensive assessment output as instructed. The final output should be ready to be reviewed by the validator agent and easily understood by humans reviewing the analysis. Remember to stay strictly within the provided data scope and to format your answer as instructed."""
 
 
-def generate_perspective_specific_prompt(perspective: str, profile_string: str, 
-                                       host_country: str, available_features: List[str]) -> str:
-    """
-    Generate perspective-specific prompts using the comprehensive base prompt
-    
-    Args:
-        perspective: One of 'emotional', 'cultural', or 'ethical'
-        profile_string: The formatted profile string with field values
-        host_country: Target host country for employment
-        available_features: List of available feature names in the profile
-    
-    Returns:
-        Complete prompt for the specified perspective
-    """
-    
-    # Add perspective-specific focus
-    perspective_focus = {
-        "emotional": """
+# Prompt styles: "full" asks for a Markdown report as above; "compact" replaces the
+# output formatting rules with a short structured-output instruction, since the
+# response schema (score, reasoning, confidence) is enforced by the backend
+PROMPT_STYLES = ("full", "compact")
+
+COMPACT_OUTPUT_FORMAT = """## Output Format
+
+Your answer is parsed as a structured response with a score (1-10), a reasoning
+text and a confidence. Do not write a report, headings or Markdown. Keep the
+reasoning to a few plain sentences that cite the field codes and values they
+rely on (e.g., "s2q15: 28")."""
+
+_OUTPUT_FORMAT_START = REFUGEE_ASSESSMENT_PROMPT.index("## Output Format")
+_EDGE_CASES_START = REFUGEE_ASSESSMENT_PROMPT.index("### Additional Instructions for Edge Cases:")
+_CLOSING_START = REFUGEE_ASSESSMENT_PROMPT.index("By following all the above guidelines")
+
+# The base prompt with the Markdown formatting rules and closing replaced; the
+# edge-case instructions concern content, so they stay
+COMPACT_ASSESSMENT_PROMPT = (
+    REFUGEE_ASSESSMENT_PROMPT[:_OUTPUT_FORMAT_START]
+    + COMPACT_OUTPUT_FORMAT + "\n\n"
+    + REFUGEE_ASSESSMENT_PROMPT[_EDGE_CASES_START:_CLOSING_START].replace("### Additional", "## Additional")
+    + "Stay strictly within the provided data scope; the validator agent will check every claim."
+)
+
+
+# Perspective-specific focus appended after the base prompt
+PERSPECTIVE_FOCUS: Dict[str, str] = {
+    "emotional": """
 FOCUS: For this assessment, you are specifically the EMOTIONAL perspective agent. 
 Prioritize factors related to psychological readiness, resilience, motivation, and emotional well-being.
 Pay special attention to: age-related adaptability, employment history effects on confidence, 
 cognitive difficulties (s9q7), dependency burden (depend_ratio), and any indicators of stress or support.""",
-        
-        "cultural": """
+    
+    "cultural": """
 FOCUS: For this assessment, you are specifically the CULTURAL perspective agent.
 Prioritize factors related to cultural integration, language abilities, and workplace adaptation.
 Pay special attention to: language literacy (literacy_english, literacy_swahili, literacy_arabic),
 education level (s4q7) as cultural familiarity indicator, documentation for legal integration
 (s9q2_3, s9q2_6), and previous work experience (s5q64) showing workplace culture exposure.""",
-        
-        "ethical": """
+    
+    "ethical": """
 FOCUS: For this assessment, you are specifically the ETHICAL perspective agent.
 Prioritize factors related to fairness, rights, vulnerabilities, and systemic barriers.
 Pay special attention to: disability status and difficulties (disabled, s9q4-s9q11),
 work permit documentation (s9q2_6) for legal employment, gender (s2q14) and potential biases,
 and dependency ratio (depend_ratio) indicating family burden. Focus on what support or
 accommodations would be ethically necessary."""
-    }
+}
+
+
+@dataclass(frozen=True)
+class PromptFragment:
+    """A section of the assessment guidelines, tagged with the fields and perspectives it concerns"""
+    text: str
+    # fnmatch patterns over field codes and feature names; empty if every profile needs the fragment
+    fields: Tuple[str, ...] = ()
+    # Perspectives the fragment guides; empty for all perspectives
+    perspectives: Tuple[str, ...] = ()
+    
+    def applies_to(self, perspective: str, fields: FrozenSet[str]) -> bool:
+        if self.perspectives and perspective not in self.perspectives:
+            return False
+        return not self.fields or any(fnmatchcase(field, pattern) for pattern in self.fields for field in fields)
+
+
+_DIFFICULTY_FIELDS = tuple(f"s9q{n}" for n in range(4, 12))
+_LANGUAGE_FIELDS = ("literacy_*", "language_skill", "s4q11_*", "s4q12_*")
+_BUILTIN_PERSPECTIVES = ("emotional", "cultural", "ethical")
+
+# Where each fragment of the guidelines (everything before the output format) starts,
+# with its tags; the fragments are slices of REFUGEE_ASSESSMENT_PROMPT, so a profile
+# with every field gets the guidelines unchanged apart from other perspectives' advice
+_FRAGMENT_MARKERS: List[Tuple[str, Tuple[str, ...], Tuple[str, ...]]] = [
+    ("# Refugee Employment Assessment Prompt", (), ()),
+    ("* **`s2q14` – Gender:**", ("s2q14",), ()),
+    ("* **`s2q15` – Age:**", ("s2q15",), ()),
+    ("* **`s2q16` – Country of Origin:**", ("s2q16",), ()),
+    ("* **`s4q7` – Education Level:**", ("s4q7",), ()),
+    ("* **`s5q64` – Previous Occupation:**", ("s5q64",), ()),
+    ("* **`work_status` – Current Employment Status:**", ("work_status",), ()),
+    ("* **`empl_active_7d` – Employed in Last 7 Days:**", ("empl_active_7d",), ()),
+    ("* **Language and Literacy:**", _LANGUAGE_FIELDS, ()),
+    ("* **Documentation (`s9q2_*`):**", ("s9q2_*",), ()),
+    ("* **`s9q4`–`s9q11` – Disabilities/Difficulties:**", _DIFFICULTY_FIELDS, ()),
+    ("* **`disabled` – Disability Status:**", ("disabled",), ()),
+    ("* **`depend_ratio` – Dependency Ratio:**", ("depend_ratio",), ()),
+    ("\nAll profile information will be explicitly provided.", (), ()),
+    ("* **Weight Features Realistically:**", (), _BUILTIN_PERSPECTIVES),
+    ("  * *Emotional:*", (), ("emotional",)),
+    ("  * *Cultural:*", (), ("cultural",)),
+    ("**Documentation** is also a cultural", ("s9q2_*",), ("cultural",)),
+    ("Lack of language skills or documentation", (), ("cultural",)),
+    ("  * *Ethical:*", (), ("ethical",)),
+    ("Key factors include any disabilities", ("disabled",) + _DIFFICULTY_FIELDS, ("ethical",)),
+    ("Documentation (especially a work permit", ("s9q2_*",), ("ethical",)),
+    ("Gender (`s2q14`) and family", ("s2q14",), ("ethical",)),
+    ("Ensure to weigh these carefully", (), ("ethical",)),
+    ("* **Realistic Scoring (1–10):**", (), ())
+]
+
+def _split_guidelines(guidelines: str) -> Tuple[PromptFragment, ...]:
+    starts = [guidelines.index(marker) for marker, _, _ in _FRAGMENT_MARKERS] + [len(guidelines)]
+    assert starts[0] == 0 and starts == sorted(starts), "Fragment markers out of order"
+    return tuple(
+        PromptFragment(guidelines[start:end], fields, perspectives)
+        for (_, fields, perspectives), start, end in zip(_FRAGMENT_MARKERS, starts, starts[1:])
+    )
+
+GUIDELINE_FRAGMENTS = _split_guidelines(REFUGEE_ASSESSMENT_PROMPT[:_OUTPUT_FORMAT_START])
+
+# Output format, edge cases and closing of each prompt style, after the guidelines
+_STYLE_TAILS = {
+    "full": REFUGEE_ASSESSMENT_PROMPT[_OUTPUT_FORMAT_START:],
+    "compact": COMPACT_ASSESSMENT_PROMPT[_OUTPUT_FORMAT_START:]
+}
+
+
+def profile_fields(available_features: Iterable[str]) -> FrozenSet[str]:
+    """Feature names of a profile together with the field codes they are shown as"""
+    features = set(available_features)
+    return frozenset(features | {FIELD_CODE_MAPPING.get(feature, feature) for feature in features})
+
+
+@lru_cache(maxsize=None)
+def _assemble_prefix(perspective: str, prompt_style: str, fragments: Tuple[int, ...]) -> str:
+    guidelines = "".join(GUIDELINE_FRAGMENTS[i].text for i in fragments)
+    return f"{guidelines}{_STYLE_TAILS[prompt_style]}\n\n{PERSPECTIVE_FOCUS.get(perspective, '')}"
+
+
+def build_system_prefix(perspective: str, prompt_style: str = "full",
+                        available_features: Optional[Iterable[str]] = None) -> str:
+    """
+    The byte-stable part of every assessment prompt for a perspective
     
+    The base guidelines and perspective focus never depend on the refugee or the
+    host country, so placing them first lets the backend reuse its KV cache for
+    this prefix across calls. Case-specific data always follows it.
+    
+    With available_features, the guidelines are pruned to the fragments for the
+    profile's fields and the perspective (see GUIDELINE_FRAGMENTS). Profiles with
+    the same relevant fields share one prefix, so it still caches well.
+    
+    Args:
+        perspective: A key of PERSPECTIVE_FOCUS ('emotional', 'cultural', 'ethical', ...)
+        prompt_style: "full" (Markdown report instructions) or "compact" (structured output only)
+        available_features: Feature names of the profile (None for the unpruned guidelines)
+    
+    Returns:
+        Prompt prefix shared by every call for the perspective (and field set, if pruned)
+    """
+    if prompt_style not in PROMPT_STYLES:
+        raise ValueError(f"Unknown prompt style: {prompt_style}")
+    if available_features is None:
+        base = COMPACT_ASSESSMENT_PROMPT if prompt_style == "compact" else REFUGEE_ASSESSMENT_PROMPT
+        return f"{base}\n\n{PERSPECTIVE_FOCUS.get(perspective, '')}"
+    
+    fields = profile_fields(available_features)
+    fragments = tuple(i for i, fragment in enumerate(GUIDELINE_FRAGMENTS) if fragment.applies_to(perspective, fields))
+    return _assemble_prefix(perspective, prompt_style, fragments)
+
+
+def generate_perspective_specific_prompt(perspective: str, profile_string: str, 
+                                       host_country: str, available_features: List[str],
+                                       prompt_style: str = "full", prune: bool = False) -> str:
+    """
+    Generate perspective-specific prompts using the comprehensive base prompt
+    
+    Args:
+        perspective: A key of PERSPECTIVE_FOCUS ('emotional', 'cultural', 'ethical', ...)
+        profile_string: The formatted profile string with field values
+        host_country: Target host country for employment
+        available_features: List of available feature names in the profile
+        prompt_style: "full" or "compact" (see PROMPT_STYLES)
+        prune: Keep only the guideline fragments for the available features and the perspective
+    
+    Returns:
+        Complete prompt for the specified perspective
+    """
     # Build the complete prompt
-    full_prompt = f"{REFUGEE_ASSESSMENT_PROMPT}\n\n"
-    full_prompt += f"{perspective_focus.get(perspective, '')}\n\n"
+    full_prompt = f"{build_system_prefix(perspective, prompt_style, available_features if prune else None)}\n\n"
     full_prompt += f"PROFILE DATA:\n{profile_string}\n\n"
     full_prompt += f"HOST COUNTRY: {host_country}\n\n"
     full_prompt += f"AVAILABLE FEATURES IN THIS PROFILE: {', '.join(available_features)}\n\n"
@@ -140,6 +282,64 @@ accommodations would be ethically necessary."""
     return full_prompt
 
 
+def generate_multi_country_prompt(perspective: str, profile_string: str,
+                                  host_countries: List[str], available_features: List[str],
+                                  prompt_style: str = "full", prune: bool = False) -> str:
+    """
+    Generate one perspective prompt that asks for a score for every host country
+    
+    Args:
+        perspective: A key of PERSPECTIVE_FOCUS ('emotional', 'cultural', 'ethical', ...)
+        profile_string: The formatted profile string with field values
+        host_countries: Target host countries, each of which must be assessed
+        available_features: List of available feature names in the profile
+        prompt_style: "full" or "compact" (see PROMPT_STYLES)
+        prune: Keep only the guideline fragments for the available features and the perspective
+    
+    Returns:
+        Complete multi-country prompt for the specified perspective
+    """
+    full_prompt = f"{build_system_prefix(perspective, prompt_style, available_features if prune else None)}\n\n"
+    full_prompt += f"PROFILE DATA:\n{profile_string}\n\n"
+    full_prompt += f"HOST COUNTRIES: {', '.join(host_countries)}\n\n"
+    full_prompt += f"AVAILABLE FEATURES IN THIS PROFILE: {', '.join(available_features)}\n\n"
+    full_prompt += ("Please provide your assessment following the guidelines above, separately for "
+                    "each host country listed. Return exactly one entry per host country, using the "
+                    "country name exactly as written above, each with its own score, reasoning and confidence.")
+    
+    return full_prompt
+
+
+# Map feature names to the survey field codes shown in profiles
+FIELD_CODE_MAPPING = {
+    'age': 's2q15',
+    'gender': 's2q14',
+    'country_of_origin': 's2q16',
+    'education_level': 's4q7',
+    'household_size': 'hhsize',
+    'household_head': 'head',
+    'employed_last_7_days': 'empl_active_7d',
+    'work_status': 'work_status',
+    'type_of_work': 's5q24',
+    'work_before_displacement': 's5q64',
+    'has_disability': 'disabled',
+    'vision_difficulty': 's9q4',
+    'hearing_difficulty': 's9q5',
+    'mobility_difficulty': 's9q6',
+    'cognitive_difficulty': 's9q7',
+    'has_refugee_id': 's9q2_3',
+    'has_work_permit': 's9q2_6',
+    'speaks_english': 's4q11_1',
+    'reads_english': 's4q12_1',
+    'speaks_swahili': 's4q11_2',
+    'reads_swahili': 's4q12_2',
+    'speaks_arabic': 's4q11_5',
+    'computer_skills': 's5q66',
+    'internet_skills': 's5q65',
+    'depend_ratio': 'depend_ratio'
+}
+
+
 def format_profile_with_field_codes(features: Dict[str, any]) -> str:
     """
     Format a profile string that includes field codes for transparency
@@ -152,37 +352,8 @@ def format_profile_with_field_codes(features: Dict[str, any]) -> str:
     """
     parts = []
     
-    # Map feature names to field codes
-    field_code_mapping = {
-        'age': 's2q15',
-        'gender': 's2q14',
-        'country_of_origin': 's2q16',
-        'education_level': 's4q7',
-        'household_size': 'hhsize',
-        'household_head': 'head',
-        'employed_last_7_days': 'empl_active_7d',
-        'work_status': 'work_status',
-        'type_of_work': 's5q24',
-        'work_before_displacement': 's5q64',
-        'has_disability': 'disabled',
-        'vision_difficulty': 's9q4',
-        'hearing_difficulty': 's9q5',
-        'mobility_difficulty': 's9q6',
-        'cognitive_difficulty': 's9q7',
-        'has_refugee_id': 's9q2_3',
-        'has_work_permit': 's9q2_6',
-        'speaks_english': 's4q11_1',
-        'reads_english': 's4q12_1',
-        'speaks_swahili': 's4q11_2',
-        'reads_swahili': 's4q12_2',
-        'speaks_arabic': 's4q11_5',
-        'computer_skills': 's5q66',
-        'internet_skills': 's5q65',
-        'depend_ratio': 'depend_ratio'
-    }
-    
     for feature, value in features.items():
-        field_code = field_code_mapping.get(feature, feature)
+        field_code = FIELD_CODE_MAPPING.get(feature, feature)
         parts.append(f"{field_code}={value}")
     
     return "; ".join(parts)
@@ -201,6 +372,7 @@ PROFILE PROVIDED: {profile}
 AVAILABLE FIELDS: {fields}
 
 ASSESSMENT TO VALIDATE:
+Host country: {host_country}
 Score: {score}/10
 Reasoning: {reasoning}
 
@@ -209,6 +381,44 @@ Identify any violations of the above criteria. The assessment should quote field
 """
 
 
+# Validation prompt for several host-country assessments of one profile
+MULTI_COUNTRY_VALIDATOR_PROMPT_TEMPLATE = """
+You are validating refugee employment assessments of one profile for several host countries.
+Check that each assessment:
+
+1. **Data Grounding**: Every claim references specific field values (e.g., "s2q15: 28" for age)
+2. **No Hallucination**: No information is assumed beyond what's in the profile
+3. **Realistic Scoring**: Score aligns with the evidence (not too harsh for missing data)
+4. **Perspective Focus**: Assessment focuses on {perspective} factors appropriately
+
+PROFILE PROVIDED: {profile}
+AVAILABLE FIELDS: {fields}
+
+ASSESSMENTS TO VALIDATE:
+{assessments}
+
+Return exactly one verdict per host country, using the country name exactly as written above,
+with the violations of the above criteria found in that country's assessment. The assessments
+should quote field codes (like s2q14, s4q7) when making claims about the individual.
+"""
+
+
+def format_country_assessments(assessments: Dict[str, Tuple[int, str]]) -> str:
+    """
+    Format per-country (score, reasoning) pairs for the multi-country validator prompt
+    
+    Args:
+        assessments: Mapping of host country to (score, reasoning)
+        
+    Returns:
+        Assessment block with one section per country
+    """
+    sections = []
+    for country, (score, reasoning) in assessments.items():
+        sections.append(f"### {country}\nScore: {score}/10\nReasoning: {reasoning}")
+    return "\n\n".join(sections)
+
+
 if __name__ == "__main__":
     # Example usage
     sample_features = {
@@ -0,0 +1,254 @@
+"""
+Batch Runner for Refugee Assessment System
+
+This module provides the parallel batch engine used by the dataset processor:
+a bounded worker pool, a token-bucket rate limiter that smooths the request
+rate sent to the LLM backend, back-pressure on the number of queued profiles,
+and progress reporting with throughput and ETA. When the backend's circuit
+breaker opens, the batch pauses and the affected items are requeued. An item
+requeued too often fails, and the batch is aborted once it has been paused for
+too long in total, so a backend that stays down cannot stall a run forever.
+"""
+
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, Iterator, Optional, Set, Tuple
+
+from metrics import PipelineMetrics
+from resilient_backend import CircuitBreaker, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+class BatchAborted(RuntimeError):
+    """The batch was paused by an open circuit for longer than its pause limit"""
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: tokens refill at `rate` per second up to `capacity`
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until `tokens` are available, then consume them"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                wait_time = (tokens - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+class ProgressTracker:
+    """
+    Tracks batch progress and periodically logs throughput and ETA
+    """
+
+    def __init__(self, total: int, log_interval_s: float = 30.0):
+        self.total = total
+        self.log_interval_s = log_interval_s
+        self.completed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.start_time = time.monotonic()
+        self._last_log = self.start_time
+        self._lock = threading.Lock()
+
+    def update(self, succeeded: bool = True, failed: bool = False):
+        """Record one finished item and log progress if the interval has elapsed"""
+        with self._lock:
+            self.completed += 1
+            if succeeded:
+                self.succeeded += 1
+            if failed:
+                self.failed += 1
+
+            now = time.monotonic()
+            if now - self._last_log >= self.log_interval_s or self.completed == self.total:
+                self._last_log = now
+                self._log(now)
+
+    @property
+    def profiles_per_minute(self) -> float:
+        elapsed = time.monotonic() - self.start_time
+        return self.completed / elapsed * 60 if elapsed > 0 else 0.0
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated seconds remaining, or None before the first completion"""
+        rate = self.profiles_per_minute / 60
+        if rate <= 0:
+            return None
+        return max(self.total - self.completed, 0) / rate
+
+    def _log(self, now: float):
+        pct = self.completed / self.total * 100 if self.total else 100.0
+        eta = self.eta_seconds()
+        eta_str = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta is not None else "unknown"
+        if eta is not None and eta >= 86400:
+            eta_str = f"{int(eta // 86400)}d {eta_str}"
+
+        logger.info(
+            f"Progress: {self.completed}/{self.total} ({pct:.1f}%) | "
+            f"{self.profiles_per_minute:.2f} profiles/min | ETA {eta_str} | "
+            f"valid: {self.succeeded}, errors: {self.failed}"
+        )
+
+class BatchRunner:
+    """
+    Runs a worker function over a stream of keyed items on a bounded thread pool.
+
+    Submission is throttled by an optional token bucket (items per second), and at
+    most `max_pending` items are queued or running at once; the producer blocks
+    until a slot frees up, so the input iterator is consumed lazily.
+
+    Items that fail with CircuitOpenError are requeued rather than reported, up to
+    `max_requeues` times each, and no item is submitted while `circuit_breaker`
+    refuses calls. Once pauses add up to `max_pause_s`, run() raises BatchAborted.
+    """
+
+    def __init__(self, worker_fn: Callable[[Any], Any], workers: int = 1,
+                 rate_limit: Optional[float] = None, max_pending: Optional[int] = None,
+                 log_interval_s: float = 30.0, metrics: Optional[PipelineMetrics] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None, max_requeues: int = 3,
+                 max_pause_s: Optional[float] = None):
+        self.worker_fn = worker_fn
+        self.workers = max(1, workers)
+        self.rate_limiter = TokenBucket(rate_limit, capacity=self.workers) if rate_limit else None
+        self.max_pending = max_pending or self.workers * 2
+        self.log_interval_s = log_interval_s
+        self.metrics = metrics
+        self.circuit_breaker = circuit_breaker
+        self.max_requeues = max_requeues
+        self.max_pause_s = max_pause_s
+        self.requeued = 0
+        self.paused_s = 0.0
+        
+        self._in_flight = 0
+        self._lock = threading.Lock()
+    
+    def _run_item(self, item: Any) -> Any:
+        """Run the worker on one item, tracking in-flight work and per-item metrics"""
+        with self._lock:
+            self._in_flight += 1
+        start = time.monotonic()
+        outcome = "error"
+        try:
+            result = self.worker_fn(item)
+            outcome = "ok" if result is not None else "empty"
+            return result
+        except CircuitOpenError:
+            outcome = "requeued"
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            if self.metrics is not None:
+                self.metrics.profile_finished(outcome, time.monotonic() - start)
+    
+    def _report_queue(self, pending: int):
+        """Publish queued (submitted, not started) and in-flight counts"""
+        if self.metrics is not None:
+            with self._lock:
+                in_flight = self._in_flight
+            self.metrics.set_queue(max(pending - in_flight, 0), in_flight)
+
+    def run(self, items: Iterable[Tuple[Hashable, Any]], total: int) -> Iterator[Tuple[Hashable, Any, Optional[Exception]]]:
+        """
+        Process items and yield (key, result, error) tuples in completion order
+
+        Args:
+            items: Iterable of (key, item) pairs passed to the worker function
+            total: Number of items expected, used for progress and ETA
+        """
+        progress = ProgressTracker(total, self.log_interval_s)
+        pending: Set[Future] = set()
+        entries = {}
+        requeued: Deque[Tuple[Hashable, Any]] = deque()
+        requeue_counts: Dict[Hashable, int] = {}
+        source = iter(items)
+        exhausted = False
+
+        logger.info(f"Batch started: {total} items, {self.workers} workers, "
+                    f"rate limit {self.rate_limiter.rate if self.rate_limiter else 'none'}/s")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as executor:
+            while True:
+                # Back-pressure: wait for a slot before queueing more work; once the
+                # input is exhausted, wait for running items (which may be requeued)
+                while len(pending) >= self.max_pending or (exhausted and pending and not requeued):
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._report_queue(len(pending))
+                    yield from self._collect(done, entries, progress, requeued, requeue_counts)
+
+                if requeued:
+                    key, item = requeued.popleft()
+                elif not exhausted:
+                    try:
+                        key, item = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        continue
+                else:
+                    break
+
+                if self.circuit_breaker is not None:
+                    self._pause_while_open(len(requeued) + 1)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+
+                future = executor.submit(self._run_item, item)
+                entries[future] = (key, item)
+                pending.add(future)
+                self._report_queue(len(pending))
+
+    def _pause_while_open(self, requeued: int):
+        """Block submission while the circuit breaker refuses calls; abort past the pause limit"""
+        if self.circuit_breaker.state == "closed":
+            return
+        paused = self.circuit_breaker.wait_until_closed()
+        if paused < 0.001:
+            return
+        self.paused_s += paused
+        logger.warning(f"Circuit open: batch paused for {paused:.1f}s ({requeued} items waiting to be retried)")
+        if self.metrics is not None:
+            self.metrics.event("batch_paused", seconds=round(paused, 3), requeued=requeued)
+        if self.max_pause_s is not None and self.paused_s >= self.max_pause_s:
+            raise BatchAborted(f"Backend unavailable: batch paused for {self.paused_s:.0f}s in total "
+                               f"(limit {self.max_pause_s:g}s)")
+
+    def _collect(self, done: Set[Future], entries: dict, progress: ProgressTracker,
+                 requeued: Deque[Tuple[Hashable, Any]],
+                 requeue_counts: Dict[Hashable, int]) -> Iterator[Tuple[Hashable, Any, Optional[Exception]]]:
+        for future in done:
+            key, item = entries.pop(future)
+            try:
+                result = future.result()
+                progress.update(succeeded=result is not None)
+                yield key, result, None
+            except CircuitOpenError as e:
+                requeue_counts[key] = requeue_counts.get(key, 0) + 1
+                if requeue_counts[key] > self.max_requeues:
+                    progress.update(succeeded=False, failed=True)
+                    yield key, None, e
+                    continue
+                # Not the item's fault: run it again once the backend recovers
+                self.requeued += 1
+                requeued.append((key, item))
+            except Exception as e:
+                progress.update(succeeded=False, failed=True)
+                yield key, None, e
@@ -0,0 +1,145 @@
+"""
+Benchmark: Compact Structured-Output Prompt and Generation Caps
+
+Runs the same profiles through MultiPerspectiveAnalyzer twice: with the full
+prompt, which asks for a Markdown report, and no caps; and with the compact
+structured-output prompt plus the given output budget. For selector and
+validator calls it reports completion tokens and decode time (wall time after
+the first token, when the backend reports time to first token), along with the
+validator pass rate, parse failures and score agreement between the two runs.
+The response cache is not used, so both runs hit the model.
+
+Usage:
+    python benchmark_compact_prompt.py --input "./Dataset/D3/Anonymized HHM Data.csv" --profiles 10
+    python benchmark_compact_prompt.py --reasoning-max-chars 600 --selector-max-tokens 300
+"""
+
+import json
+import time
+import argparse
+import logging
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from profile_builder import ProfileResult
+from llm_backends import create_backend
+from refugee_assessment_system import MultiPerspectiveAnalyzer, OutputBudget, LLMCallSpan, PERSPECTIVE_CONFIGS
+from benchmark_multi_country import load_profiles, compare_scores
+
+logger = logging.getLogger(__name__)
+
+def _summary(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    return {"mean": round(float(np.mean(values)), 3), "p95": round(float(np.percentile(values, 95)), 3)}
+
+def role_statistics(spans: List[LLMCallSpan]) -> Dict[str, Any]:
+    """Completion tokens, decode time and wall time of one role's calls"""
+    decode_ms = [span.wall_time_ms - (span.time_to_first_token_ms or 0.0) for span in spans if span.error is None]
+    return {
+        "calls": len(spans),
+        "parse_failures": sum(span.error is not None for span in spans),
+        "completion_tokens": _summary([span.completion_tokens for span in spans if span.completion_tokens is not None]),
+        "decode_ms": _summary(decode_ms),
+        "total_decode_s": round(sum(decode_ms) / 1000, 3),
+        "wall_time_ms": _summary([span.wall_time_ms for span in spans])
+    }
+
+def run_variant(analyzer: MultiPerspectiveAnalyzer, profiles: List[ProfileResult]) -> Dict[str, Any]:
+    """Assess all profiles with the analyzer's prompt style and budgets"""
+    start = time.perf_counter()
+    assessments = [analyzer.assess_profile(profile_result) for profile_result in profiles]
+    wall_time = time.perf_counter() - start
+
+    traces = [trace for assessment in assessments for trace in assessment.assessment_traces]
+    spans = list({span.call_id: span for trace in traces for span in trace.llm_calls}.values())
+    return {
+        "assessments": assessments,
+        "stats": {
+            "wall_time_s": round(wall_time, 3),
+            "selector": role_statistics([span for span in spans if span.role.endswith("selector")]),
+            "validator": role_statistics([span for span in spans if span.role.endswith("validator")]),
+            "validator_pass_rate": round(float(np.mean([t.is_validated for t in traces])), 3) if traces else 0.0,
+            "first_pass_rate": round(float(np.mean([t.is_validated and t.selector_iterations == 1
+                                                    for t in traces])), 3) if traces else 0.0,
+            "mean_reasoning_chars": round(float(np.mean([len(t.selector_final_reasoning) for t in traces])), 1)
+                                    if traces else 0.0
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compact prompt and generation caps")
+    parser.add_argument("--input", default="./Dataset/D3/Anonymized HHM Data.csv",
+                        help="Path to the survey CSV file")
+    parser.add_argument("--profiles", type=int, default=10, help="Number of valid profiles to assess")
+    parser.add_argument("--model", default="llama3", help="Model name")
+    parser.add_argument("--backend", choices=["ollama", "openai", "mock"], default="ollama",
+                        help="LLM backend used by both runs")
+    parser.add_argument("--base-url", default=None, help="Server URL for the ollama/openai backends")
+    parser.add_argument("--selector-max-tokens", type=int, default=None, help="Selector token cap of the compact run")
+    parser.add_argument("--validator-max-tokens", type=int, default=None, help="Validator token cap of the compact run")
+    parser.add_argument("--reasoning-max-chars", type=int, default=600,
+                        help="Reasoning character cap of the compact run")
+    parser.add_argument("--feedback-max-chars", type=int, default=400,
+                        help="Validator feedback character cap of the compact run")
+    parser.add_argument("--max-concurrency", type=int, default=1,
+                        help="Parallel assessments per profile in both runs")
+    parser.add_argument("--output", default="./results/benchmark_compact_prompt.json",
+                        help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    budget = OutputBudget(selector_max_tokens=args.selector_max_tokens, validator_max_tokens=args.validator_max_tokens,
+                          reasoning_max_chars=args.reasoning_max_chars, feedback_max_chars=args.feedback_max_chars)
+    variants = {
+        "full": {"prompt_style": "full"},
+        "compact": {"prompt_style": "compact",
+                    "output_budgets": {perspective: budget for perspective in PERSPECTIVE_CONFIGS}}
+    }
+    # One backend per run, so the mock backend answers both runs alike
+    analyzers = {
+        name: MultiPerspectiveAnalyzer(
+            model_name=args.model, max_concurrency=args.max_concurrency,
+            backend=create_backend(args.backend, args.model, max_connections=max(args.max_concurrency, 2),
+                                   base_url=args.base_url),
+            **options
+        )
+        for name, options in variants.items()
+    }
+
+    profiles = load_profiles(args.input, analyzers["full"], args.profiles)
+    logger.info(f"Benchmarking {len(profiles)} profiles with the full and compact prompts")
+
+    try:
+        runs = {name: run_variant(analyzer, profiles) for name, analyzer in analyzers.items()}
+    finally:
+        for analyzer in analyzers.values():
+            analyzer.close()
+
+    full, compact = runs["full"]["stats"], runs["compact"]["stats"]
+    full_decode = full["selector"]["total_decode_s"] + full["validator"]["total_decode_s"]
+    compact_decode = compact["selector"]["total_decode_s"] + compact["validator"]["total_decode_s"]
+    report = {
+        "profiles": len(profiles),
+        "model": args.model,
+        "backend": args.backend,
+        "output_budget": asdict(budget),
+        "full": full,
+        "compact": {
+            **compact,
+            "decode_time_saved_fraction": round(1 - compact_decode / full_decode, 3) if full_decode else 0.0,
+            "validator_pass_rate_change": round(compact["validator_pass_rate"] - full["validator_pass_rate"], 3),
+            "agreement_with_full": compare_scores(runs["full"]["assessments"], runs["compact"]["assessments"])
+        }
+    }
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Benchmark report saved: {args.output}")
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
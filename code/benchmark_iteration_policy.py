@@ -0,0 +1,125 @@
+"""
+Benchmark: Adaptive Iteration Policies vs the Fixed Selector → Validator Loop
+
+Runs the same profiles through MultiPerspectiveAnalyzer under the fixed policy
+and under each requested iteration policy, then reports backend calls per
+refugee, how many validations were skipped or sampled, how often the call
+budget ran out, and how far scores and recommendations moved from the fixed
+run. The response cache is not used, so every policy hits the model.
+
+Usage:
+    python benchmark_iteration_policy.py --input "./Dataset/D3/Anonymized HHM Data.csv" --profiles 10
+    python benchmark_iteration_policy.py --backend mock --policies adaptive economy
+"""
+
+import json
+import time
+import argparse
+import logging
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from profile_builder import ProfileResult
+from llm_backends import create_backend
+from iteration_policy import POLICIES, SKIP_VALIDATION, SAMPLE_VALIDATION, BUDGET_EXHAUSTED, DIVERGENCE_RETRY
+from refugee_assessment_system import MultiPerspectiveAnalyzer
+from benchmark_multi_country import load_profiles, compare_scores
+
+logger = logging.getLogger(__name__)
+
+def run_policy(analyzer: MultiPerspectiveAnalyzer, profiles: List[ProfileResult]) -> Dict[str, Any]:
+    """Assess all profiles under the analyzer's iteration policy and collect call counts"""
+    assessments = []
+    calls_per_profile = []
+
+    start = time.perf_counter()
+    for profile_result in profiles:
+        assessment = analyzer.assess_profile(profile_result)
+        calls_per_profile.append(len({span.call_id for trace in assessment.assessment_traces
+                                      for span in trace.llm_calls}))
+        assessments.append(assessment)
+    wall_time = time.perf_counter() - start
+
+    traces = [trace for assessment in assessments for trace in assessment.assessment_traces]
+    actions = [action for trace in traces for action in trace.policy_actions]
+    return {
+        "assessments": assessments,
+        "stats": {
+            "wall_time_s": round(wall_time, 3),
+            "llm_calls": int(sum(calls_per_profile)),
+            "llm_calls_per_profile": round(float(np.mean(calls_per_profile)), 2) if calls_per_profile else 0.0,
+            "max_llm_calls_per_profile": int(max(calls_per_profile)) if calls_per_profile else 0,
+            "validations_skipped": actions.count(SKIP_VALIDATION),
+            "validations_sampled": actions.count(SAMPLE_VALIDATION),
+            "budget_exhausted": actions.count(BUDGET_EXHAUSTED),
+            "divergence_retries": actions.count(DIVERGENCE_RETRY),
+            "acceptance_rate": round(float(np.mean([t.is_validated for t in traces])), 3) if traces else 0.0,
+            "mean_iterations": round(float(np.mean([t.selector_iterations for t in traces])), 3) if traces else 0.0
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark adaptive iteration policies")
+    parser.add_argument("--input", default="./Dataset/D3/Anonymized HHM Data.csv",
+                        help="Path to the survey CSV file")
+    parser.add_argument("--profiles", type=int, default=10, help="Number of valid profiles to assess")
+    parser.add_argument("--model", default="llama3", help="Model name")
+    parser.add_argument("--backend", choices=["ollama", "openai", "mock"], default="ollama",
+                        help="LLM backend used by every policy")
+    parser.add_argument("--base-url", default=None, help="Server URL for the ollama/openai backends")
+    parser.add_argument("--policies", nargs="+", choices=[name for name in POLICIES if name != "fixed"],
+                        default=["adaptive"], help="Policies compared against the fixed loop")
+    parser.add_argument("--max-concurrency", type=int, default=1,
+                        help="Parallel assessments per profile for every policy")
+    parser.add_argument("--output", default="./results/benchmark_iteration_policy.json",
+                        help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    # One backend per policy: the mock backend varies repeated answers to the same prompt,
+    # so a shared instance would make later policies see different responses
+    analyzers = {
+        name: MultiPerspectiveAnalyzer(
+            model_name=args.model, max_concurrency=args.max_concurrency, iteration_policy=POLICIES[name],
+            backend=create_backend(args.backend, args.model, max_connections=max(args.max_concurrency, 2),
+                                   base_url=args.base_url)
+        )
+        for name in ["fixed"] + args.policies
+    }
+
+    profiles = load_profiles(args.input, analyzers["fixed"], args.profiles)
+    logger.info(f"Benchmarking {len(profiles)} profiles under policies: {', '.join(analyzers)}")
+
+    try:
+        runs = {name: run_policy(analyzer, profiles) for name, analyzer in analyzers.items()}
+    finally:
+        for analyzer in analyzers.values():
+            analyzer.close()
+
+    fixed = runs["fixed"]
+    report = {
+        "profiles": len(profiles),
+        "model": args.model,
+        "backend": args.backend,
+        "fixed": fixed["stats"]
+    }
+    for name in args.policies:
+        stats = runs[name]["stats"]
+        report[name] = {
+            **stats,
+            "calls_saved": fixed["stats"]["llm_calls"] - stats["llm_calls"],
+            "calls_saved_fraction": round(1 - stats["llm_calls"] / fixed["stats"]["llm_calls"], 3)
+                                    if fixed["stats"]["llm_calls"] else 0.0,
+            "acceptance_rate_change": round(stats["acceptance_rate"] - fixed["stats"]["acceptance_rate"], 3),
+            "agreement_with_fixed": compare_scores(fixed["assessments"], runs[name]["assessments"])
+        }
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Benchmark report saved: {args.output}")
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
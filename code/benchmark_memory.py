@@ -0,0 +1,156 @@
+"""
+Benchmark: Memory per Assessed Refugee
+
+Assesses synthetic refugees against the mock backend and measures the bytes
+their RefugeeAssessment objects retain, in the compact trace model (slotted
+classes, interned perspective and country names, a shared feature list,
+prompts stored as a shared prefix plus suffix) and in the previous model
+(plain dataclasses, each trace holding its full prompt string), rebuilt from
+the same assessments.
+
+Sizes are measured by walking the object graph and counting every distinct
+object once, so strings shared between traces or refugees are not double
+counted.
+
+Usage:
+    python benchmark_memory.py --refugees 200 --output ./results/benchmark_memory.json
+"""
+
+import gc
+import sys
+import json
+import argparse
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FunctionType, ModuleType
+from typing import Any, Dict, List, Optional
+
+from llm_backends import MockBackend
+from benchmark_pipeline import make_synthetic_survey
+from refugee_assessment_system import MultiPerspectiveAnalyzer, RefugeeAssessment
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class LegacyAssessmentTrace:
+    """AssessmentTrace as it was before the compact model"""
+    agent_type: str
+    host_country: str
+    profile_features: List[str]
+    prompt_used: str
+    selector_iterations: int
+    selector_final_score: int
+    selector_final_reasoning: str
+    selector_confidence: float
+    validator_feedback: str
+    validator_issues: List[str]
+    is_validated: bool
+    assessment_id: str
+    timestamp: str
+    processing_time_ms: int
+    llm_calls: List[Any] = field(default_factory=list)
+    iteration_policy: str = "fixed"
+    policy_actions: List[str] = field(default_factory=list)
+
+@dataclass
+class LegacyLLMCallSpan:
+    call_id: str
+    role: str
+    iteration: int
+    wall_time_ms: float
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    time_to_first_token_ms: Optional[float] = None
+    cache_hit: bool = False
+    error: Optional[str] = None
+
+@dataclass
+class LegacyRefugeeAssessment:
+    refugee_id: str
+    profile_string: str
+    total_features: int
+    available_features: List[str]
+    country_scores: Dict[str, Dict[str, float]]
+    recommended_country: str
+    recommendation_score: float
+    assessment_traces: List[LegacyAssessmentTrace]
+    assessment_timestamp: str
+    total_processing_time_ms: int
+    validation_status: str
+    row_id: Optional[str] = None
+    source_row_id: Optional[str] = None
+
+def to_legacy(assessment: RefugeeAssessment) -> LegacyRefugeeAssessment:
+    """
+    Rebuild an assessment in the previous model: every trace gets its own full prompt
+    string, and traces share the refugee's feature list as the assessment loop did
+    """
+    features = list(assessment.available_features)
+    traces = []
+    for trace in assessment.assessment_traces:
+        data = trace.to_dict()
+        data.update(agent_type=trace.agent_type, host_country=trace.host_country, profile_features=features,
+                    llm_calls=[LegacyLLMCallSpan(**span) for span in data["llm_calls"]])
+        traces.append(LegacyAssessmentTrace(**data))
+
+    data = assessment.to_dict()
+    data.update(available_features=features, assessment_traces=traces)
+    return LegacyRefugeeAssessment(**data)
+
+def deep_sizeof(root: Any) -> int:
+    """Bytes retained by an object graph, counting each distinct object once"""
+    excluded = (type, ModuleType, FunctionType)
+    seen = set()
+    size = 0
+    pending = [root]
+    while pending:
+        batch = []
+        for obj in pending:
+            if isinstance(obj, excluded) or id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            size += sys.getsizeof(obj)
+            batch.append(obj)
+        pending = gc.get_referents(*batch) if batch else []
+    return size
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory retained per assessed refugee")
+    parser.add_argument("--refugees", type=int, default=200, help="Number of refugees to assess")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    parser.add_argument("--output", default="./results/benchmark_memory.json",
+                        help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    analyzer = MultiPerspectiveAnalyzer(backend=MockBackend(latency_ms=0, seed=args.seed))
+    survey = make_synthetic_survey(args.refugees * 3, seed=args.seed)
+    profiles = [result for _, result in analyzer.profile_builder.profile_results(survey) if result.is_valid]
+    profiles = profiles[:args.refugees]
+
+    logger.info(f"Assessing {len(profiles)} synthetic refugees")
+    try:
+        compact = [analyzer.assess_profile(profile) for profile in profiles]
+    finally:
+        analyzer.close()
+    legacy = [to_legacy(assessment) for assessment in compact]
+
+    count = max(len(compact), 1)
+    before = deep_sizeof(legacy) / count
+    after = deep_sizeof(compact) / count
+    report = {
+        "refugees": len(compact),
+        "traces_per_refugee": round(sum(len(a.assessment_traces) for a in compact) / count, 2),
+        "bytes_per_refugee_before": int(before),
+        "bytes_per_refugee_after": int(after),
+        "reduction": round(1 - after / before, 3) if before else 0.0
+    }
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Benchmark report saved: {args.output}")
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
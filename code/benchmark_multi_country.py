@@ -0,0 +1,169 @@
+"""
+Benchmark: Batched Multi-Country Prompting vs Per-Country Prompting
+
+Runs the same profiles through MultiPerspectiveAnalyzer with one selector call
+per host country, with one selector call per perspective covering every host
+country, and with per-country selectors but one grouped validator call per
+perspective, then reports wall time, LLM call counts and score agreement with
+the per-country mode. The response cache is not used, so both modes hit
+the model.
+
+Usage:
+    python benchmark_multi_country.py --input "./Dataset/D3/Anonymized HHM Data.csv" --profiles 10
+"""
+
+import json
+import time
+import argparse
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from profile_builder import ProfileResult
+from survey_reader import iter_survey_chunks
+from refugee_assessment_system import MultiPerspectiveAnalyzer, RefugeeAssessment
+
+logger = logging.getLogger(__name__)
+
+def load_profiles(csv_path: str, analyzer: MultiPerspectiveAnalyzer, count: int) -> List[ProfileResult]:
+    """First `count` valid profiles of the survey file"""
+    profiles = []
+    for chunk in iter_survey_chunks(csv_path, analyzer.profile_builder, chunksize=500):
+        for _, profile_result in analyzer.profile_builder.profile_results(chunk):
+            if profile_result.is_valid:
+                profiles.append(profile_result)
+                if len(profiles) >= count:
+                    return profiles
+    return profiles
+
+def count_llm_calls(assessment: RefugeeAssessment) -> Tuple[int, int]:
+    """
+    Selector and validator calls spent on one assessment
+
+    Calls are counted from the recorded spans; a batched or grouped call appears in
+    the trace of every country it covered, so spans are deduplicated by call id.
+    """
+    roles = {
+        span.call_id: span.role
+        for trace in assessment.assessment_traces for span in trace.llm_calls
+    }
+    validator_calls = sum(role.endswith("validator") for role in roles.values())
+    return len(roles) - validator_calls, validator_calls
+
+def run_mode(analyzer: MultiPerspectiveAnalyzer, profiles: List[ProfileResult]) -> Dict[str, Any]:
+    """Assess all profiles with the analyzer and collect timing and call counts"""
+    assessments = []
+    latencies = []
+    selector_calls = validator_calls = 0
+
+    start = time.perf_counter()
+    for profile_result in profiles:
+        profile_start = time.perf_counter()
+        assessment = analyzer.assess_profile(profile_result)
+        latencies.append(time.perf_counter() - profile_start)
+
+        selector, validator = count_llm_calls(assessment)
+        selector_calls += selector
+        validator_calls += validator
+        assessments.append(assessment)
+    wall_time = time.perf_counter() - start
+
+    traces = [trace for assessment in assessments for trace in assessment.assessment_traces]
+    return {
+        "assessments": assessments,
+        "stats": {
+            "wall_time_s": round(wall_time, 3),
+            "mean_profile_latency_s": round(float(np.mean(latencies)), 3) if latencies else 0.0,
+            "p95_profile_latency_s": round(float(np.percentile(latencies, 95)), 3) if latencies else 0.0,
+            "selector_calls": selector_calls,
+            "validator_calls": validator_calls,
+            "selector_calls_per_profile": round(selector_calls / len(profiles), 2) if profiles else 0.0,
+            "validator_calls_per_profile": round(validator_calls / len(profiles), 2) if profiles else 0.0,
+            "validation_rate": round(float(np.mean([t.is_validated for t in traces])), 3) if traces else 0.0,
+            "mean_iterations": round(float(np.mean([t.selector_iterations for t in traces])), 3) if traces else 0.0
+        }
+    }
+
+def compare_scores(reference: List[RefugeeAssessment], candidate: List[RefugeeAssessment]) -> Dict[str, Any]:
+    """Agreement between per-perspective scores and recommendations of two runs"""
+    differences = []
+    per_perspective: Dict[str, List[int]] = {}
+    recommendation_matches = 0
+
+    for ref, cand in zip(reference, candidate):
+        recommendation_matches += ref.recommended_country == cand.recommended_country
+        for country, scores in ref.country_scores.items():
+            for perspective, score in scores.items():
+                if perspective == "weighted":
+                    continue
+                difference = abs(score - cand.country_scores[country][perspective])
+                differences.append(difference)
+                per_perspective.setdefault(perspective, []).append(difference)
+
+    differences = np.array(differences) if differences else np.zeros(1)
+    return {
+        "exact_score_agreement": round(float(np.mean(differences == 0)), 3),
+        "within_one_agreement": round(float(np.mean(differences <= 1)), 3),
+        "mean_absolute_difference": round(float(np.mean(differences)), 3),
+        "mean_absolute_difference_by_perspective": {
+            perspective: round(float(np.mean(values)), 3) for perspective, values in per_perspective.items()
+        },
+        "recommendation_agreement": round(recommendation_matches / len(reference), 3) if reference else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched multi-country prompting")
+    parser.add_argument("--input", default="./Dataset/D3/Anonymized HHM Data.csv",
+                        help="Path to the survey CSV file")
+    parser.add_argument("--profiles", type=int, default=10, help="Number of valid profiles to assess")
+    parser.add_argument("--model", default="llama3", help="Ollama model name")
+    parser.add_argument("--max-concurrency", type=int, default=1,
+                        help="Parallel assessments per profile in both modes")
+    parser.add_argument("--output", default="./results/benchmark_multi_country.json",
+                        help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    per_country = MultiPerspectiveAnalyzer(model_name=args.model, max_concurrency=args.max_concurrency)
+    batched = MultiPerspectiveAnalyzer(model_name=args.model, max_concurrency=args.max_concurrency,
+                                       batch_countries=True)
+    grouped = MultiPerspectiveAnalyzer(model_name=args.model, max_concurrency=args.max_concurrency,
+                                       group_validation=True)
+
+    profiles = load_profiles(args.input, per_country, args.profiles)
+    logger.info(f"Benchmarking {len(profiles)} profiles in per-country, batched and grouped-validation modes")
+
+    try:
+        per_country_run = run_mode(per_country, profiles)
+        batched_run = run_mode(batched, profiles)
+        grouped_run = run_mode(grouped, profiles)
+    finally:
+        per_country.close()
+        batched.close()
+        grouped.close()
+
+    report = {
+        "profiles": len(profiles),
+        "model": args.model,
+        "host_countries": per_country.host_countries,
+        "per_country": per_country_run["stats"],
+        "batched": batched_run["stats"],
+        "grouped_validation": grouped_run["stats"],
+        "agreement": compare_scores(per_country_run["assessments"], batched_run["assessments"]),
+        "grouped_validation_agreement": compare_scores(per_country_run["assessments"], grouped_run["assessments"]),
+        "speedup": round(per_country_run["stats"]["wall_time_s"] / batched_run["stats"]["wall_time_s"], 2)
+                   if batched_run["stats"]["wall_time_s"] else None,
+        "grouped_validation_speedup": round(per_country_run["stats"]["wall_time_s"]
+                                            / grouped_run["stats"]["wall_time_s"], 2)
+                                      if grouped_run["stats"]["wall_time_s"] else None
+    }
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Benchmark report saved: {args.output}")
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Benchmark: End-to-End Assessment Pipeline
+
+Times the stages of the assessment pipeline on synthetic datasets shaped like
+the Kakuma household-member survey (same column codes, value vocabularies and
+missingness, including under-age members that are rejected):
+
+    build_profile          ProfileBuilder.build_profile, one row at a time
+    build_profiles         ProfileBuilder.build_profiles, whole DataFrame
+    format_profile         format_profile_with_field_codes per valid profile
+    generate_prompt        generate_perspective_specific_prompt per profile x perspective
+    assessment_loop        MultiPerspectiveAnalyzer.assess_profile against the mock backend
+    convert_to_dataframe   DatasetProcessor._convert_to_dataframe
+    stream_traces          TraceWriter.write per assessment (the default JSONL trace file)
+    save_results           DatasetProcessor.save_results (Parquet tables and summary)
+
+Each dataset size runs in a fresh process, so peak RSS is per size. Results
+(throughput, p50/p95 latency, peak RSS) are written as JSON and, given a
+baseline report, compared against it.
+
+Usage:
+    python benchmark_pipeline.py --sizes 1000 10000 100000 --output ./results/benchmark_pipeline.json
+    python benchmark_pipeline.py --baseline ./results/benchmark_baseline.json
+"""
+
+import sys
+import json
+import time
+import platform
+import resource
+import tempfile
+import argparse
+import logging
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from llm_backends import MockBackend
+from trace_writer import TraceWriter
+from profile_builder import ProfileResult
+from assessment_prompts import format_profile_with_field_codes, generate_perspective_specific_prompt
+from refugee_assessment_system import MultiPerspectiveAnalyzer, DatasetProcessor, RefugeeAssessment
+
+logger = logging.getLogger(__name__)
+
+# Answer vocabularies and missing-value rates modelled on the Kakuma HHM survey
+CATEGORICAL_COLUMNS = {
+    's2q14': (["Male", "Female"], 0.0),
+    's2q16': (["South Sudan", "Somalia", "DRC", "Ethiopia", "Burundi", "Sudan", "Rwanda", "Uganda"], 0.01),
+    'head': (["Yes", "No"], 0.0),
+    's4q7': (["None", "Primary", "Secondary", "Vocational", "University", "Don't know"], 0.35),
+    'empl_active_7d': (["Yes", "No"], 0.3),
+    'work_status': (["Employed", "Unemployed", "Out of labour force"], 0.3),
+    's5q24': (["Casual labour", "Own business", "Incentive worker", "Farming", "Domestic work"], 0.8),
+    's5q64': (["Yes", "No"], 0.4),
+    'disabled': (["Yes", "No"], 0.05),
+    's9q4': (["No difficulty", "Some difficulty", "A lot of difficulty"], 0.1),
+    's9q5': (["No difficulty", "Some difficulty", "A lot of difficulty"], 0.1),
+    's9q6': (["No difficulty", "Some difficulty", "A lot of difficulty"], 0.1),
+    's9q7': (["No difficulty", "Some difficulty", "A lot of difficulty"], 0.1),
+    's9q2_3': (["Yes", "No"], 0.2),
+    's9q2_6': (["Yes", "No"], 0.2),
+    's4q11_1': (["Yes", "No"], 0.3),
+    's4q12_1': (["Yes", "No"], 0.3),
+    's4q11_2': (["Yes", "No"], 0.3),
+    's4q12_2': (["Yes", "No"], 0.3),
+    's4q11_5': (["Yes", "No"], 0.3),
+    's5q66': (["Yes", "No"], 0.5),
+    's5q65': (["Yes", "No"], 0.5)
+}
+
+STAGES = ["build_profile", "build_profiles", "format_profile", "generate_prompt",
+          "assessment_loop", "convert_to_dataframe", "stream_traces", "save_results"]
+
+def make_synthetic_survey(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Synthetic household-member survey with Kakuma column codes
+
+    Ages follow a young population (about 40% under 15, so rejected), households
+    have 1-12 members and answers are missing at survey-like rates.
+    """
+    rng = np.random.default_rng(seed)
+
+    age = np.where(rng.random(rows) < 0.4, rng.integers(0, 15, rows), rng.integers(15, 80, rows)).astype(object)
+    age[rng.random(rows) < 0.02] = np.nan
+    household_size = rng.integers(1, 13, rows)
+
+    data: Dict[str, Any] = {
+        's2q15': age,
+        'hhsize': household_size,
+        'depend_ratio': np.round(rng.random(rows) * 3, 2)
+    }
+    for col, (values, missing_rate) in CATEGORICAL_COLUMNS.items():
+        column = np.array(values, dtype=object)[rng.integers(0, len(values), rows)]
+        column[rng.random(rows) < missing_rate] = np.nan
+        data[col] = column
+
+    return pd.DataFrame(data)
+
+def _percentiles_ms(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"p50_ms": 0.0, "p95_ms": 0.0}
+    values = np.array(latencies) * 1000
+    return {"p50_ms": round(float(np.percentile(values, 50)), 4),
+            "p95_ms": round(float(np.percentile(values, 95)), 4)}
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def time_per_item(fn: Callable[[Any], Any], items: List[Any]) -> Dict[str, Any]:
+    """Call fn on every item, timing each call and the whole stage"""
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        item_start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - item_start)
+    total = time.perf_counter() - start
+
+    return {
+        "items": len(items),
+        "total_s": round(total, 4),
+        "throughput_per_s": round(len(items) / total, 1) if total else 0.0,
+        **_percentiles_ms(latencies),
+        "peak_rss_mb": _peak_rss_mb()
+    }
+
+def time_once(fn: Callable[[], Any], items: int) -> Dict[str, Any]:
+    """Time a single whole-batch call processing `items` items"""
+    start = time.perf_counter()
+    fn()
+    total = time.perf_counter() - start
+    return {
+        "items": items,
+        "total_s": round(total, 4),
+        "throughput_per_s": round(items / total, 1) if total else 0.0,
+        "p50_ms": round(total * 1000, 4),
+        "p95_ms": round(total * 1000, 4),
+        "peak_rss_mb": _peak_rss_mb()
+    }
+
+def benchmark_size(rows: int, loop_profiles: int, max_save_rows: int, seed: int) -> Dict[str, Any]:
+    """Run every stage on one synthetic dataset size"""
+    logging.disable(logging.INFO)
+    df = make_synthetic_survey(rows, seed)
+    analyzer = MultiPerspectiveAnalyzer(backend=MockBackend(latency_ms=0.0, seed=seed))
+    builder = analyzer.profile_builder
+    processor = DatasetProcessor(analyzer)
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    profile_results: List[ProfileResult] = []
+    stages["build_profile"] = time_per_item(
+        lambda item: profile_results.append(builder.build_profile(item[1])), list(df.iterrows())
+    )
+    stages["build_profiles"] = time_once(lambda: builder.build_profiles(df), rows)
+
+    valid = [result for result in profile_results if result.is_valid]
+    stages["format_profile"] = time_per_item(
+        lambda result: format_profile_with_field_codes(result.available_features), valid
+    )
+
+    country = analyzer.host_countries[0]
+    prompt_jobs = [
+        (perspective, format_profile_with_field_codes(result.available_features), list(result.available_features))
+        for result in valid for perspective in analyzer.agents
+    ]
+    stages["generate_prompt"] = time_per_item(
+        lambda job: generate_perspective_specific_prompt(job[0], job[1], country, job[2]), prompt_jobs
+    )
+
+    assessments: List[RefugeeAssessment] = []
+    stages["assessment_loop"] = time_per_item(
+        lambda result: assessments.append(analyzer.assess_profile(result)), valid[:loop_profiles]
+    )
+    analyzer.close()
+
+    # Reuse the assessed profiles to fill a results table the size of the valid rows
+    save_count = min(len(valid), max_save_rows)
+    filled = [assessments[i % len(assessments)] for i in range(save_count)] if assessments else []
+
+    results_df = None
+    def convert():
+        nonlocal results_df
+        results_df = processor._convert_to_dataframe(filled)
+    stages["convert_to_dataframe"] = time_once(convert, len(filled))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        writer = TraceWriter(str(Path(output_dir) / "assessment_traces.jsonl"))
+        stages["stream_traces"] = time_per_item(writer.write, filled)
+        writer.close()
+        stages["save_results"] = time_once(
+            lambda: processor.save_results(results_df, filled, output_dir=output_dir, write_traces=False),
+            len(filled)
+        )
+
+    return {
+        "rows": rows,
+        "valid_profiles": len(valid),
+        "assessed_profiles": len(assessments),
+        "saved_rows": len(filled),
+        "stages": stages,
+        "peak_rss_mb": _peak_rss_mb()
+    }
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any],
+                        tolerance: float) -> Dict[str, Any]:
+    """
+    Throughput and p95 ratios against a baseline report
+
+    A stage regresses when its throughput drops, or its p95 latency grows, by more
+    than `tolerance` (a fraction) relative to the baseline.
+    """
+    comparison: Dict[str, Any] = {"tolerance": tolerance, "regressions": [], "sizes": {}}
+
+    for size, result in report["sizes"].items():
+        base_result = baseline.get("sizes", {}).get(size)
+        if base_result is None:
+            continue
+
+        size_comparison = {}
+        for stage, stats in result["stages"].items():
+            base = base_result["stages"].get(stage)
+            if base is None:
+                continue
+
+            throughput_ratio = stats["throughput_per_s"] / base["throughput_per_s"] if base["throughput_per_s"] else None
+            p95_ratio = stats["p95_ms"] / base["p95_ms"] if base["p95_ms"] else None
+            size_comparison[stage] = {
+                "throughput_ratio": round(throughput_ratio, 3) if throughput_ratio is not None else None,
+                "p95_ratio": round(p95_ratio, 3) if p95_ratio is not None else None,
+                "peak_rss_delta_mb": round(stats["peak_rss_mb"] - base["peak_rss_mb"], 1)
+            }
+            if ((throughput_ratio is not None and throughput_ratio < 1 - tolerance)
+                    or (p95_ratio is not None and p95_ratio > 1 + tolerance)):
+                comparison["regressions"].append(f"{size}/{stage}")
+
+        comparison["sizes"][size] = size_comparison
+
+    return comparison
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the assessment pipeline on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Synthetic dataset sizes in rows")
+    parser.add_argument("--loop-profiles", type=int, default=500,
+                        help="Valid profiles run through the mock selector/validator loop per size")
+    parser.add_argument("--max-save-rows", type=int, default=10000,
+                        help="Cap on rows converted, traced and saved per size; these stages scale "
+                             "linearly (Parquet tables, JSONL traces), so the cap bounds run time and memory")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for data and mock responses")
+    parser.add_argument("--output", default="./results/benchmark_pipeline.json",
+                        help="Where to write the JSON report")
+    parser.add_argument("--baseline", default=None, help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed fractional slowdown before a stage counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 when any stage regresses against the baseline")
+    args = parser.parse_args()
+
+    report: Dict[str, Any] = {
+        "environment": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor()
+        },
+        "settings": {"loop_profiles": args.loop_profiles, "max_save_rows": args.max_save_rows, "seed": args.seed},
+        "sizes": {}
+    }
+
+    for rows in args.sizes:
+        logger.info(f"Benchmarking {rows} rows")
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            result = executor.submit(benchmark_size, rows, args.loop_profiles, args.max_save_rows, args.seed).result()
+        report["sizes"][str(rows)] = result
+        for stage in STAGES:
+            stats = result["stages"][stage]
+            logger.info(f"  {stage:<22} {stats['throughput_per_s']:>12.1f}/s  "
+                        f"p50 {stats['p50_ms']:.3f} ms  p95 {stats['p95_ms']:.3f} ms  "
+                        f"peak RSS {stats['peak_rss_mb']:.1f} MB")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["baseline_comparison"] = compare_to_baseline(report, json.load(f), args.tolerance)
+        regressions = report["baseline_comparison"]["regressions"]
+        logger.info(f"Regressions against {args.baseline}: {', '.join(regressions) or 'none'}")
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Benchmark report saved: {args.output}")
+
+    if args.fail_on_regression and report.get("baseline_comparison", {}).get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
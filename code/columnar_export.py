@@ -0,0 +1,175 @@
+"""
+Columnar Export for Refugee Assessment System
+
+This module writes assessment results as normalized Parquet tables. The
+wide per-refugee sheet has {country}_{perspective} columns and long
+reasoning strings; these tables replace it:
+
+- refugees: one row per survey row, holding the recommendation and status
+- scores: one row per refugee, host country and perspective, holding the
+  score, confidence, iterations, validation flag and fallback flag
+- reasoning: one row per assessment, holding the selector reasoning and
+  validator feedback; it is shared by duplicate rows and joins to scores
+  on assessment_id
+
+Repeated strings (countries, perspectives, statuses) are stored as pandas
+categoricals, which Parquet dictionary-encodes. Analytics can then scan the
+score columns without reading any reasoning text. ColumnarTables gathers the
+rows while a run streams, so the assessments need not be kept until export.
+"""
+
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+REFUGEE_COLUMNS = [
+    "refugee_id", "row_id", "source_row_id", "total_features", "recommended_country",
+    "recommendation_score", "validation_status", "processing_time_ms", "assessment_timestamp"
+]
+
+SCORE_COLUMNS = [
+    "refugee_id", "row_id", "assessment_id", "country", "perspective", "score",
+    "weighted_score", "confidence", "iterations", "validated", "fallback"
+]
+REASONING_COLUMNS = [
+    "assessment_id", "country", "perspective", "reasoning", "validator_feedback", "validator_issues"
+]
+
+class ColumnarTables:
+    """
+    Scores and reasoning rows gathered as assessments finish, so the tables can be
+    written without keeping the assessments (and their prompts) in memory
+
+    Rows are ordered by the position given to add(), e.g. the source row index.
+    """
+
+    def __init__(self):
+        self._scores: Dict[Any, List[tuple]] = {}
+        self._reasoning: Dict[str, Tuple[Any, tuple]] = {}
+
+    @classmethod
+    def of(cls, assessments: Iterable) -> "ColumnarTables":
+        tables = cls()
+        for position, assessment in enumerate(assessments):
+            tables.add(assessment, position)
+        return tables
+
+    def add(self, assessment: Any, position: Any = None):
+        """Add one RefugeeAssessment's score rows and, once per assessment_id, its reasoning rows"""
+        position = len(self._scores) if position is None else position
+        self._scores[position] = [
+            (assessment.refugee_id, assessment.row_id, trace.assessment_id, trace.host_country, trace.agent_type,
+             trace.selector_final_score, assessment.country_scores[trace.host_country]["weighted"],
+             trace.selector_confidence, trace.selector_iterations, trace.is_validated, bool(trace.fallbacks))
+            for trace in assessment.assessment_traces
+        ]
+        for trace in assessment.assessment_traces:
+            known = self._reasoning.get(trace.assessment_id)
+            if known is None or position < known[0]:
+                self._reasoning[trace.assessment_id] = (position, (
+                    trace.assessment_id, trace.host_country, trace.agent_type, trace.selector_final_reasoning,
+                    trace.validator_feedback, "; ".join(trace.validator_issues)
+                ))
+
+    def scores_table(self) -> pd.DataFrame:
+        rows = [row for position in sorted(self._scores) for row in self._scores[position]]
+        columns = dict(zip(SCORE_COLUMNS, zip(*rows))) if rows else {name: () for name in SCORE_COLUMNS}
+        return pd.DataFrame({
+            "refugee_id": pd.Series(list(columns["refugee_id"]), dtype="string"),
+            "row_id": pd.Series(list(columns["row_id"]), dtype="string"),
+            "assessment_id": pd.Series(list(columns["assessment_id"]), dtype="string"),
+            "country": pd.Categorical(list(columns["country"])),
+            "perspective": pd.Categorical(list(columns["perspective"])),
+            "score": np.array(columns["score"], dtype=np.int8),
+            "weighted_score": np.array(columns["weighted_score"], dtype=np.float32),
+            "confidence": np.array(columns["confidence"], dtype=np.float32),
+            "iterations": np.array(columns["iterations"], dtype=np.int8),
+            "validated": np.array(columns["validated"], dtype=bool),
+            "fallback": np.array(columns["fallback"], dtype=bool)
+        })
+
+    def reasoning_table(self) -> pd.DataFrame:
+        entries = sorted(self._reasoning.values(), key=lambda entry: entry[0])
+        rows = [row for _, row in entries]
+        columns = dict(zip(REASONING_COLUMNS, zip(*rows))) if rows else {name: () for name in REASONING_COLUMNS}
+        return pd.DataFrame({
+            "assessment_id": pd.Series(list(columns["assessment_id"]), dtype="string"),
+            "country": pd.Categorical(list(columns["country"])),
+            "perspective": pd.Categorical(list(columns["perspective"])),
+            "reasoning": pd.Series(list(columns["reasoning"]), dtype="string"),
+            "validator_feedback": pd.Series(list(columns["validator_feedback"]), dtype="string"),
+            "validator_issues": pd.Categorical(list(columns["validator_issues"]))
+        })
+
+def scores_table(assessments: List) -> pd.DataFrame:
+    """
+    Long-format scores: one row per (refugee, host country, perspective)
+
+    Args:
+        assessments: RefugeeAssessment objects
+
+    Returns:
+        DataFrame with refugee_id, row_id, assessment_id, country, perspective, score,
+        weighted_score, confidence, iterations and validated columns
+    """
+    return ColumnarTables.of(assessments).scores_table()
+
+def reasoning_table(assessments: List) -> pd.DataFrame:
+    """
+    Reasoning text per assessment, written once even when duplicate rows share it
+
+    Returns:
+        DataFrame with assessment_id, country, perspective, reasoning, validator_feedback
+        and validator_issues columns
+    """
+    return ColumnarTables.of(assessments).reasoning_table()
+
+def refugees_table(results_df: pd.DataFrame) -> pd.DataFrame:
+    """Per-row recommendation columns of the results DataFrame, without scores or reasoning"""
+    table = results_df[[column for column in REFUGEE_COLUMNS if column in results_df.columns]].copy()
+    for column in ("recommended_country", "validation_status"):
+        if column in table.columns:
+            table[column] = table[column].astype("category")
+    return table
+
+def write_parquet_tables(results_df: pd.DataFrame, assessments: Union[List, ColumnarTables], output_dir: str,
+                         compression: str = "zstd") -> Dict[str, Path]:
+    """
+    Write the refugees, scores and reasoning tables as Parquet
+
+    Args:
+        results_df: Results DataFrame from DatasetProcessor.process_dataset
+        assessments: Assessments with their traces (one per results row), or the
+            ColumnarTables gathered from them
+        output_dir: Directory for refugees.parquet, scores.parquet and reasoning.parquet
+        compression: Parquet compression codec
+
+    Returns:
+        Mapping of table name to written path
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Parquet export requires the 'pyarrow' package") from e
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+
+    if not isinstance(assessments, ColumnarTables):
+        assessments = ColumnarTables.of(assessments)
+    tables = {
+        "refugees": refugees_table(results_df),
+        "scores": assessments.scores_table(),
+        "reasoning": assessments.reasoning_table()
+    }
+    paths = {}
+    for name, table in tables.items():
+        paths[name] = output_path / f"{name}.parquet"
+        table.to_parquet(paths[name], index=False, compression=compression)
+        logger.info(f"{name.title()} table saved: {paths[name]} ({len(table)} rows)")
+    return paths
@@ -0,0 +1,270 @@
+"""
+Endpoint Pool for Refugee Assessment System
+
+This module spreads backend calls over several model servers, for example one
+Ollama instance per CPU node, so throughput is not capped by a single server.
+Each call is routed to the healthy endpoint with the fewest requests in
+flight (ties go to the lower recent latency).
+
+An endpoint is ejected from routing after consecutive transient failures
+(connection errors, timeouts, 5xx responses), a failed health check, or when
+its recent latency is far above the other endpoints'. A parse error means the
+endpoint answered, so it does not count against the endpoint.
+Once its ejection period has passed, it is re-admitted as soon as a health
+check succeeds. A background thread runs these health checks periodically.
+Warm-up loads the model on every endpoint in parallel before the first
+assessment, so no request pays the model load time.
+"""
+
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Type
+
+import numpy as np
+from pydantic import BaseModel
+
+from llm_backends import BackendError, LLMBackend, LLMResult, is_transient_error
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest call in an endpoint's latency average (routing tie-break)
+LATENCY_EWMA_ALPHA = 0.2
+
+# Recent calls whose median latency decides whether an endpoint is slow; a
+# median ignores single slow calls (long prompts, a busy moment)
+SLOW_WINDOW = 20
+
+class _Endpoint:
+    """Routing state and statistics of one pool endpoint"""
+
+    def __init__(self, name: str, backend: LLMBackend):
+        self.name = name
+        self.backend = backend
+        self.outstanding = 0
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until: Optional[float] = None
+        self.ejection_reason: Optional[str] = None
+        self.latency_ewma_ms: Optional[float] = None
+        self.recent_ms: Deque[float] = deque(maxlen=SLOW_WINDOW)
+        self.latencies_ms: Deque[float] = deque(maxlen=2048)
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until is None
+
+    @property
+    def recent_median_ms(self) -> Optional[float]:
+        """Median latency of the last SLOW_WINDOW calls, once that many have completed"""
+        if len(self.recent_ms) < SLOW_WINDOW:
+            return None
+        return float(np.median(self.recent_ms))
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = list(self.latencies_ms)
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "ejection_reason": self.ejection_reason,
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.calls, 4) if self.calls else 0.0,
+            "outstanding": self.outstanding,
+            "ejections": self.ejections,
+            "latency_ms": {
+                "p50": round(float(np.percentile(latencies, 50)), 3),
+                "p95": round(float(np.percentile(latencies, 95)), 3),
+                "max": round(float(max(latencies)), 3)
+            } if latencies else None
+        }
+
+class EndpointPool(LLMBackend):
+    """
+    Backend that routes calls over several endpoints with least-outstanding-requests
+
+    Args:
+        backends: One backend per model server (all serving the same model)
+        names: Endpoint names for logs and statistics (default: base URL or index)
+        max_consecutive_failures: Transient failures in a row that eject an endpoint
+        eject_seconds: Minimum time an ejected endpoint stays out of routing
+        slow_factor: Eject an endpoint whose recent median latency exceeds this multiple
+            of the median of the other healthy endpoints' (None to never eject for latency)
+        health_check_interval: Seconds between background health checks (None to
+            only check ejected endpoints when a call is routed)
+    """
+
+    def __init__(self, backends: List[LLMBackend], names: Optional[List[str]] = None,
+                 max_consecutive_failures: int = 3, eject_seconds: float = 30.0,
+                 slow_factor: Optional[float] = 3.0, health_check_interval: Optional[float] = 15.0):
+        if not backends:
+            raise ValueError("Endpoint pool needs at least one backend")
+        names = names or [getattr(backend, "base_url", None) or f"endpoint-{i}" for i, backend in enumerate(backends)]
+
+        self.model_name = backends[0].model_name
+        self.endpoints = [_Endpoint(name, backend) for name, backend in zip(names, backends)]
+        self.max_consecutive_failures = max_consecutive_failures
+        self.eject_seconds = eject_seconds
+        self.slow_factor = slow_factor
+        self._lock = threading.Lock()
+        self._probing: set = set()
+        self._next = 0
+
+        self._stop = threading.Event()
+        self._health_thread = None
+        if health_check_interval and len(self.endpoints) > 1:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, args=(health_check_interval,), name="endpoint-health", daemon=True
+            )
+            self._health_thread.start()
+
+    def invoke(self, messages: List[Any], schema: Type[BaseModel],
+               max_tokens: Optional[int] = None) -> LLMResult:
+        endpoint = self._acquire()
+        start = time.perf_counter()
+        try:
+            result = endpoint.backend.invoke(messages, schema, max_tokens)
+        except Exception as e:
+            self._record(endpoint, None, e)
+            raise
+        self._record(endpoint, (time.perf_counter() - start) * 1000, None)
+        return result
+
+    def _acquire(self) -> _Endpoint:
+        """Pick an endpoint for the next call and count the call as outstanding on it"""
+        self._readmit_expired()
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+            if not candidates:
+                # Every endpoint is ejected: fail open to the one due back first
+                candidates = [min(self.endpoints, key=lambda endpoint: endpoint.ejected_until)]
+
+            # Rotate the scan start so equal endpoints share the load
+            self._next = (self._next + 1) % len(self.endpoints)
+            order = {id(endpoint): (self.endpoints.index(endpoint) - self._next) % len(self.endpoints)
+                     for endpoint in candidates}
+            endpoint = min(candidates, key=lambda endpoint: (
+                endpoint.outstanding, endpoint.latency_ewma_ms or 0.0, order[id(endpoint)]
+            ))
+            endpoint.outstanding += 1
+            endpoint.calls += 1
+            return endpoint
+
+    def _record(self, endpoint: _Endpoint, latency_ms: Optional[float], error: Optional[Exception]):
+        """Update an endpoint's statistics after a call and eject it if it is failing or slow"""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if error is not None:
+                endpoint.errors += 1
+                if not is_transient_error(error):
+                    endpoint.consecutive_failures = 0
+                    return
+                endpoint.consecutive_failures += 1
+                if endpoint.healthy and endpoint.consecutive_failures >= self.max_consecutive_failures:
+                    self._eject(endpoint, f"{endpoint.consecutive_failures} consecutive failures ({error})")
+                return
+
+            endpoint.consecutive_failures = 0
+            endpoint.latencies_ms.append(latency_ms)
+            endpoint.recent_ms.append(latency_ms)
+            if endpoint.latency_ewma_ms is None:
+                endpoint.latency_ewma_ms = latency_ms
+            else:
+                endpoint.latency_ewma_ms += LATENCY_EWMA_ALPHA * (latency_ms - endpoint.latency_ewma_ms)
+
+            latency = endpoint.recent_median_ms
+            if self.slow_factor and endpoint.healthy and latency is not None:
+                others = [other.recent_median_ms for other in self.endpoints
+                          if other is not endpoint and other.healthy and other.recent_median_ms is not None]
+                if others and latency > self.slow_factor * float(np.median(others)):
+                    self._eject(endpoint, f"slow (median {latency:.0f} ms vs {np.median(others):.0f} ms)")
+
+    def _eject(self, endpoint: _Endpoint, reason: str):
+        """Take an endpoint out of routing (caller holds the lock)"""
+        endpoint.ejected_until = time.monotonic() + self.eject_seconds
+        endpoint.ejection_reason = reason
+        endpoint.ejections += 1
+        logger.warning(f"Endpoint {endpoint.name} ejected for {self.eject_seconds:g}s: {reason}")
+
+    def _readmit_expired(self):
+        """Health-check ejected endpoints whose ejection period has passed; re-admit those that answer"""
+        now = time.monotonic()
+        with self._lock:
+            due = [endpoint for endpoint in self.endpoints
+                   if not endpoint.healthy and endpoint.ejected_until <= now and endpoint.name not in self._probing]
+            self._probing.update(endpoint.name for endpoint in due)
+
+        for endpoint in due:
+            healthy = self._probe(endpoint)
+            with self._lock:
+                self._probing.discard(endpoint.name)
+                if healthy:
+                    endpoint.ejected_until = None
+                    endpoint.ejection_reason = None
+                    endpoint.consecutive_failures = 0
+                    # Judge the endpoint on fresh latencies
+                    endpoint.latency_ewma_ms = None
+                    endpoint.recent_ms.clear()
+                    logger.info(f"Endpoint {endpoint.name} re-admitted")
+                else:
+                    endpoint.ejected_until = time.monotonic() + self.eject_seconds
+
+    @staticmethod
+    def _probe(endpoint: _Endpoint) -> bool:
+        try:
+            return endpoint.backend.health_check()
+        except Exception as e:
+            logger.debug(f"Health check of {endpoint.name} failed: {e}")
+            return False
+
+    def _health_loop(self, interval: float):
+        """Background health checks: eject endpoints that stop answering, re-admit recovered ones"""
+        while not self._stop.wait(interval):
+            for endpoint in self.endpoints:
+                if endpoint.healthy and not self._probe(endpoint):
+                    with self._lock:
+                        if endpoint.healthy:
+                            self._eject(endpoint, "health check failed")
+            self._readmit_expired()
+
+    def warm_up(self):
+        """Load the model on every endpoint in parallel; endpoints that fail are ejected"""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(self.endpoints), thread_name_prefix="warm-up") as executor:
+            futures = {endpoint.name: executor.submit(endpoint.backend.warm_up) for endpoint in self.endpoints}
+
+        for endpoint in self.endpoints:
+            error = futures[endpoint.name].exception()
+            if error is not None:
+                with self._lock:
+                    self._eject(endpoint, f"warm-up failed ({error})")
+        logger.info(f"Warmed up {len(self.endpoints)} endpoints in {time.perf_counter() - start:.1f}s")
+        if not any(endpoint.healthy for endpoint in self.endpoints):
+            raise BackendError("Warm-up failed on every endpoint")
+
+    def health_check(self) -> bool:
+        return any(self._probe(endpoint) for endpoint in self.endpoints)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool totals and per-endpoint calls, errors, ejections and latency percentiles"""
+        with self._lock:
+            endpoints = [endpoint.stats() for endpoint in self.endpoints]
+        return {
+            "endpoints": len(endpoints),
+            "healthy": sum(endpoint["healthy"] for endpoint in endpoints),
+            "calls": sum(endpoint["calls"] for endpoint in endpoints),
+            "errors": sum(endpoint["errors"] for endpoint in endpoints),
+            "ejections": sum(endpoint["ejections"] for endpoint in endpoints),
+            "per_endpoint": endpoints
+        }
+
+    def close(self):
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+        for endpoint in self.endpoints:
+            endpoint.backend.close()
@@ -0,0 +1,119 @@
+"""
+Grounding Checker for Refugee Assessment System
+
+This module is a local, rule-based pre-validator for selector responses. It
+extracts the survey field codes a response's reasoning cites (s4q7, s9q2_6,
+hhsize=..., ...) and compares them with the field codes of the profile, as
+shown to the model by format_profile_with_field_codes.
+
+Responses that cite no field codes, or cite codes the profile does not
+contain, fail the check. Their feedback goes straight back to the selector
+and the LLM validator call is skipped. Responses that pass still go to the
+LLM validator, which also judges scoring and perspective focus.
+"""
+
+import re
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Tuple
+
+from assessment_prompts import FIELD_CODE_MAPPING
+
+logger = logging.getLogger(__name__)
+
+# Survey question codes: section, question and optional sub-item (s2q15, s9q2_6)
+SURVEY_CODE_PATTERN = re.compile(r"\bs\d+q\d+(?:_\d+)?\b", re.IGNORECASE)
+
+# Derived variables with plain names (hhsize, disabled, ...); some are ordinary
+# words, so they only count as citations when followed by a value ("head=1", "hhsize: 6")
+NAMED_CODES = sorted(
+    {code for code in FIELD_CODE_MAPPING.values() if not SURVEY_CODE_PATTERN.fullmatch(code)},
+    key=len, reverse=True
+)
+NAMED_CODE_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(code) for code in NAMED_CODES) + r")\s*[:=]", re.IGNORECASE
+)
+
+@dataclass
+class GroundingResult:
+    """Outcome of the local grounding check for one reasoning text"""
+    is_grounded: bool
+    cited_codes: List[str] = field(default_factory=list)
+    hallucinated_codes: List[str] = field(default_factory=list)
+    feedback: str = ""
+    issues: List[str] = field(default_factory=list)
+
+@lru_cache(maxsize=4096)
+def _profile_field_codes(features: Tuple[str, ...]) -> FrozenSet[str]:
+    return frozenset(FIELD_CODE_MAPPING.get(feature, feature).lower() for feature in features)
+
+def profile_field_codes(available_features: Iterable[str]) -> FrozenSet[str]:
+    """Lower-cased field codes of a profile, as written by format_profile_with_field_codes"""
+    return _profile_field_codes(tuple(available_features))
+
+def extract_field_codes(reasoning: str) -> List[str]:
+    """Distinct field codes cited in a reasoning text, lower-cased, in order of appearance"""
+    codes = [match.group(0).lower() for match in SURVEY_CODE_PATTERN.finditer(reasoning)]
+    codes.extend(match.group(1).lower() for match in NAMED_CODE_PATTERN.finditer(reasoning))
+    return list(dict.fromkeys(codes))
+
+class GroundingChecker:
+    """
+    Rule-based check that a selector's reasoning cites the profile's own field codes
+
+    Args:
+        min_citations: Profile field codes the reasoning must cite to pass
+        allow_hallucinated: Pass responses that also cite codes missing from the profile
+    """
+
+    def __init__(self, min_citations: int = 1, allow_hallucinated: bool = False):
+        self.min_citations = min_citations
+        self.allow_hallucinated = allow_hallucinated
+
+    def check(self, reasoning: str, available_features: Iterable[str]) -> GroundingResult:
+        """
+        Check one reasoning text against the profile's field codes
+
+        Args:
+            reasoning: Selector reasoning
+            available_features: Feature names of the profile
+
+        Returns:
+            GroundingResult with validator-style feedback and issues when the check fails
+        """
+        return self._check(reasoning, profile_field_codes(available_features))
+
+    def check_batch(self, items: Iterable[Tuple[str, Iterable[str]]]) -> List[GroundingResult]:
+        """
+        Check many (reasoning, available_features) pairs; the field-code set of each
+        distinct profile is built once
+
+        Returns:
+            One GroundingResult per pair, in order
+        """
+        return [self._check(reasoning, profile_field_codes(features)) for reasoning, features in items]
+
+    def _check(self, reasoning: str, profile_codes: FrozenSet[str]) -> GroundingResult:
+        cited = extract_field_codes(reasoning or "")
+        grounded = [code for code in cited if code in profile_codes]
+        hallucinated = [code for code in cited if code not in profile_codes]
+
+        issues = []
+        feedback = []
+        if len(grounded) < self.min_citations:
+            issues.append("no_field_codes")
+            feedback.append("The reasoning does not cite the profile's field codes; support each claim "
+                            "with the field code and value it relies on (e.g., \"s2q15: 28\").")
+        if hallucinated and not self.allow_hallucinated:
+            issues.append("hallucinated_field_codes")
+            feedback.append(f"The reasoning cites field codes that are not in this profile: "
+                            f"{', '.join(hallucinated)}. Use only the fields provided.")
+
+        return GroundingResult(
+            is_grounded=not issues,
+            cited_codes=cited,
+            hallucinated_codes=hallucinated,
+            feedback=" ".join(feedback),
+            issues=issues
+        )
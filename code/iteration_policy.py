@@ -0,0 +1,135 @@
+"""
+Iteration Policy for Refugee Assessment System
+
+This module decides how much work the Selector → Validator loop spends on each
+assessment: whether a selector response is validated, skipped or audited by
+sampling, which host countries get extra iterations because the perspectives
+disagree, and how many backend calls one refugee may use in total.
+
+The default "fixed" policy reproduces the original loop exactly: every
+response is validated and there is no budget.
+"""
+
+import hashlib
+import threading
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Actions recorded per iteration in AssessmentTrace.policy_actions
+VALIDATE = "validate"
+SKIP_VALIDATION = "skip_validation"
+SAMPLE_VALIDATION = "sample_validation"
+BUDGET_EXHAUSTED = "budget_exhausted"
+DIVERGENCE_RETRY = "divergence_retry"
+GROUNDING_REJECTED = "grounding_rejected"
+
+@dataclass(frozen=True)
+class IterationPolicy:
+    """
+    Adaptive settings for the Selector → Validator loop
+
+    Args:
+        name: Policy name recorded in every trace
+        skip_validation_confidence: Normalized selector confidence at or above which
+            validation may be skipped (None to always validate)
+        skip_validation_min_features: Features a profile needs before validation may be skipped
+        validation_sample_rate: Fraction of skip-eligible responses still validated as an audit
+        divergence_threshold: Spread between the highest and lowest perspective score for
+            a host country that earns its unvalidated assessments extra iterations
+            (None to disable)
+        divergence_extra_iterations: Extra iterations granted per diverging assessment
+        call_budget: Maximum backend calls per refugee (None for unlimited); the first
+            selector call of every assessment is always made
+    """
+    name: str = "fixed"
+    skip_validation_confidence: Optional[float] = None
+    skip_validation_min_features: int = 5
+    validation_sample_rate: float = 0.0
+    divergence_threshold: Optional[float] = None
+    divergence_extra_iterations: int = 1
+    call_budget: Optional[int] = None
+
+    def validation_action(self, confidence: float, feature_count: int, sample_key: str) -> str:
+        """
+        Decide whether a selector response is validated
+
+        Args:
+            confidence: Selector confidence normalized to 0-1
+            feature_count: Number of features in the profile
+            sample_key: Stable identity of the response, so audit sampling is reproducible
+
+        Returns:
+            VALIDATE, SKIP_VALIDATION or SAMPLE_VALIDATION
+        """
+        if (self.skip_validation_confidence is None or confidence < self.skip_validation_confidence
+                or feature_count < self.skip_validation_min_features):
+            return VALIDATE
+
+        if self.validation_sample_rate > 0:
+            bucket = int(hashlib.sha256(sample_key.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+            if bucket < self.validation_sample_rate:
+                return SAMPLE_VALIDATION
+        return SKIP_VALIDATION
+
+    def diverging_countries(self, country_scores: Dict[str, Dict[str, float]]) -> List[str]:
+        """Host countries whose perspective scores spread by at least divergence_threshold"""
+        if self.divergence_threshold is None:
+            return []
+
+        diverging = []
+        for country, scores in country_scores.items():
+            values = [score for perspective, score in scores.items() if perspective != "weighted"]
+            if values and max(values) - min(values) >= self.divergence_threshold:
+                diverging.append(country)
+        return diverging
+
+POLICIES: Dict[str, IterationPolicy] = {
+    "fixed": IterationPolicy(),
+    "adaptive": IterationPolicy(
+        name="adaptive",
+        skip_validation_confidence=0.8,
+        skip_validation_min_features=5,
+        validation_sample_rate=0.1,
+        divergence_threshold=4,
+        divergence_extra_iterations=1,
+        call_budget=60
+    ),
+    "economy": IterationPolicy(
+        name="economy",
+        skip_validation_confidence=0.7,
+        skip_validation_min_features=4,
+        validation_sample_rate=0.05,
+        call_budget=36
+    )
+}
+
+class CallBudget:
+    """
+    Thread-safe count of the backend calls one refugee may still make
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, calls: int = 1) -> bool:
+        """Reserve calls if the budget allows them"""
+        with self._lock:
+            if self.limit is not None and self.used + calls > self.limit:
+                return False
+            self.used += calls
+            return True
+
+    def force_acquire(self, calls: int = 1):
+        """Count calls that are made regardless of the budget"""
+        with self._lock:
+            self.used += calls
+
+    @property
+    def exhausted(self) -> bool:
+        with self._lock:
+            return self.limit is not None and self.used >= self.limit
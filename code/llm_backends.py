@@ -0,0 +1,430 @@
+"""
+LLM Backends for Refugee Assessment System
+
+This module defines the backend interface the perspective agents call through,
+so assessments can run against a local Ollama server, any OpenAI-compatible
+HTTP server (vLLM, llama.cpp server, LM Studio, ...), or a deterministic
+in-process mock for benchmarks and load tests that need no model or network.
+
+Every backend turns a list of LangChain messages and a Pydantic response
+schema into an LLMResult holding the parsed response and normalized token
+usage (empty when the backend reports none).
+"""
+
+import re
+import time
+import hashlib
+import random
+import threading
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Type, get_args, get_origin
+
+import httpx
+from pydantic import BaseModel
+from langchain_ollama import ChatOllama
+
+logger = logging.getLogger(__name__)
+
+# LangChain message types mapped to OpenAI chat roles
+_OPENAI_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+
+# Health checks hit cheap listing endpoints and must answer quickly
+HEALTH_CHECK_TIMEOUT_S = 5.0
+
+# Warm-up waits for the model to load, but a server that never answers must not hang startup
+WARM_UP_TIMEOUT_S = 120.0
+
+class BackendError(RuntimeError):
+    """A backend call failed or returned an unusable response"""
+
+class TransientBackendError(BackendError):
+    """A backend call failed in transport (connection, timeout, 5xx or 429), so a retry may succeed"""
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Whether a backend call error is worth retrying and counts against the backend's health
+
+    Connection errors, timeouts and server-side HTTP errors are transient. Parse and
+    schema errors are not: the server answered, and the same request would fail the
+    same way again.
+    """
+    if isinstance(error, TransientBackendError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    status_code = getattr(error, "status_code", None)  # ollama.ResponseError
+    if isinstance(status_code, int) and status_code > 0:
+        return status_code >= 500 or status_code == 429
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+@dataclass
+class LLMResult:
+    """Parsed structured response and token usage of one backend call"""
+    parsed: BaseModel
+    # prompt_eval_tokens, cached_tokens, completion_tokens, prompt_eval_ms, eval_ms, load_ms,
+    # time_to_first_token_ms (whichever the backend reports)
+    usage: Dict[str, Any] = field(default_factory=dict)
+    # Served from the response cache rather than the model
+    cached: bool = False
+
+class LLMBackend:
+    """
+    Interface for structured-output LLM backends
+
+    Implementations must be safe to call from several threads at once.
+    """
+
+    model_name: str = ""
+
+    def invoke(self, messages: List[Any], schema: Type[BaseModel],
+               max_tokens: Optional[int] = None) -> LLMResult:
+        """
+        Send messages to the model and parse the reply into schema
+
+        Args:
+            messages: LangChain system/human messages
+            schema: Pydantic model the response is parsed into
+            max_tokens: Cap on generated tokens (Ollama num_predict; None for the server default)
+
+        Returns:
+            LLMResult with the parsed response and token usage
+        """
+        raise NotImplementedError
+
+    def health_check(self) -> bool:
+        """Whether the model server answers (without running the model); True when unknown"""
+        return True
+
+    def warm_up(self):
+        """Load the model on the server ahead of the first assessment (no-op by default)"""
+
+    def close(self):
+        """Release connections held by the backend"""
+
+def create_shared_client(model_name: str = "llama3", max_connections: int = 10,
+                         keep_alive: Optional[str] = None, num_ctx: Optional[int] = None,
+                         base_url: Optional[str] = None) -> ChatOllama:
+    """
+    Create one Ollama chat client whose pooled HTTP connections are shared by
+    every agent and by both the selector and validator roles
+
+    Args:
+        model_name: Ollama model name
+        max_connections: Size of the HTTP connection pool
+        keep_alive: How long Ollama keeps the model (and its KV cache) loaded
+            between calls, e.g. "30m" or "-1" for forever (None for the server default)
+        num_ctx: Context window in tokens; must fit the whole prompt, or the
+            truncated prefix can no longer be reused (None for the model default)
+        base_url: Ollama server URL (None for the default local server)
+    """
+    return ChatOllama(
+        model=model_name,
+        keep_alive=keep_alive,
+        num_ctx=num_ctx,
+        base_url=base_url,
+        client_kwargs={
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=120.0
+            )
+        }
+    )
+
+class OllamaBackend(LLMBackend):
+    """Ollama chat models through langchain-ollama structured output"""
+
+    def __init__(self, model_name: str = "llama3", max_connections: int = 10,
+                 keep_alive: Optional[str] = None, num_ctx: Optional[int] = None,
+                 base_url: Optional[str] = None):
+        self.model_name = model_name
+        self.base_url = (base_url or DEFAULT_OLLAMA_URL).rstrip("/")
+        self.keep_alive = keep_alive
+        self.client = create_shared_client(model_name, max_connections, keep_alive, num_ctx, base_url)
+        self._runnables: Dict[Tuple[Type[BaseModel], Optional[int]], Any] = {}
+        self._lock = threading.Lock()
+
+    def _runnable(self, schema: Type[BaseModel], max_tokens: Optional[int] = None) -> Any:
+        """Structured-output runnable for schema that also returns the raw message"""
+        with self._lock:
+            if (schema, max_tokens) not in self._runnables:
+                # The copy shares the client's HTTP connection pool
+                client = self.client if max_tokens is None else self.client.model_copy(
+                    update={"num_predict": max_tokens}
+                )
+                self._runnables[(schema, max_tokens)] = client.with_structured_output(schema, include_raw=True)
+            return self._runnables[(schema, max_tokens)]
+
+    def invoke(self, messages: List[Any], schema: Type[BaseModel],
+               max_tokens: Optional[int] = None) -> LLMResult:
+        result = self._runnable(schema, max_tokens).invoke(messages)
+
+        if result.get("parsing_error") is not None:
+            raise BackendError(f"Unparseable {schema.__name__} response: {result['parsing_error']}")
+        if result.get("parsed") is None:
+            raise BackendError(f"Response contained no {schema.__name__}")
+
+        metadata = getattr(result.get("raw"), "response_metadata", None) or {}
+        return LLMResult(result["parsed"], self._usage(metadata))
+
+    def health_check(self) -> bool:
+        try:
+            httpx.get(f"{self.base_url}/api/tags", timeout=HEALTH_CHECK_TIMEOUT_S).raise_for_status()
+        except httpx.HTTPError:
+            return False
+        return True
+
+    def warm_up(self):
+        """Preload the model: Ollama loads a model on a generate request with no prompt"""
+        payload: Dict[str, Any] = {"model": self.model_name}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        try:
+            httpx.post(f"{self.base_url}/api/generate", json=payload, timeout=WARM_UP_TIMEOUT_S).raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Warm-up of {self.base_url} failed: {e}")
+            raise TransientBackendError(f"{self.base_url} warm-up failed: {e}") from e
+
+    @staticmethod
+    def _usage(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalized usage from Ollama response metadata (durations are in ns)"""
+        if metadata.get("prompt_eval_count") is None:
+            return {}
+        load_ms = (metadata.get("load_duration") or 0) / 1e6
+        prompt_eval_ms = (metadata.get("prompt_eval_duration") or 0) / 1e6
+        return {
+            "prompt_eval_tokens": int(metadata["prompt_eval_count"]),
+            "completion_tokens": int(metadata.get("eval_count") or 0),
+            "prompt_eval_ms": prompt_eval_ms,
+            "eval_ms": (metadata.get("eval_duration") or 0) / 1e6,
+            "load_ms": load_ms,
+            # Server-side: the first token follows model load and prompt evaluation
+            "time_to_first_token_ms": round(load_ms + prompt_eval_ms, 3)
+        }
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Any server implementing the OpenAI chat completions API with JSON-schema
+    response formats, e.g. a local vLLM or llama.cpp server
+    """
+
+    def __init__(self, model_name: str, base_url: str = "http://localhost:8000/v1",
+                 api_key: Optional[str] = None, timeout: float = 120.0,
+                 max_connections: int = 10, temperature: Optional[float] = None):
+        self.model_name = model_name
+        self.base_url = base_url.rstrip("/")
+        self.url = f"{self.base_url}/chat/completions"
+        self.temperature = temperature
+
+        headers = {"Content-Type": "application/json"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        self.client = httpx.Client(
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=120.0
+            )
+        )
+
+    def invoke(self, messages: List[Any], schema: Type[BaseModel],
+               max_tokens: Optional[int] = None) -> LLMResult:
+        payload = {
+            "model": self.model_name,
+            "messages": [
+                {"role": _OPENAI_ROLES.get(message.type, "user"), "content": message.content}
+                for message in messages
+            ],
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()}
+            }
+        }
+        if self.temperature is not None:
+            payload["temperature"] = self.temperature
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+
+        try:
+            response = self.client.post(self.url, json=payload)
+            response.raise_for_status()
+            body = response.json()
+            content = body["choices"][0]["message"]["content"]
+        except (httpx.HTTPError, ValueError, KeyError, IndexError) as e:
+            error_type = TransientBackendError if is_transient_error(e) else BackendError
+            raise error_type(f"{self.url} request failed: {e}") from e
+
+        try:
+            parsed = schema.model_validate_json(content)
+        except ValueError as e:
+            raise BackendError(f"Unparseable {schema.__name__} response: {e}") from e
+
+        return LLMResult(parsed, self._usage(body.get("usage") or {}))
+
+    @staticmethod
+    def _usage(usage: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalized usage from an OpenAI usage block (prompt_tokens includes cached tokens)"""
+        if usage.get("prompt_tokens") is None:
+            return {}
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        return {
+            "prompt_eval_tokens": int(usage["prompt_tokens"]) - int(cached or 0),
+            "cached_tokens": cached,
+            "completion_tokens": int(usage.get("completion_tokens") or 0)
+        }
+
+    def health_check(self) -> bool:
+        try:
+            self.client.get(f"{self.base_url}/models", timeout=HEALTH_CHECK_TIMEOUT_S).raise_for_status()
+        except httpx.HTTPError:
+            return False
+        return True
+
+    def close(self):
+        self.client.close()
+
+class MockBackend(LLMBackend):
+    """
+    Deterministic in-process backend for benchmarks and load tests
+
+    Responses are generated from the response schema's fields and seeded by the
+    messages, so the same prompt always gets the same answer; repeated calls with
+    one prompt (retries) draw the next value of that prompt's sequence. Reasoning
+    cites the field codes present in the profile data.
+    """
+
+    def __init__(self, latency_ms: float = 50.0, latency_jitter_ms: float = 0.0,
+                 failure_rate: float = 0.0, score_weights: Optional[Dict[int, float]] = None,
+                 valid_rate: float = 0.8, seed: int = 0, model_name: str = "mock"):
+        """
+        Args:
+            latency_ms: Mean simulated latency per call
+            latency_jitter_ms: Standard deviation of the simulated latency
+            failure_rate: Fraction of calls that raise TransientBackendError
+            score_weights: Relative weight of each score 1-10 (None for uniform)
+            valid_rate: Fraction of validator verdicts that accept the assessment
+            seed: Seed mixed into every response
+            model_name: Name reported to the response cache
+        """
+        self.model_name = model_name
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.failure_rate = failure_rate
+        self.valid_rate = valid_rate
+        self.seed = seed
+
+        weights = score_weights or {score: 1.0 for score in range(1, 11)}
+        self._scores = sorted(weights)
+        self._score_weights = [weights[score] for score in self._scores]
+
+        self.calls = 0
+        self.failures = 0
+        self._attempts: Dict[str, int] = {}  # calls so far per prompt digest
+        self._lock = threading.Lock()
+
+    def invoke(self, messages: List[Any], schema: Type[BaseModel],
+               max_tokens: Optional[int] = None) -> LLMResult:
+        text = "\n".join(message.content for message in messages)
+        key = hashlib.sha256(f"{self.seed}|{schema.__name__}|{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+            self.calls += 1
+        rng = random.Random(f"{key}|{attempt}")
+
+        latency_ms = self.latency_ms
+        if self.latency_jitter_ms:
+            latency_ms = max(0.0, rng.gauss(self.latency_ms, self.latency_jitter_ms))
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+        if rng.random() < self.failure_rate:
+            with self._lock:
+                self.failures += 1
+            raise TransientBackendError("Simulated mock backend failure")
+
+        parsed = self._build(schema, rng, text)
+        completion_tokens = len(parsed.model_dump_json()) // 4
+        if max_tokens is not None and completion_tokens > max_tokens:
+            # A real server stops mid-JSON at the cap
+            raise BackendError(f"Unparseable {schema.__name__} response: truncated at {max_tokens} tokens")
+        usage = {
+            "prompt_eval_tokens": len(text) // 4,
+            "completion_tokens": completion_tokens,
+            "eval_ms": latency_ms
+        }
+        return LLMResult(parsed, usage)
+
+    def _build(self, schema: Type[BaseModel], rng: random.Random, text: str,
+               country: Optional[str] = None) -> BaseModel:
+        """Instance of schema with field values drawn from rng"""
+        values: Dict[str, Any] = {}
+        is_valid = rng.random() < self.valid_rate
+
+        for name, field_info in schema.model_fields.items():
+            annotation = field_info.annotation
+            item_type = get_args(annotation)[0] if get_origin(annotation) is list else None
+
+            if name == "score":
+                values[name] = rng.choices(self._scores, weights=self._score_weights)[0]
+            elif name == "confidence":
+                values[name] = round(rng.uniform(0.5, 0.95), 2)
+            elif name == "is_valid":
+                values[name] = is_valid
+            elif name == "country":
+                values[name] = country or ""
+            elif name == "issues":
+                values[name] = [] if is_valid else ["mock_issue"]
+            elif isinstance(item_type, type) and issubclass(item_type, BaseModel):
+                values[name] = [self._build(item_type, rng, text, c) for c in self._countries(text)]
+            elif annotation is str:
+                # Honour maxLength like grammar-constrained decoding would
+                max_length = (field_info.json_schema_extra or {}).get("maxLength")
+                values[name] = self._mock_text(name, text, is_valid)[:max_length]
+
+        return schema(**values)
+
+    @staticmethod
+    def _countries(text: str) -> List[str]:
+        """Host countries a multi-country prompt asks about"""
+        match = re.search(r"^HOST COUNTRIES: (.+)$", text, re.MULTILINE)
+        if match:
+            return [country.strip() for country in match.group(1).split(",")]
+        return re.findall(r"^### (.+)$", text, re.MULTILINE)
+
+    @staticmethod
+    def _mock_text(name: str, text: str, is_valid: bool) -> str:
+        """Reasoning or feedback citing the profile's field codes"""
+        codes = re.findall(r"\b(s\d+q\d+(?:_\d+)?)=", text)
+        cited = ", ".join(dict.fromkeys(codes[:3])) or "the available profile data"
+        if name == "feedback":
+            return "Assessment is grounded in the profile data." if is_valid else f"Cite evidence from {cited}."
+        return f"Mock {name} based on {cited}."
+
+def create_backend(backend: str = "ollama", model_name: str = "llama3", max_connections: int = 10,
+                   **options: Any) -> LLMBackend:
+    """
+    Build a backend by name
+
+    Args:
+        backend: "ollama", "openai" or "mock"
+        model_name: Model name passed to the backend
+        max_connections: HTTP connection pool size for network backends
+        **options: Backend-specific keyword arguments (None values are ignored)
+
+    Returns:
+        LLMBackend instance
+    """
+    options = {key: value for key, value in options.items() if value is not None}
+    if backend == "ollama":
+        return OllamaBackend(model_name, max_connections=max_connections, **options)
+    if backend == "openai":
+        return OpenAICompatibleBackend(model_name, max_connections=max_connections, **options)
+    if backend == "mock":
+        return MockBackend(**options)
+    raise ValueError(f"Unknown backend: {backend}")
@@ -0,0 +1,192 @@
+"""
+LLM Response Cache for Refugee Assessment System
+
+This module provides a persistent, content-addressed cache for structured LLM
+responses, applied as a wrapper around any LLM backend. Entries are keyed on a
+hash of the model name, the full message list and the response schema, stored
+in SQLite, and evicted least-recently-used once the cache exceeds its size
+budget.
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from llm_backends import LLMBackend, LLMResult
+
+logger = logging.getLogger(__name__)
+
+def cache_key(model_name: str, messages: List[Any], schema: Type[BaseModel],
+              max_tokens: Optional[int] = None) -> str:
+    """
+    Content hash identifying a structured LLM call
+
+    Args:
+        model_name: Name of the backend model
+        messages: LangChain messages sent to the model
+        schema: Pydantic model the response is parsed into
+        max_tokens: Generation cap of the call (left out of the key when None, so
+            uncapped calls keep their existing keys)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    payload = {
+        "model": model_name,
+        "messages": [{"role": message.type, "content": message.content} for message in messages],
+        "schema": schema.model_json_schema()
+    }
+    if max_tokens is not None:
+        payload["max_tokens"] = max_tokens
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+class ResponseCache:
+    """
+    SQLite-backed LRU cache of serialized responses with a size budget in bytes
+    """
+
+    def __init__(self, path: str = "./results/llm_cache.sqlite", max_bytes: int = 512 * 1024 * 1024,
+                 enabled: bool = True):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+
+        if self.enabled:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str):
+        """Store a value and evict least-recently-used entries over the size budget"""
+        if not self.enabled:
+            return
+
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time())
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop oldest entries until the cache fits in max_bytes (lock held)"""
+        while self._total_bytes > self.max_bytes:
+            oldest = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC LIMIT 64"
+            ).fetchall()
+            if not oldest:
+                self._total_bytes = 0
+                return
+
+            for key, size in oldest:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    return
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        entries = 0
+        if self.enabled:
+            with self._lock:
+                entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": self._total_bytes
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self.enabled = False
+
+class CachedBackend(LLMBackend):
+    """
+    Backend wrapper that consults a ResponseCache before invoking the wrapped
+    backend; cache hits report no token usage
+    """
+
+    def __init__(self, backend: LLMBackend, cache: ResponseCache):
+        self.backend = backend
+        self.cache = cache
+        self.model_name = backend.model_name
+
+    def invoke(self, messages: List[Any], schema: Type[BaseModel],
+               max_tokens: Optional[int] = None) -> LLMResult:
+        key = cache_key(self.model_name, messages, schema, max_tokens)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            try:
+                return LLMResult(schema.model_validate_json(cached), cached=True)
+            except ValueError:
+                logger.warning(f"Discarding unreadable cache entry {key[:12]}")
+
+        result = self.backend.invoke(messages, schema, max_tokens)
+        self.cache.put(key, result.parsed.model_dump_json())
+        return result
+
+    def close(self):
+        self.backend.close()
+
+def with_response_cache(backend: LLMBackend, cache: Optional[ResponseCache]) -> LLMBackend:
+    """Wrap a backend with the cache, or return it unchanged"""
+    if cache is None or not cache.enabled:
+        return backend
+    return CachedBackend(backend, cache)
@@ -0,0 +1,358 @@
+"""
+Live Metrics for Refugee Assessment System
+
+This module provides an optional, dependency-free telemetry surface for long
+dataset runs: counters, gauges and histograms rendered in the Prometheus text
+format on a localhost HTTP endpoint, plus a JSON-lines event log of notable
+pipeline events (profiles finished, fallbacks, lenient overrides, ...).
+"""
+
+import json
+import time
+import threading
+import logging
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "refugee_assessment"
+
+# Latency buckets in seconds, from cache hits to slow local generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class _Metric:
+    """Base class for a named metric with a fixed set of label names"""
+
+    metric_type = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = super().render()
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in values.items())
+        return lines
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set_function(self, function: Callable[[], float]):
+        """Compute the (unlabelled) value when the gauge is read instead of storing it"""
+        self._function = function
+
+    def set(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        if self._function is not None:
+            return self._function()
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        if self._function is not None:
+            values = {(): self._function()}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        lines = super().render()
+        lines.extend(f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in values.items())
+        return lines
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[position] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            counts = {key: list(values) for key, values in self._counts.items()}
+            sums = dict(self._sums)
+        lines = super().render()
+        for key, bucket_counts in counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += count
+                le_label = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {sums[key]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together, optionally served over HTTP
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        """
+        Serve /metrics on a daemon thread
+
+        Args:
+            port: TCP port (0 picks a free one)
+            host: Interface to bind; localhost by default
+
+        Returns:
+            The bound port
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Metrics request: {format % args}")
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        bound_port = self._server.server_address[1]
+        logger.info(f"Metrics endpoint: http://{host}:{bound_port}/metrics")
+        return bound_port
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+class EventLog:
+    """Append-only JSON-lines log of pipeline events, flushed per event"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields: Any):
+        line = json.dumps({"ts": datetime.now().isoformat(), "event": event, **fields}, default=str) + "\n"
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line)
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+class PipelineMetrics:
+    """
+    The assessment pipeline's metrics and events
+
+    Agents, the batch runner and the dataset processor report through the
+    methods below; every method is cheap and thread-safe.
+    """
+
+    def __init__(self, event_log_path: Optional[str] = None, rate_window_s: float = 60.0):
+        self.registry = MetricsRegistry()
+        self.events = EventLog(event_log_path) if event_log_path else None
+        self.rate_window_s = rate_window_s
+        self._started = time.monotonic()
+        self._finished: Deque[float] = deque()
+        self._rate_lock = threading.Lock()
+
+        r, p = self.registry, METRIC_PREFIX
+        self.llm_calls = r.counter(f"{p}_llm_calls_total", "Backend calls by outcome",
+                                   ("perspective", "role", "outcome"))
+        self.llm_call_duration = r.histogram(f"{p}_llm_call_duration_seconds", "Backend call wall time",
+                                             ("perspective", "role"))
+        self.validator_rejections = r.counter(f"{p}_validator_rejections_total",
+                                              "Selector responses the validator rejected", ("perspective",))
+        self.lenient_overrides = r.counter(f"{p}_lenient_overrides_total",
+                                           "Rejections accepted by the lenient override", ("perspective",))
+        self.grounding_rejections = r.counter(f"{p}_grounding_rejections_total",
+                                              "Selector responses rejected by the local grounding check",
+                                              ("perspective", "issue"))
+        self.fallbacks = r.counter(f"{p}_fallback_responses_total",
+                                   "Fallback responses used after a failed or incomplete call", ("perspective", "role"))
+        self.queue_depth = r.gauge(f"{p}_queue_depth", "Profiles submitted but not yet started")
+        self.in_flight = r.gauge(f"{p}_in_flight", "Profiles being assessed")
+        self.llm_requests_in_flight = r.gauge(f"{p}_llm_requests_in_flight",
+                                              "LLM requests sent to the backend and not yet answered")
+        self.profiles = r.counter(f"{p}_profiles_total", "Finished profiles by outcome", ("outcome",))
+        self.profile_duration = r.histogram(f"{p}_profile_duration_seconds", "Wall time per assessed profile")
+        self.rows = r.counter(f"{p}_rows_total", "Survey rows by journal status", ("status",))
+        self.profiles_per_second = r.gauge(f"{p}_profiles_per_second",
+                                           f"Profiles finished per second over the last {rate_window_s:.0f}s")
+        self.profiles_per_second.set_function(self._profile_rate)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        return self.registry.serve(port, host)
+
+    def event(self, event: str, **fields: Any):
+        if self.events is not None:
+            self.events.emit(event, **fields)
+
+    def llm_request_started(self):
+        self.llm_requests_in_flight.inc()
+
+    def llm_request_finished(self):
+        self.llm_requests_in_flight.dec()
+
+    def observe_llm_call(self, perspective: str, role: str, seconds: float, error: bool, cache_hit: bool):
+        outcome = "error" if error else "cache_hit" if cache_hit else "ok"
+        self.llm_calls.inc(perspective=perspective, role=role, outcome=outcome)
+        self.llm_call_duration.observe(seconds, perspective=perspective, role=role)
+
+    def validator_rejected(self, perspective: str):
+        self.validator_rejections.inc(perspective=perspective)
+
+    def lenient_override(self, perspective: str, score: int, features: int):
+        self.lenient_overrides.inc(perspective=perspective)
+        self.event("lenient_override", perspective=perspective, score=score, features=features)
+
+    def grounding_rejected(self, perspective: str, issues: List[str]):
+        for issue in issues:
+            self.grounding_rejections.inc(perspective=perspective, issue=issue)
+
+    def fallback(self, perspective: str, role: str, reason: str):
+        self.fallbacks.inc(perspective=perspective, role=role)
+        self.event("fallback", perspective=perspective, role=role, reason=reason)
+
+    def set_queue(self, queued: int, in_flight: int):
+        self.queue_depth.set(queued)
+        self.in_flight.set(in_flight)
+
+    def profile_finished(self, outcome: str, seconds: float):
+        """Count a finished profile for the totals and the sliding-window rate"""
+        self.profiles.inc(outcome=outcome)
+        self.profile_duration.observe(seconds)
+        with self._rate_lock:
+            self._finished.append(time.monotonic())
+
+    def _profile_rate(self) -> float:
+        """
+        Profiles finished per second over the rate window (or since start, if shorter),
+        computed when read so that a stalled run decays towards zero
+        """
+        now = time.monotonic()
+        with self._rate_lock:
+            while self._finished and now - self._finished[0] > self.rate_window_s:
+                self._finished.popleft()
+            finished = len(self._finished)
+        elapsed = min(now - self._started, self.rate_window_s)
+        return round(finished / elapsed, 4) if elapsed > 0 else 0.0
+
+    def close(self):
+        self.registry.close()
+        if self.events is not None:
+            self.events.close()
@@ -5,8 +5,9 @@ This module provides profile validation and building functionality that ensures
 data integrity and prevents hallucination of missing information.
 """
 
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from dataclasses import dataclass
 import logging
 
@@ -150,6 +151,129 @@ class ProfileBuilder:
         
         return "; ".join(profile_parts)
 
+    def build_profiles(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Build and validate profiles for every row of a DataFrame in one pass
+        
+        The column mapping is resolved once per DataFrame, and validity checks,
+        feature counts and profile strings are computed as column operations.
+        Results match build_profile row by row.
+        
+        Args:
+            df: DataFrame containing refugee data
+            
+        Returns:
+            DataFrame indexed like df with columns is_valid, rejection_reason,
+            feature_count and profile_string
+        """
+        features = self._resolve_features(df)
+        present = features.notna()
+        feature_count = present.sum(axis=1).astype(int)
+        
+        # Checks are applied lowest priority first so the first failing check wins
+        rejection = pd.Series("", index=df.index, dtype=object)
+        rejection = rejection.mask(
+            feature_count < self.min_features_required,
+            "Insufficient features: " + feature_count.astype(str) + f" < {self.min_features_required}"
+        )
+        
+        if 'age' in features.columns:
+            age_values = pd.to_numeric(features['age'], errors='coerce')
+            rejection = rejection.mask(
+                age_values < self.min_age,
+                "Age (" + age_values.astype(float).astype(str) + f") below minimum ({self.min_age})"
+            )
+            rejection = rejection.mask(
+                present['age'] & age_values.isna(),
+                "Invalid age value: " + features['age'].astype(str)
+            )
+        
+        missing_core = self._join_columns([
+            pd.Series(np.where(present[f], "", f) if f in present.columns else f,
+                      index=df.index, dtype=object)
+            for f in self.core_features
+        ], ", ")
+        rejection = rejection.mask(missing_core != "", "Missing core features: " + missing_core)
+        
+        is_valid = rejection == ""
+        
+        # Profile string: "Display Name: value" for each available feature, in mapping order
+        profile_string = self._join_columns([
+            ((feature_name.replace('_', ' ').title() + ": ") + features[feature_name].astype(str))
+            .where(present[feature_name], "")
+            for feature_name in features.columns
+        ], "; ")
+        
+        return pd.DataFrame({
+            "is_valid": is_valid,
+            "rejection_reason": rejection,
+            "feature_count": feature_count,
+            "profile_string": profile_string.where(is_valid, "")
+        }, index=df.index)
+    
+    def profile_results(self, df: pd.DataFrame) -> Iterator[Tuple[Any, ProfileResult]]:
+        """
+        Batch equivalent of calling build_profile on every row
+        
+        Args:
+            df: DataFrame containing refugee data
+            
+        Yields:
+            (index, ProfileResult) pairs in DataFrame order
+        """
+        features = self._resolve_features(df)
+        table = self.build_profiles(df)
+        
+        names = list(features.columns)
+        values = features.to_numpy(dtype=object)
+        present = features.notna().to_numpy()
+        
+        for position, (idx, is_valid, reason, count, profile_string) in enumerate(zip(
+            table.index, table["is_valid"], table["rejection_reason"],
+            table["feature_count"], table["profile_string"]
+        )):
+            available_features = {
+                names[j]: values[position, j] for j in np.flatnonzero(present[position])
+            }
+            yield idx, ProfileResult(
+                is_valid=bool(is_valid),
+                profile_string=profile_string,
+                rejection_reason=reason,
+                feature_count=int(count),
+                available_features=available_features
+            )
+    
+    def resolve_columns(self, columns: Any) -> Dict[str, List[str]]:
+        """
+        Source columns present in a dataset for each standard feature, in priority order
+        """
+        column_set = set(columns)
+        resolved = {}
+        for standard_name, possible_columns in self.feature_mappings.items():
+            found = [col for col in possible_columns if col in column_set]
+            if found:
+                resolved[standard_name] = found
+        return resolved
+    
+    def _resolve_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Coalesce mapped columns into one column per standard feature (first non-null wins)"""
+        resolved = {}
+        for standard_name, columns in self.resolve_columns(df.columns).items():
+            series = df[columns[0]]
+            for col_name in columns[1:]:
+                series = series.where(series.notna(), df[col_name])
+            resolved[standard_name] = series
+        return pd.DataFrame(resolved, index=df.index)
+    
+    @staticmethod
+    def _join_columns(parts: List[pd.Series], sep: str) -> pd.Series:
+        """Row-wise join of string columns, skipping empty strings"""
+        joined = pd.Series("", index=parts[0].index if parts else None, dtype=object)
+        for part in parts:
+            separator = np.where((joined != "") & (part != ""), sep, "")
+            joined = joined + separator + part
+        return joined
+
 def build_profile(row: pd.Series, min_age: int = 15, min_features_required: int = 3) -> str:
     """
     Convenience function for building profiles
@@ -0,0 +1,134 @@
+"""
+Prompt Cache Monitor for Refugee Assessment System
+
+This module records the prompt-evaluation (prefill) statistics that LLM
+backends return with every response, so the effect of a byte-stable shared
+prompt prefix on the backend KV cache can be measured.
+
+Ollama reports `prompt_eval_count` as the number of prompt tokens it actually
+evaluated; tokens reused from the KV cache are not counted. Cached tokens are
+therefore estimated as the prompt's full token count minus the evaluated
+count, where the full count is estimated from the prompt length using the
+highest tokens-per-character ratio observed so far (a cold call evaluates
+every token). The estimate is conservative until a cold call has been seen.
+Backends that report cached tokens directly (OpenAI-compatible servers) feed
+the same estimate.
+
+With prompt pruning, it also records how many characters each prompt's pruned
+guidelines saved against the full guidelines, converted to estimated tokens
+with the same ratio.
+"""
+
+import threading
+import logging
+from typing import Any, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tokens per character assumed for savings estimates until a call has reported usage
+DEFAULT_TOKENS_PER_CHAR = 0.25
+
+class PromptCacheMonitor:
+    """
+    Thread-safe accumulator of prefill statistics per call role (selector, validator, ...)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens_per_char = 0.0
+        self._roles: Dict[str, Dict[str, float]] = {}
+        self._pruning: Dict[str, Dict[str, int]] = {}
+
+    def record(self, role: str, prompt_chars: int, usage: Optional[Mapping[str, Any]]):
+        """Record one backend call from its normalized usage (see llm_backends.LLMResult)"""
+        if not usage or usage.get("prompt_eval_tokens") is None:
+            return
+
+        evaluated = int(usage["prompt_eval_tokens"])
+        reported_cached = int(usage.get("cached_tokens") or 0)
+        with self._lock:
+            if prompt_chars > 0:
+                self._tokens_per_char = max(self._tokens_per_char, (evaluated + reported_cached) / prompt_chars)
+
+            totals = self._roles.setdefault(role, {
+                "calls": 0, "prompt_chars": 0, "prompt_eval_tokens": 0, "completion_tokens": 0,
+                "prompt_eval_ms": 0.0, "eval_ms": 0.0, "load_ms": 0.0
+            })
+            totals["calls"] += 1
+            totals["prompt_chars"] += prompt_chars
+            totals["prompt_eval_tokens"] += evaluated
+            totals["completion_tokens"] += int(usage.get("completion_tokens") or 0)
+            totals["prompt_eval_ms"] += usage.get("prompt_eval_ms") or 0.0
+            totals["eval_ms"] += usage.get("eval_ms") or 0.0
+            totals["load_ms"] += usage.get("load_ms") or 0.0
+
+    def record_pruning(self, perspective: str, full_chars: int, pruned_chars: int):
+        """Record one prompt built from pruned guidelines (prefix lengths with and without pruning)"""
+        with self._lock:
+            totals = self._pruning.setdefault(perspective, {"prompts": 0, "full_chars": 0, "pruned_chars": 0})
+            totals["prompts"] += 1
+            totals["full_chars"] += full_chars
+            totals["pruned_chars"] += pruned_chars
+            tokens_per_char = self._tokens_per_char or DEFAULT_TOKENS_PER_CHAR
+        logger.debug(f"Pruned {perspective} prompt prefix: {full_chars} -> {pruned_chars} chars "
+                     f"(~{(full_chars - pruned_chars) * tokens_per_char:.0f} tokens saved)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Prompt-eval tokens against estimated cached tokens, per role and overall"""
+        with self._lock:
+            roles = {role: dict(totals) for role, totals in self._roles.items()}
+            pruning = {perspective: dict(totals) for perspective, totals in self._pruning.items()}
+            tokens_per_char = self._tokens_per_char
+
+        report: Dict[str, Any] = {"estimated_tokens_per_char": round(tokens_per_char, 4)}
+        overall = {"calls": 0, "prompt_chars": 0, "prompt_eval_tokens": 0, "completion_tokens": 0,
+                   "prompt_eval_ms": 0.0, "eval_ms": 0.0, "load_ms": 0.0}
+
+        for role, totals in roles.items():
+            report[role] = self._summarize(totals, tokens_per_char)
+            for key in overall:
+                overall[key] += totals[key]
+
+        report["overall"] = self._summarize(overall, tokens_per_char)
+        if pruning:
+            report["pruning"] = self._pruning_summary(pruning, tokens_per_char or DEFAULT_TOKENS_PER_CHAR)
+        return report
+
+    @staticmethod
+    def _pruning_summary(pruning: Dict[str, Dict[str, int]], tokens_per_char: float) -> Dict[str, Any]:
+        """Characters and estimated tokens saved per prompt, per perspective and overall"""
+        def summarize(totals: Dict[str, int]) -> Dict[str, Any]:
+            prompts = totals["prompts"]
+            saved = totals["full_chars"] - totals["pruned_chars"]
+            return {
+                "prompts": prompts,
+                "mean_prefix_chars": round(totals["pruned_chars"] / prompts, 1),
+                "mean_chars_saved": round(saved / prompts, 1),
+                "mean_estimated_tokens_saved": round(saved * tokens_per_char / prompts, 1),
+                "estimated_tokens_saved": int(round(saved * tokens_per_char)),
+                "saved_fraction": round(saved / totals["full_chars"], 3) if totals["full_chars"] else 0.0
+            }
+
+        overall = {key: sum(totals[key] for totals in pruning.values())
+                   for key in ("prompts", "full_chars", "pruned_chars")}
+        report: Dict[str, Any] = {perspective: summarize(totals) for perspective, totals in pruning.items()}
+        report["overall"] = summarize(overall)
+        return report
+
+    @staticmethod
+    def _summarize(totals: Dict[str, float], tokens_per_char: float) -> Dict[str, Any]:
+        calls = totals["calls"]
+        estimated_prompt_tokens = int(round(totals["prompt_chars"] * tokens_per_char))
+        estimated_cached_tokens = max(0, estimated_prompt_tokens - int(totals["prompt_eval_tokens"]))
+        return {
+            "calls": int(calls),
+            "prompt_eval_tokens": int(totals["prompt_eval_tokens"]),
+            "estimated_prompt_tokens": estimated_prompt_tokens,
+            "estimated_cached_tokens": estimated_cached_tokens,
+            "estimated_cached_fraction": round(estimated_cached_tokens / estimated_prompt_tokens, 3)
+                                         if estimated_prompt_tokens else 0.0,
+            "completion_tokens": int(totals["completion_tokens"]),
+            "mean_prompt_eval_ms": round(totals["prompt_eval_ms"] / calls, 1) if calls else 0.0,
+            "mean_eval_ms": round(totals["eval_ms"] / calls, 1) if calls else 0.0,
+            "total_load_ms": round(totals["load_ms"], 1)
+        }
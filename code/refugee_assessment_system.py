@@ -6,21 +6,48 @@ assessment using emotional, cultural, and ethical perspectives. The framework pr
 structured assessment traces and ensures data grounding through context-aware prompting.
 """
 
+import numpy as np
 import pandas as pd
 from typing import List, Literal, Optional, Dict, Any, Tuple
-from pydantic import BaseModel, Field
-from langchain_ollama import ChatOllama
+from pydantic import BaseModel, Field, create_model
 from langchain.schema import SystemMessage, HumanMessage
 import time
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, asdict, replace
 from pathlib import Path
 import logging
+import argparse
 import json
+import os
+import sys
+import threading
 import uuid
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from profile_builder import ProfileBuilder
-from assessment_prompts import generate_perspective_specific_prompt, format_profile_with_field_codes, VALIDATOR_PROMPT_TEMPLATE
+from profile_builder import ProfileBuilder, ProfileResult
+from batch_runner import BatchRunner, BatchAborted
+from assessment_journal import AssessmentJournal, row_keys as row_keys_for
+from survey_reader import iter_survey_chunks
+from llm_cache import ResponseCache, with_response_cache
+from llm_backends import LLMBackend, OllamaBackend, create_backend
+from prompt_cache_monitor import PromptCacheMonitor
+from metrics import PipelineMetrics
+from iteration_policy import (
+    IterationPolicy, CallBudget, POLICIES, VALIDATE, SKIP_VALIDATION, SAMPLE_VALIDATION, BUDGET_EXHAUSTED,
+    DIVERGENCE_RETRY, GROUNDING_REJECTED
+)
+from grounding_checker import GroundingChecker
+from trace_writer import TraceWriter, COMPRESSIONS, trace_paths
+from columnar_export import ColumnarTables, write_parquet_tables
+from request_coalescing import CoalescingBackend
+from endpoint_pool import EndpointPool
+from resilient_backend import CircuitOpenError, ResilienceConfig, ResilientBackend
+from assessment_prompts import (
+    generate_perspective_specific_prompt, generate_multi_country_prompt, build_system_prefix,
+    format_profile_with_field_codes, format_country_assessments, VALIDATOR_PROMPT_TEMPLATE, MULTI_COUNTRY_VALIDATOR_PROMPT_TEMPLATE,
+    PERSPECTIVE_FOCUS, PROMPT_STYLES
+)
 
 # Configure logging
 logging.basicConfig(
@@ -49,13 +76,101 @@ class ValidatorResponse(BaseModel):
     feedback: str = Field(description="Validation feedback")
     issues: List[str] = Field(default_factory=list, description="Specific issues identified")
 
-@dataclass
+class CountryAssessment(AgentResponse):
+    """Structured response for one host country within a multi-country assessment"""
+    country: str = Field(description="Host country this assessment is for, exactly as listed")
+
+class MultiCountryResponse(BaseModel):
+    """Structured response from a perspective agent scoring several host countries at once"""
+    assessments: List[CountryAssessment] = Field(description="One assessment per host country")
+
+class CountryVerdict(ValidatorResponse):
+    """Validator verdict for one host country within a multi-country validation"""
+    country: str = Field(description="Host country this verdict is for, exactly as listed")
+
+class MultiCountryValidatorResponse(BaseModel):
+    """Structured response from a validator checking several host-country assessments"""
+    verdicts: List[CountryVerdict] = Field(description="One verdict per host country")
+
+class FallbackResponse(AgentResponse):
+    """Neutral selector response used in place of a failed or incomplete selector call"""
+
+@lru_cache(maxsize=None)
+def capped_schema(schema: type, text_field: str, max_chars: Optional[int]) -> type:
+    """
+    Subclass of a response schema whose text field advertises maxLength
+
+    Backends with grammar-constrained decoding (Ollama, llama.cpp, vLLM) close the
+    string at the limit, which ends generation early; list fields of the multi-country
+    schemas are capped item by item.
+    
+    Args:
+        schema: AgentResponse, ValidatorResponse or one of their multi-country forms
+        text_field: "reasoning" or "feedback"
+        max_chars: Character limit (None returns schema unchanged)
+    """
+    if max_chars is None:
+        return schema
+    overrides = {}
+    for name, field_info in schema.model_fields.items():
+        item_type = getattr(field_info.annotation, "__args__", (None,))[0]
+        if name == text_field:
+            overrides[name] = (str, Field(description=field_info.description,
+                                          json_schema_extra={"maxLength": max_chars}))
+        elif isinstance(item_type, type) and issubclass(item_type, BaseModel):
+            overrides[name] = (List[capped_schema(item_type, text_field, max_chars)],
+                               Field(description=field_info.description))
+    return create_model(schema.__name__, __base__=schema, **overrides)
+
+@dataclass(slots=True)
+class LLMCallSpan:
+    """One backend call made while producing an assessment"""
+    call_id: str
+    role: str  # selector, validator, multi_country_selector or multi_country_validator
+    iteration: int
+    wall_time_ms: float
+    prompt_tokens: Optional[int] = None  # prompt tokens the backend evaluated (excludes KV-cache reuse)
+    completion_tokens: Optional[int] = None
+    time_to_first_token_ms: Optional[float] = None
+    cache_hit: bool = False
+    error: Optional[str] = None
+    
+    def __post_init__(self):
+        self.role = sys.intern(self.role)
+
+@dataclass(frozen=True, slots=True)
+class PromptText:
+    """
+    A selector prompt stored as a shared prefix plus its own suffix
+    
+    The perspective guidelines are nearly all of every prompt, so traces keep one
+    reference to the agent's prefix string instead of a full copy each.
+    """
+    prefix: str
+    suffix: str
+    
+    @classmethod
+    def of(cls, text: str, prefix: str = "") -> "PromptText":
+        if prefix and text.startswith(prefix):
+            return cls(prefix, text[len(prefix):])
+        return cls("", text)
+    
+    def __str__(self) -> str:
+        return self.prefix + self.suffix
+
+@dataclass(slots=True)
 class AssessmentTrace:
-    """Complete trace of a single agent assessment"""
+    """
+    Complete trace of a single agent assessment
+    
+    Slotted and compact: agent_type and host_country are interned, profile_features is
+    the refugee's shared feature list, and the prompt is a PromptText. to_dict() gives
+    the original asdict shape, with the full prompt as prompt_used.
+    """
     agent_type: str
     host_country: str
     profile_features: List[str]
-    prompt_used: str
+    prompt: PromptText
     
     # Selector phase
     selector_iterations: int
@@ -72,8 +187,69 @@ class AssessmentTrace:
     assessment_id: str
     timestamp: str
     processing_time_ms: int
+    
+    # Backend calls in order; in batched mode calls are shared by the countries they covered
+    llm_calls: List[LLMCallSpan] = field(default_factory=list)
+    
+    # Iteration policy (see iteration_policy.py) and its action for each iteration
+    iteration_policy: str = "fixed"
+    policy_actions: List[str] = field(default_factory=list)
+    
+    # Calls ("selector", "validator") whose neutral fallback, not a model answer, the
+    # final result uses because the call still failed after its retries
+    fallbacks: List[str] = field(default_factory=list)
+    
+    def __post_init__(self):
+        self.agent_type = sys.intern(self.agent_type)
+        self.host_country = sys.intern(self.host_country)
+        self.iteration_policy = sys.intern(self.iteration_policy)
+    
+    @property
+    def prompt_used(self) -> str:
+        return str(self.prompt)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """The trace in its asdict JSON shape"""
+        return {
+            "agent_type": self.agent_type,
+            "host_country": self.host_country,
+            "profile_features": list(self.profile_features),
+            "prompt_used": str(self.prompt),
+            "selector_iterations": self.selector_iterations,
+            "selector_final_score": self.selector_final_score,
+            "selector_final_reasoning": self.selector_final_reasoning,
+            "selector_confidence": self.selector_confidence,
+            "validator_feedback": self.validator_feedback,
+            "validator_issues": list(self.validator_issues),
+            "is_validated": self.is_validated,
+            "assessment_id": self.assessment_id,
+            "timestamp": self.timestamp,
+            "processing_time_ms": self.processing_time_ms,
+            "llm_calls": [asdict(span) for span in self.llm_calls],
+            "iteration_policy": self.iteration_policy,
+            "policy_actions": list(self.policy_actions),
+            "fallbacks": list(self.fallbacks)
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], prefix: str = "",
+                  profile_features: Optional[List[str]] = None) -> "AssessmentTrace":
+        """
+        Rebuild a trace from its asdict shape, or from the compact journal form, which
+        has no prompt text, call spans or feature list
+        
+        Args:
+            data: Trace dictionary (e.g. from a journal record)
+            prefix: Shared prompt prefix of the trace's perspective
+            profile_features: The refugee's feature list, shared instead of the dictionary's copy
+        """
+        fields_data = {key: value for key, value in data.items() if key not in ("prompt_used", "prompt_ref")}
+        if profile_features is not None and profile_features == fields_data.get("profile_features", profile_features):
+            fields_data["profile_features"] = profile_features
+        fields_data["llm_calls"] = [LLMCallSpan(**span) for span in data.get("llm_calls", [])]
+        return cls(prompt=PromptText.of(data.get("prompt_used", ""), prefix), **fields_data)
 
-@dataclass
+@dataclass(slots=True)
 class RefugeeAssessment:
     """Complete assessment result for a single refugee"""
     refugee_id: str
@@ -93,51 +269,328 @@ class RefugeeAssessment:
     assessment_timestamp: str
     total_processing_time_ms: int
     validation_status: str
+    
+    # Stable source-row identity (see assessment_journal.row_keys)
+    row_id: Optional[str] = None
+    # Row whose assessment was reused when this row's profile was a duplicate
+    source_row_id: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """The assessment in its asdict JSON shape"""
+        return {
+            "refugee_id": self.refugee_id,
+            "profile_string": self.profile_string,
+            "total_features": self.total_features,
+            "available_features": list(self.available_features),
+            "country_scores": {country: dict(scores) for country, scores in self.country_scores.items()},
+            "recommended_country": self.recommended_country,
+            "recommendation_score": self.recommendation_score,
+            "assessment_traces": [trace.to_dict() for trace in self.assessment_traces],
+            "assessment_timestamp": self.assessment_timestamp,
+            "total_processing_time_ms": self.total_processing_time_ms,
+            "validation_status": self.validation_status,
+            "row_id": self.row_id,
+            "source_row_id": self.source_row_id
+        }
+
+@dataclass(frozen=True)
+class OutputBudget:
+    """Generation caps of one perspective's calls (None leaves a cap off)"""
+    # Generated tokens per selector / validator call (Ollama num_predict, OpenAI max_tokens);
+    # multi-country calls get the cap once per host country
+    selector_max_tokens: Optional[int] = None
+    validator_max_tokens: Optional[int] = None
+    # Characters of selector reasoning / validator feedback, advertised to the backend as the
+    # schema's maxLength and enforced on the parsed response
+    reasoning_max_chars: Optional[int] = None
+    feedback_max_chars: Optional[int] = None
+
+@dataclass(frozen=True)
+class PerspectiveConfig:
+    """Table entry describing one perspective agent's validator and fallback behaviour"""
+    name: str
+    validator_system_message: str
+    selector_fallback_reasoning: str = "Technical error occurred"
+    validator_fallback_feedback: str = "Validation error"
+    feedback_instruction: str = "Please address these concerns."
+    
+    # Lenient override: accept a rejected assessment scoring at least this high
+    # when the profile has enough features (None disables the override)
+    lenient_min_score: Optional[int] = 6
+    lenient_min_features: int = 5
+    
+    # Default generation caps of the perspective's selector and validator calls
+    output_budget: OutputBudget = OutputBudget()
 
-class EmotionalAgent:
+SELECTOR_SYSTEM_MESSAGE = "You are an expert refugee employment assessor following specific guidelines."
+
+# Selector message layouts: "legacy" sends the whole prompt as the human message,
+# "prefix" sends the case-independent guidelines as part of the system message
+PROMPT_LAYOUTS = ("legacy", "prefix")
+
+PERSPECTIVE_CONFIGS: Dict[str, PerspectiveConfig] = {
+    "emotional": PerspectiveConfig(
+        name="emotional",
+        validator_system_message="You are a validation agent ensuring assessment quality and data integrity.",
+        selector_fallback_reasoning="Assessment failed due to technical error. Neutral score assigned.",
+        validator_fallback_feedback="Validation failed due to technical error",
+        feedback_instruction="Please address these concerns in your assessment."
+    ),
+    "cultural": PerspectiveConfig(
+        name="cultural",
+        validator_system_message="Validate cultural assessments for accuracy and data integrity."
+    ),
+    "ethical": PerspectiveConfig(
+        name="ethical",
+        validator_system_message="Validate ethical assessments for accuracy and systemic considerations."
+    )
+}
+
+def _country_key(country: str) -> str:
+    """Normalize a country name for matching model output to requested countries"""
+    return " ".join(country.split()).casefold()
+
+def _fallback_roles(selector_response: AgentResponse, validator_response: ValidatorResponse) -> List[str]:
+    """Calls of a final iteration that were answered by a fallback instead of the model"""
+    roles = []
+    if isinstance(selector_response, FallbackResponse):
+        roles.append("selector")
+    if "validator_error" in validator_response.issues:
+        roles.append("validator")
+    return roles
+
+def register_perspective(config: PerspectiveConfig, focus: str):
     """
-    Emotional perspective agent implementing Selector → Validator pattern
+    Add a new perspective without a new agent class
+    
+    Args:
+        config: Validator messages and override policy for the perspective
+        focus: Perspective focus text appended to the assessment prompt
     """
+    PERSPECTIVE_CONFIGS[config.name] = config
+    PERSPECTIVE_FOCUS[config.name] = focus
+
+class PerspectiveAgent:
+    """
+    Perspective agent implementing Selector → Validator pattern, driven by an
+    entry in PERSPECTIVE_CONFIGS
+    """
+    
+    def __init__(self, perspective: str, model_name: str = "llama3",
+                 cache: Optional[ResponseCache] = None, backend: Optional[LLMBackend] = None,
+                 prompt_layout: str = "legacy", monitor: Optional[PromptCacheMonitor] = None,
+                 metrics: Optional[PipelineMetrics] = None, grounding_checker: Optional[GroundingChecker] = None,
+                 prompt_style: str = "full", output_budget: Optional[OutputBudget] = None,
+                 prompt_pruning: bool = False):
+        if perspective not in PERSPECTIVE_CONFIGS:
+            raise ValueError(f"Unknown perspective: {perspective}")
+        if prompt_layout not in PROMPT_LAYOUTS:
+            raise ValueError(f"Unknown prompt layout: {prompt_layout}")
+        if prompt_style not in PROMPT_STYLES:
+            raise ValueError(f"Unknown prompt style: {prompt_style}")
+        
+        self.perspective = perspective
+        self.config = PERSPECTIVE_CONFIGS[perspective]
+        self.label = perspective.title()
+        
+        # "prefix" moves the stable guidelines into the system message so the
+        # backend can reuse their KV cache; "legacy" sends the original messages
+        self.prompt_layout = prompt_layout
+        self.prompt_style = prompt_style
+        self.system_prefix = build_system_prefix(perspective, prompt_style)
+        # Prune the guidelines to the fragments for each profile's fields and this perspective
+        self.prompt_pruning = prompt_pruning
+        self.monitor = monitor
+        self.metrics = metrics
+        
+        # Local pre-validator; responses that fail it skip the LLM validator (None to disable)
+        self.grounding_checker = grounding_checker
+        
+        # Generation caps; response schemas advertise the character caps as maxLength
+        self.output_budget = output_budget or self.config.output_budget
+        budget = self.output_budget
+        self.selector_schema = capped_schema(AgentResponse, "reasoning", budget.reasoning_max_chars)
+        self.multi_selector_schema = capped_schema(MultiCountryResponse, "reasoning", budget.reasoning_max_chars)
+        self.validator_schema = capped_schema(ValidatorResponse, "feedback", budget.feedback_max_chars)
+        self.multi_validator_schema = capped_schema(
+            MultiCountryValidatorResponse, "feedback", budget.feedback_max_chars
+        )
+        
+        # All model calls go through the backend, behind the shared response cache
+        self.backend = with_response_cache(backend or OllamaBackend(model_name), cache)
     
-    def __init__(self, model_name: str = "llama3"):
-        self.llm = ChatOllama(model=model_name).with_structured_output(AgentResponse)
-        self.validator_llm = ChatOllama(model=model_name).with_structured_output(ValidatorResponse)
-        self.perspective = "emotional"
+    def _invoke(self, role: str, messages: List[Any], schema: type,
+                spans: Optional[List[LLMCallSpan]] = None, max_tokens: Optional[int] = None) -> BaseModel:
+        """
+        Call the backend for one structured response, recording its prefill statistics
+        and, when spans is given, a span for the call (also on failure)
+        """
+        start = time.perf_counter()
+        if self.metrics is not None:
+            self.metrics.llm_request_started()
+        try:
+            result = self.backend.invoke(messages, schema, max_tokens)
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            if spans is not None:
+                spans.append(LLMCallSpan(
+                    call_id=str(uuid.uuid4()), role=role, iteration=0,
+                    wall_time_ms=round(elapsed * 1000, 3), error=type(e).__name__
+                ))
+            if self.metrics is not None:
+                self.metrics.observe_llm_call(self.perspective, role, elapsed, error=True, cache_hit=False)
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.llm_request_finished()
         
+        if self.metrics is not None:
+            self.metrics.observe_llm_call(self.perspective, role, time.perf_counter() - start,
+                                          error=False, cache_hit=result.cached)
+        if spans is not None:
+            spans.append(LLMCallSpan(
+                call_id=str(uuid.uuid4()),
+                role=role,
+                iteration=0,
+                wall_time_ms=round((time.perf_counter() - start) * 1000, 3),
+                prompt_tokens=result.usage.get("prompt_eval_tokens"),
+                completion_tokens=result.usage.get("completion_tokens"),
+                time_to_first_token_ms=result.usage.get("time_to_first_token_ms"),
+                cache_hit=result.cached
+            ))
+        if self.monitor is not None:
+            self.monitor.record(role, sum(len(message.content) for message in messages), result.usage)
+        return result.parsed
+    
+    def prompt_prefix(self, available_features: List[str]) -> str:
+        """Guidelines prefix of this agent's prompts for a profile (pruned to its fields when enabled)"""
+        if not self.prompt_pruning:
+            return self.system_prefix
+        return build_system_prefix(self.perspective, self.prompt_style, available_features)
+    
+    def _record_pruning(self, prefix: str):
+        """Record the guideline characters a new prompt saved by pruning"""
+        if self.prompt_pruning and self.monitor is not None:
+            self.monitor.record_pruning(self.perspective, len(self.system_prefix), len(prefix))
+    
+    def _selector_messages(self, prompt: str, prefix: Optional[str] = None) -> List[Any]:
+        """System and human messages for a selector prompt in the configured layout"""
+        prefix = prefix or self.system_prefix
+        if self.prompt_layout == "prefix" and prompt.startswith(prefix):
+            return [
+                SystemMessage(content=f"{SELECTOR_SYSTEM_MESSAGE}\n\n{prefix}"),
+                HumanMessage(content=prompt[len(prefix):].lstrip("\n"))
+            ]
+        return [
+            SystemMessage(content=SELECTOR_SYSTEM_MESSAGE),
+            HumanMessage(content=prompt)
+        ]
+    
     def assess_with_context(self, profile_string: str, host_country: str, 
-                           available_features: List[str], max_iterations: int = 3) -> AssessmentTrace:
+                           available_features: List[str], max_iterations: int = 3,
+                           policy: Optional[IterationPolicy] = None,
+                           budget: Optional[CallBudget] = None) -> AssessmentTrace:
         """
-        Assess refugee from emotional perspective with context awareness
+        Assess refugee from this agent's perspective with context awareness
         """
         start_time = time.time()
         assessment_id = str(uuid.uuid4())
         
         # Generate data-grounded prompt
         prompt = generate_perspective_specific_prompt(
-            'emotional', profile_string, host_country, available_features
+            self.perspective, profile_string, host_country, available_features, self.prompt_style,
+            self.prompt_pruning
         )
+        self._record_pruning(self.prompt_prefix(available_features))
         
-        # Selector phase with iterations
-        for iteration in range(max_iterations):
-            logger.info(f"Emotional agent - iteration {iteration + 1}")
+        # The first selector call of an assessment is made whatever the budget
+        budget = budget or CallBudget()
+        budget.force_acquire()
+        
+        return self._run_iterations(
+            prompt, profile_string, host_country, available_features, list(range(max_iterations)),
+            policy or POLICIES["fixed"], budget, [], [], assessment_id, start_time
+        )
+    
+    def continue_assessment(self, trace: AssessmentTrace, profile_string: str, available_features: List[str],
+                            extra_iterations: int, policy: IterationPolicy,
+                            budget: CallBudget) -> AssessmentTrace:
+        """
+        Give a finished assessment more iterations, resuming from its last prompt and
+        validator feedback; the caller reserves the first selector call in the budget
+        """
+        prompt = self._update_prompt_with_feedback(trace.prompt_used, trace.validator_feedback)
+        first_iteration = trace.selector_iterations
+        
+        return self._run_iterations(
+            prompt, profile_string, trace.host_country, available_features,
+            list(range(first_iteration, first_iteration + extra_iterations)), policy, budget,
+            list(trace.llm_calls), trace.policy_actions + [DIVERGENCE_RETRY], trace.assessment_id,
+            time.time() - trace.processing_time_ms / 1000
+        )
+    
+    def _run_iterations(self, prompt: str, profile_string: str, host_country: str,
+                        available_features: List[str], iterations: List[int], policy: IterationPolicy,
+                        budget: CallBudget, spans: List[LLMCallSpan], actions: List[str],
+                        assessment_id: str, start_time: float) -> AssessmentTrace:
+        """Selector → Validator iterations under the policy; the first selector call is pre-reserved"""
+        prefix = self.prompt_prefix(available_features)
+        for position, iteration in enumerate(iterations):
+            logger.info(f"{self.label} agent - iteration {iteration + 1}")
+            first_span = len(spans)
             
             # Get agent assessment
-            selector_response = self._get_selector_response(prompt, profile_string, host_country)
+            selector_response = self._get_selector_response(prompt, profile_string, host_country, spans, prefix)
             
-            # Validate response
-            validator_response = self._validate_response(
-                profile_string, selector_response, available_features
-            )
+            # Validate response, unless it fails the local grounding check, the policy
+            # skips it or the budget is spent
+            grounding_verdict = self._check_grounding({host_country: selector_response}, available_features)
+            if grounding_verdict:
+                action = GROUNDING_REJECTED
+            else:
+                action = policy.validation_action(
+                    selector_response.normalized_confidence, len(available_features),
+                    f"{self.perspective}|{host_country}|{profile_string}|{iteration}"
+                )
+                if action != SKIP_VALIDATION and not budget.try_acquire():
+                    action = BUDGET_EXHAUSTED
+            
+            if action == GROUNDING_REJECTED:
+                validator_response = grounding_verdict[host_country]
+            elif action == SKIP_VALIDATION:
+                validator_response = ValidatorResponse(
+                    is_valid=True,
+                    feedback=f"Validation skipped by the {policy.name} policy (high-confidence response)",
+                    issues=["validation_skipped"]
+                )
+            elif action == BUDGET_EXHAUSTED:
+                validator_response = ValidatorResponse(
+                    is_valid=False,
+                    feedback="Validation not run: call budget exhausted",
+                    issues=["budget_exhausted"]
+                )
+            else:
+                validator_response = self._validate_response(
+                    profile_string, host_country, selector_response, available_features, spans
+                )
+            actions.append(action)
+            for span in spans[first_span:]:
+                span.iteration = iteration + 1
             
-            if validator_response.is_valid or iteration == max_iterations - 1:
-                # Accept final response
+            # Accept the response when valid, out of iterations, or out of budget for a retry
+            finished = validator_response.is_valid or position == len(iterations) - 1 or action == BUDGET_EXHAUSTED
+            if not finished and not budget.try_acquire():
+                actions.append(BUDGET_EXHAUSTED)
+                finished = True
+            
+            if finished:
                 processing_time = int((time.time() - start_time) * 1000)
                 
                 return AssessmentTrace(
-                    agent_type="emotional",
+                    agent_type=self.perspective,
                     host_country=host_country,
                     profile_features=available_features,
-                    prompt_used=prompt,
+                    prompt=PromptText.of(prompt, prefix),
                     selector_iterations=iteration + 1,
                     selector_final_score=selector_response.score,
                     selector_final_reasoning=selector_response.reasoning,
@@ -147,295 +600,456 @@ class EmotionalAgent:
                     is_validated=validator_response.is_valid,
                     assessment_id=assessment_id,
                     timestamp=datetime.now().isoformat(),
-                    processing_time_ms=processing_time
+                    processing_time_ms=processing_time,
+                    llm_calls=spans,
+                    iteration_policy=policy.name,
+                    policy_actions=actions,
+                    fallbacks=_fallback_roles(selector_response, validator_response)
                 )
             
             # Update prompt with validator feedback for next iteration
             prompt = self._update_prompt_with_feedback(prompt, validator_response.feedback)
     
-    def _get_selector_response(self, prompt: str, profile: str, country: str) -> AgentResponse:
-        """Get response from emotional selector agent"""
-        messages = [
-            SystemMessage(content="You are an expert refugee employment assessor following specific guidelines."),
-            HumanMessage(content=prompt)
-        ]
-        
-        try:
-            response = self.llm.invoke(messages)
-            logger.info(f"Emotional selector - Score: {response.score}, Confidence: {response.confidence}")
-            return response
-        except Exception as e:
-            logger.error(f"Emotional selector error: {e}")
-            # Fallback response
-            return AgentResponse(
-                score=5,
-                reasoning="Assessment failed due to technical error. Neutral score assigned.",
-                confidence=0.1
-            )
-    
-    def _validate_response(self, profile: str, response: AgentResponse, 
-                          available_features: List[str]) -> ValidatorResponse:
-        """Validate emotional agent response"""
-        
-        validation_prompt = VALIDATOR_PROMPT_TEMPLATE.format(
-            perspective="emotional",
-            profile=profile,
-            fields=', '.join(available_features),
-            score=response.score,
-            reasoning=response.reasoning
-        )
+    def assess_countries_batched(self, profile_string: str, host_countries: List[str],
+                                 available_features: List[str], max_iterations: int = 3) -> Dict[str, AssessmentTrace]:
+        """
+        Assess every host country with one selector call and one validator call per iteration
         
-        messages = [
-            SystemMessage(content="You are a validation agent ensuring assessment quality and data integrity."),
-            HumanMessage(content=validation_prompt)
-        ]
+        Countries whose assessment the validator rejects are re-asked together on the next
+        iteration with their feedback; accepted countries are finalized as they pass.
         
-        try:
-            validator_response = self.validator_llm.invoke(messages)
-            logger.info(f"Emotional validator - Valid: {validator_response.is_valid}")
-            
-            # Apply lenient validation if score is high with sufficient features
-            if not validator_response.is_valid and response.score >= 6 and len(available_features) >= 5:
-                logger.info("Applying lenient validation override")
-                validator_response.is_valid = True
-                validator_response.feedback += " [Lenient validation applied]"
-            
-            return validator_response
-        except Exception as e:
-            logger.error(f"Emotional validator error: {e}")
-            return ValidatorResponse(
-                is_valid=True,  # Default to valid if validator fails
-                feedback="Validation failed due to technical error",
-                issues=["validator_error"]
-            )
-    
-    def _update_prompt_with_feedback(self, original_prompt: str, feedback: str) -> str:
-        """Update prompt based on validator feedback"""
-        return f"{original_prompt}\n\nVALIDATOR FEEDBACK: {feedback}\nPlease address these concerns in your assessment."
-
-class CulturalAgent:
-    """
-    Cultural perspective agent implementing Selector → Validator pattern
-    """
-    
-    def __init__(self, model_name: str = "llama3"):
-        self.llm = ChatOllama(model=model_name).with_structured_output(AgentResponse)
-        self.validator_llm = ChatOllama(model=model_name).with_structured_output(ValidatorResponse)
-        self.perspective = "cultural"
-    
-    def assess_with_context(self, profile_string: str, host_country: str, 
-                           available_features: List[str], max_iterations: int = 3) -> AssessmentTrace:
-        """Assess refugee from cultural perspective with context awareness"""
+        Returns:
+            Mapping of host country to its AssessmentTrace
+        """
         start_time = time.time()
-        assessment_id = str(uuid.uuid4())
+        assessment_ids = {country: str(uuid.uuid4()) for country in host_countries}
+        traces: Dict[str, AssessmentTrace] = {}
+        pending = list(host_countries)
+        feedback: Dict[str, str] = {}
+        spans: List[LLMCallSpan] = []
+        prefix = self.prompt_prefix(available_features)
         
-        # Generate data-grounded prompt
-        prompt = generate_perspective_specific_prompt(
-            'cultural', profile_string, host_country, available_features
-        )
-        
-        # Selector phase with iterations
         for iteration in range(max_iterations):
-            logger.info(f"Cultural agent - iteration {iteration + 1}")
+            logger.info(f"{self.label} agent (batched, {len(pending)} countries) - iteration {iteration + 1}")
             
-            selector_response = self._get_selector_response(prompt, profile_string, host_country)
-            validator_response = self._validate_response(profile_string, selector_response, available_features)
+            prompt = generate_multi_country_prompt(self.perspective, profile_string, pending, available_features,
+                                                   self.prompt_style, self.prompt_pruning)
+            self._record_pruning(prefix)
+            if feedback:
+                prompt = self._update_prompt_with_country_feedback(prompt, feedback)
             
-            if validator_response.is_valid or iteration == max_iterations - 1:
-                processing_time = int((time.time() - start_time) * 1000)
+            first_span = len(spans)
+            selector_responses = self._get_multi_country_response(prompt, pending, spans, prefix)
+            validator_responses = self._check_grounding(selector_responses, available_features)
+            unchecked = {
+                country: response for country, response in selector_responses.items()
+                if country not in validator_responses
+            }
+            if unchecked:
+                validator_responses.update(self._validate_countries(
+                    profile_string, unchecked, available_features, spans
+                ))
+            for span in spans[first_span:]:
+                span.iteration = iteration + 1
+            
+            retry = []
+            for country in pending:
+                selector_response = selector_responses[country]
+                validator_response = validator_responses[country]
                 
-                return AssessmentTrace(
-                    agent_type="cultural",
-                    host_country=host_country,
-                    profile_features=available_features,
-                    prompt_used=prompt,
-                    selector_iterations=iteration + 1,
-                    selector_final_score=selector_response.score,
-                    selector_final_reasoning=selector_response.reasoning,
-                    selector_confidence=selector_response.normalized_confidence,
-                    validator_feedback=validator_response.feedback,
-                    validator_issues=validator_response.issues,
-                    is_validated=validator_response.is_valid,
-                    assessment_id=assessment_id,
-                    timestamp=datetime.now().isoformat(),
-                    processing_time_ms=processing_time
-                )
+                if validator_response.is_valid or iteration == max_iterations - 1:
+                    traces[country] = AssessmentTrace(
+                        agent_type=self.perspective,
+                        host_country=country,
+                        profile_features=available_features,
+                        prompt=PromptText.of(prompt, prefix),
+                        selector_iterations=iteration + 1,
+                        selector_final_score=selector_response.score,
+                        selector_final_reasoning=selector_response.reasoning,
+                        selector_confidence=selector_response.normalized_confidence,
+                        validator_feedback=validator_response.feedback,
+                        validator_issues=validator_response.issues,
+                        is_validated=validator_response.is_valid,
+                        assessment_id=assessment_ids[country],
+                        timestamp=datetime.now().isoformat(),
+                        processing_time_ms=int((time.time() - start_time) * 1000),
+                        llm_calls=list(spans),
+                        policy_actions=[VALIDATE] * (iteration + 1),
+                        fallbacks=_fallback_roles(selector_response, validator_response)
+                    )
+                else:
+                    retry.append(country)
             
-            prompt = self._update_prompt_with_feedback(prompt, validator_response.feedback)
+            if not retry:
+                break
+            
+            feedback = {country: validator_responses[country].feedback for country in retry}
+            pending = retry
+        
+        return traces
     
-    def _get_selector_response(self, prompt: str, profile: str, country: str) -> AgentResponse:
-        """Get response from cultural selector agent"""
-        messages = [
-            SystemMessage(content="You are an expert refugee employment assessor following specific guidelines."),
-            HumanMessage(content=prompt)
-        ]
+    def _get_multi_country_response(self, prompt: str, host_countries: List[str],
+                                    spans: Optional[List[LLMCallSpan]] = None,
+                                    prefix: Optional[str] = None) -> Dict[str, AgentResponse]:
+        """Get one selector response per host country from a single multi-country call"""
+        messages = self._selector_messages(prompt, prefix)
         
+        responses: Dict[str, AgentResponse] = {}
         try:
-            response = self.llm.invoke(messages)
-            logger.info(f"Cultural selector - Score: {response.score}, Confidence: {response.confidence}")
-            return response
+            response = self._invoke("multi_country_selector", messages, self.multi_selector_schema, spans,
+                                    self._scaled(self.output_budget.selector_max_tokens, len(host_countries)))
+            by_name = {_country_key(item.country): item for item in response.assessments}
+            for country in host_countries:
+                item = by_name.get(_country_key(country))
+                if item is not None:
+                    responses[country] = AgentResponse(
+                        score=item.score, reasoning=self._cap_text(item.reasoning, "reasoning"),
+                        confidence=item.confidence
+                    )
+            logger.info(f"{self.label} batched selector - Scores: "
+                        f"{ {country: r.score for country, r in responses.items()} }")
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            logger.error(f"Cultural selector error: {e}")
-            return AgentResponse(score=5, reasoning="Technical error occurred", confidence=0.1)
-    
-    def _validate_response(self, profile: str, response: AgentResponse, 
-                          available_features: List[str]) -> ValidatorResponse:
-        """Validate cultural agent response"""
+            logger.error(f"{self.label} batched selector error: {e}")
         
-        validation_prompt = VALIDATOR_PROMPT_TEMPLATE.format(
-            perspective="cultural",
+        for country in host_countries:
+            if country not in responses:
+                logger.warning(f"{self.label} batched selector returned no assessment for {country}")
+                self._record_fallback("multi_country_selector", f"no assessment for {country}")
+                responses[country] = FallbackResponse(
+                    score=5,
+                    reasoning=self.config.selector_fallback_reasoning,
+                    confidence=0.1
+                )
+        
+        return responses
+    
+    def _validate_countries(self, profile: str, responses: Dict[str, AgentResponse],
+                            available_features: List[str],
+                            spans: Optional[List[LLMCallSpan]] = None) -> Dict[str, ValidatorResponse]:
+        """Validate several host-country responses of this perspective with one validator call"""
+        validation_prompt = MULTI_COUNTRY_VALIDATOR_PROMPT_TEMPLATE.format(
+            perspective=self.perspective,
             profile=profile,
             fields=', '.join(available_features),
-            score=response.score,
-            reasoning=response.reasoning
+            assessments=format_country_assessments(
+                {country: (response.score, response.reasoning) for country, response in responses.items()}
+            )
         )
         
         messages = [
-            SystemMessage(content="Validate cultural assessments for accuracy and data integrity."),
+            SystemMessage(content=self.config.validator_system_message),
             HumanMessage(content=validation_prompt)
         ]
         
         try:
-            validator_response = self.validator_llm.invoke(messages)
-            logger.info(f"Cultural validator - Valid: {validator_response.is_valid}")
-            
-            # Apply lenient validation if score is high with sufficient features
-            if not validator_response.is_valid and response.score >= 6 and len(available_features) >= 5:
-                logger.info("Applying lenient validation override")
-                validator_response.is_valid = True
-                validator_response.feedback += " [Lenient validation applied]"
-            
-            return validator_response
+            validator_response = self._invoke(
+                "multi_country_validator", messages, self.multi_validator_schema, spans,
+                self._scaled(self.output_budget.validator_max_tokens, len(responses))
+            )
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            logger.error(f"Cultural validator error: {e}")
-            return ValidatorResponse(is_valid=True, feedback="Validation error", issues=["validator_error"])
-    
-    def _update_prompt_with_feedback(self, original_prompt: str, feedback: str) -> str:
-        """Update prompt based on validator feedback"""
-        return f"{original_prompt}\n\nVALIDATOR FEEDBACK: {feedback}\nPlease address these concerns."
-
-class EthicalAgent:
-    """
-    Ethical perspective agent implementing Selector → Validator pattern
-    """
-    
-    def __init__(self, model_name: str = "llama3"):
-        self.llm = ChatOllama(model=model_name).with_structured_output(AgentResponse)
-        self.validator_llm = ChatOllama(model=model_name).with_structured_output(ValidatorResponse)
-        self.perspective = "ethical"
-    
-    def assess_with_context(self, profile_string: str, host_country: str, 
-                           available_features: List[str], max_iterations: int = 3) -> AssessmentTrace:
-        """Assess refugee from ethical perspective with context awareness"""
-        start_time = time.time()
-        assessment_id = str(uuid.uuid4())
-        
-        # Generate data-grounded prompt
-        prompt = generate_perspective_specific_prompt(
-            'ethical', profile_string, host_country, available_features
-        )
+            logger.error(f"{self.label} batched validator error: {e}")
+            self._record_fallback("multi_country_validator", str(e))
+            return {
+                country: ValidatorResponse(
+                    is_valid=True,  # Default to valid if validator fails
+                    feedback=self.config.validator_fallback_feedback,
+                    issues=["validator_error"]
+                )
+                for country in responses
+            }
         
-        # Selector phase with iterations
-        for iteration in range(max_iterations):
-            logger.info(f"Ethical agent - iteration {iteration + 1}")
-            
-            selector_response = self._get_selector_response(prompt, profile_string, host_country)
-            validator_response = self._validate_response(profile_string, selector_response, available_features)
-            
-            if validator_response.is_valid or iteration == max_iterations - 1:
-                processing_time = int((time.time() - start_time) * 1000)
-                
-                return AssessmentTrace(
-                    agent_type="ethical",
-                    host_country=host_country,
-                    profile_features=available_features,
-                    prompt_used=prompt,
-                    selector_iterations=iteration + 1,
-                    selector_final_score=selector_response.score,
-                    selector_final_reasoning=selector_response.reasoning,
-                    selector_confidence=selector_response.normalized_confidence,
-                    validator_feedback=validator_response.feedback,
-                    validator_issues=validator_response.issues,
-                    is_validated=validator_response.is_valid,
-                    assessment_id=assessment_id,
-                    timestamp=datetime.now().isoformat(),
-                    processing_time_ms=processing_time
+        by_name = {_country_key(verdict.country): verdict for verdict in validator_response.verdicts}
+        verdicts: Dict[str, ValidatorResponse] = {}
+        for country, response in responses.items():
+            verdict = by_name.get(_country_key(country))
+            if verdict is None:
+                verdict_response = ValidatorResponse(
+                    is_valid=False,
+                    feedback="Validator returned no verdict for this country",
+                    issues=["missing_verdict"]
                 )
-            
-            prompt = self._update_prompt_with_feedback(prompt, validator_response.feedback)
+            else:
+                verdict_response = ValidatorResponse(
+                    is_valid=verdict.is_valid, feedback=self._cap_text(verdict.feedback, "feedback"),
+                    issues=verdict.issues
+                )
+            logger.info(f"{self.label} batched validator - {country} Valid: {verdict_response.is_valid}")
+            verdicts[country] = self._apply_lenient_override(verdict_response, response, available_features)
+        
+        return verdicts
     
-    def _get_selector_response(self, prompt: str, profile: str, country: str) -> AgentResponse:
-        """Get response from ethical selector agent"""
-        messages = [
-            SystemMessage(content="You are an expert refugee employment assessor following specific guidelines."),
-            HumanMessage(content=prompt)
-        ]
+    def _update_prompt_with_country_feedback(self, original_prompt: str, feedback: Dict[str, str]) -> str:
+        """Append per-country validator feedback to a multi-country prompt"""
+        lines = "\n".join(f"- {country}: {text}" for country, text in feedback.items())
+        return f"{original_prompt}\n\nVALIDATOR FEEDBACK:\n{lines}\n{self.config.feedback_instruction}"
+    
+    def _get_selector_response(self, prompt: str, profile: str, country: str,
+                               spans: Optional[List[LLMCallSpan]] = None,
+                               prefix: Optional[str] = None) -> AgentResponse:
+        """Get response from the selector agent"""
+        messages = self._selector_messages(prompt, prefix)
         
         try:
-            response = self.llm.invoke(messages)
-            logger.info(f"Ethical selector - Score: {response.score}, Confidence: {response.confidence}")
+            response = self._invoke("selector", messages, self.selector_schema, spans,
+                                    self.output_budget.selector_max_tokens)
+            response.reasoning = self._cap_text(response.reasoning, "reasoning")
+            logger.info(f"{self.label} selector - Score: {response.score}, Confidence: {response.confidence}")
             return response
+        except CircuitOpenError:
+            # Fail the refugee instead of recording a fallback score; the batch requeues it
+            raise
         except Exception as e:
-            logger.error(f"Ethical selector error: {e}")
-            return AgentResponse(score=5, reasoning="Technical error occurred", confidence=0.1)
+            logger.error(f"{self.label} selector error: {e}")
+            self._record_fallback("selector", str(e))
+            # Fallback response
+            return FallbackResponse(
+                score=5,
+                reasoning=self.config.selector_fallback_reasoning,
+                confidence=0.1
+            )
     
-    def _validate_response(self, profile: str, response: AgentResponse, 
-                          available_features: List[str]) -> ValidatorResponse:
-        """Validate ethical agent response"""
+    def _validate_response(self, profile: str, host_country: str, response: AgentResponse, 
+                          available_features: List[str],
+                          spans: Optional[List[LLMCallSpan]] = None) -> ValidatorResponse:
+        """
+        Validate the selector response; the prompt names the host country, so the
+        response cache never hands one country's verdict to another
+        """
         
         validation_prompt = VALIDATOR_PROMPT_TEMPLATE.format(
-            perspective="ethical",
+            perspective=self.perspective,
             profile=profile,
             fields=', '.join(available_features),
+            host_country=host_country,
             score=response.score,
             reasoning=response.reasoning
         )
         
         messages = [
-            SystemMessage(content="Validate ethical assessments for accuracy and systemic considerations."),
+            SystemMessage(content=self.config.validator_system_message),
             HumanMessage(content=validation_prompt)
         ]
         
         try:
-            validator_response = self.validator_llm.invoke(messages)
-            logger.info(f"Ethical validator - Valid: {validator_response.is_valid}")
-            
-            # Apply lenient validation if score is high with sufficient features
-            if not validator_response.is_valid and response.score >= 6 and len(available_features) >= 5:
-                logger.info("Applying lenient validation override")
-                validator_response.is_valid = True
-                validator_response.feedback += " [Lenient validation applied]"
+            validator_response = self._invoke("validator", messages, self.validator_schema, spans,
+                                              self.output_budget.validator_max_tokens)
+            validator_response.feedback = self._cap_text(validator_response.feedback, "feedback")
+            logger.info(f"{self.label} validator - Valid: {validator_response.is_valid}")
             
-            return validator_response
+            return self._apply_lenient_override(validator_response, response, available_features)
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            logger.error(f"Ethical validator error: {e}")
-            return ValidatorResponse(is_valid=True, feedback="Validation error", issues=["validator_error"])
+            logger.error(f"{self.label} validator error: {e}")
+            self._record_fallback("validator", str(e))
+            return ValidatorResponse(
+                is_valid=True,  # Default to valid if validator fails
+                feedback=self.config.validator_fallback_feedback,
+                issues=["validator_error"]
+            )
+    
+    def _check_grounding(self, responses: Dict[str, AgentResponse],
+                         available_features: List[str]) -> Dict[str, ValidatorResponse]:
+        """
+        Run the local grounding check on host-country responses
+        
+        Returns:
+            Verdicts for the responses that failed the check; the rest still need the LLM validator
+        """
+        if self.grounding_checker is None:
+            return {}
+        
+        countries = list(responses)
+        results = self.grounding_checker.check_batch(
+            (responses[country].reasoning, available_features) for country in countries
+        )
+        
+        verdicts: Dict[str, ValidatorResponse] = {}
+        for country, result in zip(countries, results):
+            if result.is_grounded:
+                continue
+            logger.info(f"{self.label} grounding check - {country} rejected: {', '.join(result.issues)}")
+            if self.metrics is not None:
+                self.metrics.grounding_rejected(self.perspective, result.issues)
+            verdicts[country] = self._apply_lenient_override(
+                ValidatorResponse(is_valid=False, feedback=result.feedback, issues=result.issues),
+                responses[country], available_features
+            )
+        return verdicts
+    
+    def _apply_lenient_override(self, validator_response: ValidatorResponse, response: AgentResponse,
+                                available_features: List[str]) -> ValidatorResponse:
+        """Accept a rejected assessment if the score is high with sufficient features"""
+        config = self.config
+        if not validator_response.is_valid and self.metrics is not None:
+            self.metrics.validator_rejected(self.perspective)
+        
+        if (not validator_response.is_valid and config.lenient_min_score is not None
+                and response.score >= config.lenient_min_score
+                and len(available_features) >= config.lenient_min_features):
+            logger.info("Applying lenient validation override")
+            validator_response.is_valid = True
+            validator_response.feedback += " [Lenient validation applied]"
+            if self.metrics is not None:
+                self.metrics.lenient_override(self.perspective, response.score, len(available_features))
+        
+        return validator_response
+    
+    @staticmethod
+    def _scaled(max_tokens: Optional[int], countries: int) -> Optional[int]:
+        """Per-assessment token cap scaled to a multi-country call"""
+        return max_tokens * max(countries, 1) if max_tokens is not None else None
+    
+    def _cap_text(self, text: str, kind: str) -> str:
+        """Cut reasoning or feedback to the budget's character cap, for backends that ignore maxLength"""
+        max_chars = (self.output_budget.reasoning_max_chars if kind == "reasoning"
+                     else self.output_budget.feedback_max_chars)
+        if max_chars is None or len(text) <= max_chars:
+            return text
+        return text[:max_chars].rsplit(" ", 1)[0] if " " in text[:max_chars] else text[:max_chars]
+    
+    def _record_fallback(self, role: str, reason: str):
+        """Count a fallback response used in place of a failed or incomplete call"""
+        if self.metrics is not None:
+            self.metrics.fallback(self.perspective, role, reason)
     
     def _update_prompt_with_feedback(self, original_prompt: str, feedback: str) -> str:
         """Update prompt based on validator feedback"""
-        return f"{original_prompt}\n\nVALIDATOR FEEDBACK: {feedback}\nPlease address these concerns."
+        return f"{original_prompt}\n\nVALIDATOR FEEDBACK: {feedback}\n{self.config.feedback_instruction}"
+
+class EmotionalAgent(PerspectiveAgent):
+    """Emotional perspective agent (kept for backward compatibility)"""
+    
+    def __init__(self, model_name: str = "llama3", cache: Optional[ResponseCache] = None,
+                 backend: Optional[LLMBackend] = None, prompt_layout: str = "legacy",
+                 monitor: Optional[PromptCacheMonitor] = None, metrics: Optional[PipelineMetrics] = None,
+                 **kwargs):
+        super().__init__("emotional", model_name, cache=cache, backend=backend,
+                         prompt_layout=prompt_layout, monitor=monitor, metrics=metrics, **kwargs)
+
+class CulturalAgent(PerspectiveAgent):
+    """Cultural perspective agent (kept for backward compatibility)"""
+    
+    def __init__(self, model_name: str = "llama3", cache: Optional[ResponseCache] = None,
+                 backend: Optional[LLMBackend] = None, prompt_layout: str = "legacy",
+                 monitor: Optional[PromptCacheMonitor] = None, metrics: Optional[PipelineMetrics] = None,
+                 **kwargs):
+        super().__init__("cultural", model_name, cache=cache, backend=backend,
+                         prompt_layout=prompt_layout, monitor=monitor, metrics=metrics, **kwargs)
+
+class EthicalAgent(PerspectiveAgent):
+    """Ethical perspective agent (kept for backward compatibility)"""
+    
+    def __init__(self, model_name: str = "llama3", cache: Optional[ResponseCache] = None,
+                 backend: Optional[LLMBackend] = None, prompt_layout: str = "legacy",
+                 monitor: Optional[PromptCacheMonitor] = None, metrics: Optional[PipelineMetrics] = None,
+                 **kwargs):
+        super().__init__("ethical", model_name, cache=cache, backend=backend,
+                         prompt_layout=prompt_layout, monitor=monitor, metrics=metrics, **kwargs)
 
 class MultiPerspectiveAnalyzer:
     """
     Multi-agent coordinator implementing assessment workflow
     """
     
-    def __init__(self, model_name: str = "llama3"):
-        # Initialize agents
-        self.emotional_agent = EmotionalAgent(model_name)
-        self.cultural_agent = CulturalAgent(model_name)
-        self.ethical_agent = EthicalAgent(model_name)
+    def __init__(self, model_name: str = "llama3", max_concurrency: int = 1,
+                 cache: Optional[ResponseCache] = None,
+                 perspective_weights: Optional[Dict[str, float]] = None,
+                 batch_countries: bool = False, prompt_layout: str = "legacy",
+                 keep_alive: Optional[str] = None, num_ctx: Optional[int] = None,
+                 backend: Optional[LLMBackend] = None, metrics: Optional[PipelineMetrics] = None,
+                 iteration_policy: Optional[IterationPolicy] = None, group_validation: bool = False,
+                 grounding_checker: Optional[GroundingChecker] = None, coalesce_requests: bool = False,
+                 endpoints: Optional[List[str]] = None, warm_up: bool = True,
+                 resilience: Optional[ResilienceConfig] = None, prompt_style: str = "full",
+                 output_budgets: Optional[Dict[str, OutputBudget]] = None, prompt_pruning: bool = False):
+        # Shared LLM response cache (None to always call the model)
+        self.cache = cache
         
-        # Initialize profile builder
-        self.profile_builder = ProfileBuilder(min_age=15, min_features_required=2)
+        # Selector message layout and backend prefill statistics
+        self.prompt_layout = prompt_layout
+        self.prompt_monitor = PromptCacheMonitor()
+        
+        # Selector prompt style ("compact" drops the Markdown report instructions)
+        self.prompt_style = prompt_style
+        
+        # Keep only the guideline fragments for each profile's fields and the agent's perspective
+        self.prompt_pruning = prompt_pruning
+        
+        # Live metrics and event log (None to disable)
+        self.metrics = metrics
+        
+        # Score all host countries in one selector call per perspective
+        self.batch_countries = batch_countries
+        
+        # Score countries separately but validate each perspective's countries in one call
+        self.group_validation = group_validation and not batch_countries
+        if group_validation and batch_countries:
+            logger.warning("Grouped validation is implied by batched mode; --group-validation ignored")
+        
+        # Local grounding pre-validator shared by the agents (None to disable)
+        self.grounding_checker = grounding_checker
+        
+        # Validation skipping, divergence retries and call budget (per-country mode only)
+        self.iteration_policy = iteration_policy or POLICIES["fixed"]
+        if batch_countries and self.iteration_policy.name != "fixed":
+            logger.warning(f"Iteration policy '{self.iteration_policy.name}' only applies to per-country "
+                           f"assessments; batched mode validates every iteration")
         
-        # Assessment weights
-        self.weights = {
+        # Assessment weights; one agent is created per weighted perspective
+        self.weights = perspective_weights or {
             "emotional": 0.3,
             "cultural": 0.4,
             "ethical": 0.3
         }
         
+        # Concurrency limit for country x perspective assessments (1 = sequential)
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._pool_thread = threading.local()
+        
+        # Initialize agents on one shared backend (default: pooled Ollama client, or a
+        # least-outstanding pool over several Ollama servers when endpoints are given)
+        if backend is None and endpoints:
+            backend = EndpointPool([
+                OllamaBackend(model_name, max_connections=max(self.max_concurrency, 2), keep_alive=keep_alive,
+                              num_ctx=num_ctx, base_url=url)
+                for url in endpoints
+            ])
+        self.backend = backend or OllamaBackend(
+            model_name, max_connections=max(self.max_concurrency, 2), keep_alive=keep_alive, num_ctx=num_ctx
+        )
+        
+        # Preload the model on every pool endpoint before the first assessment
+        if warm_up and isinstance(self.backend, EndpointPool):
+            self.backend.warm_up()
+        
+        # Deadlines, retries with backoff, hedging and the circuit breaker
+        self.resilient = ResilientBackend(self.backend, resilience)
+        self.circuit_breaker = self.resilient.breaker
+        
+        # Identical requests in flight at the same time share one backend call. Off by default:
+        # they then share one sampled response, unlike a sequential run
+        self.coalescer = CoalescingBackend(self.resilient) if coalesce_requests else None
+        
+        self.agents = {
+            perspective: PerspectiveAgent(perspective, model_name, cache=cache,
+                                          backend=self.coalescer or self.resilient,
+                                          prompt_layout=prompt_layout, monitor=self.prompt_monitor,
+                                          metrics=metrics, grounding_checker=grounding_checker,
+                                          prompt_style=prompt_style, prompt_pruning=prompt_pruning,
+                                          output_budget=(output_budgets or {}).get(perspective))
+            for perspective in self.weights
+        }
+        
+        # Initialize profile builder
+        self.profile_builder = ProfileBuilder(min_age=15, min_features_required=2)
+        
         self.host_countries = ["United States", "Canada", "Germany", "Sweden", "Australia"]
     
     def assess_refugee_comprehensive(self, row: pd.Series, host_countries: List[str] = None,
@@ -443,19 +1057,33 @@ class MultiPerspectiveAnalyzer:
         """
         Comprehensive assessment of a single refugee across all host countries
         """
-        start_time = time.time()
+        profile_result = self.build_profile(row)
         
-        if host_countries is None:
-            host_countries = self.host_countries
+        if not profile_result.is_valid:
+            return None
         
-        # Build and validate profile
+        return self.assess_profile(profile_result, host_countries, max_iterations)
+    
+    def build_profile(self, row: pd.Series) -> ProfileResult:
+        """Build and validate a profile, logging the reason when it is rejected"""
         profile_result = self.profile_builder.build_profile(row)
         
         if not profile_result.is_valid:
             available_fields = list(profile_result.available_features.keys()) if hasattr(profile_result, 'available_features') else []
             logger.warning(f"Profile rejected: {profile_result.rejection_reason}")
             logger.warning(f"Available fields: {available_fields} (count: {len(available_fields)})")
-            return None
+        
+        return profile_result
+    
+    def assess_profile(self, profile_result: ProfileResult, host_countries: List[str] = None,
+                       max_iterations: int = 3) -> RefugeeAssessment:
+        """
+        Assess an already validated profile across all host countries
+        """
+        start_time = time.time()
+        
+        if host_countries is None:
+            host_countries = self.host_countries
         
         logger.info(f"Processing validated profile: {profile_result.profile_string[:100]}...")
         
@@ -472,36 +1100,24 @@ class MultiPerspectiveAnalyzer:
         country_scores = {}
         all_traces = []
         
+        budget = CallBudget(self.iteration_policy.call_budget)
+        traces = self._run_assessments(host_countries, profile_with_codes, available_features, max_iterations, budget)
+        if not self.batch_countries:
+            self._retry_divergent(traces, host_countries, profile_with_codes, available_features, budget)
+        
         for country in host_countries:
-            logger.info(f"Assessing for host country: {country}")
-            
-            # Get assessments from all three perspectives using field-coded profile
-            emotional_trace = self.emotional_agent.assess_with_context(
-                profile_with_codes, country, available_features, max_iterations
-            )
-            cultural_trace = self.cultural_agent.assess_with_context(
-                profile_with_codes, country, available_features, max_iterations
-            )
-            ethical_trace = self.ethical_agent.assess_with_context(
-                profile_with_codes, country, available_features, max_iterations
-            )
+            country_traces = [traces[(country, perspective)] for perspective in self.agents]
             
             # Calculate weighted score
-            weighted_score = (
-                emotional_trace.selector_final_score * self.weights["emotional"] +
-                cultural_trace.selector_final_score * self.weights["cultural"] +
-                ethical_trace.selector_final_score * self.weights["ethical"]
+            weighted_score = sum(
+                trace.selector_final_score * self.weights[trace.agent_type] for trace in country_traces
             )
             
-            country_scores[country] = {
-                "emotional": emotional_trace.selector_final_score,
-                "cultural": cultural_trace.selector_final_score,
-                "ethical": ethical_trace.selector_final_score,
-                "weighted": round(weighted_score, 2)
-            }
+            country_scores[country] = {trace.agent_type: trace.selector_final_score for trace in country_traces}
+            country_scores[country]["weighted"] = round(weighted_score, 2)
             
             # Store traces
-            all_traces.extend([emotional_trace, cultural_trace, ethical_trace])
+            all_traces.extend(country_traces)
         
         # Determine recommendation
         best_country = max(country_scores.keys(), key=lambda c: country_scores[c]["weighted"])
@@ -526,6 +1142,415 @@ class MultiPerspectiveAnalyzer:
         
         logger.info(f"Assessment complete: {best_country} ({recommendation_score:.1f}/10)")
         return assessment
+    
+    def _run_assessments(self, host_countries: List[str], profile_with_codes: str,
+                         available_features: List[str], max_iterations: int,
+                         budget: Optional[CallBudget] = None) -> Dict[Tuple[str, str], AssessmentTrace]:
+        """
+        Run every (country, perspective) assessment, keyed by job so merge order matches
+        the sequential path. In batched mode each perspective scores all countries at once.
+        """
+        if self.batch_countries:
+            def run_perspective(perspective: str) -> Dict[str, AssessmentTrace]:
+                logger.info(f"Assessing all host countries ({perspective}, batched)")
+                return self.agents[perspective].assess_countries_batched(
+                    profile_with_codes, host_countries, available_features, max_iterations
+                )
+            
+            perspectives = list(self.agents)
+            results = self._map(run_perspective, perspectives)
+            return {
+                (country, perspective): country_traces[country]
+                for perspective, country_traces in zip(perspectives, results)
+                for country in host_countries
+            }
+        
+        if self.group_validation:
+            return self._run_grouped_validation(
+                host_countries, profile_with_codes, available_features, max_iterations, budget or CallBudget()
+            )
+        
+        def run(job: Tuple[str, str]) -> AssessmentTrace:
+            country, perspective = job
+            logger.info(f"Assessing for host country: {country} ({perspective})")
+            return self.agents[perspective].assess_with_context(
+                profile_with_codes, country, available_features, max_iterations,
+                policy=self.iteration_policy, budget=budget
+            )
+        
+        jobs = [(country, perspective) for country in host_countries for perspective in self.agents]
+        return dict(zip(jobs, self._map(run, jobs)))
+    
+    def _run_grouped_validation(self, host_countries: List[str], profile_with_codes: str,
+                                available_features: List[str], max_iterations: int,
+                                budget: CallBudget) -> Dict[Tuple[str, str], AssessmentTrace]:
+        """
+        Per-country selectors with one validator call per perspective and iteration
+        
+        Each round runs the selector for every pending (country, perspective) job, then
+        validates each perspective's pending countries together. Verdicts are per country,
+        so rejected countries retry with their own feedback exactly as in per-country mode,
+        and a lone pending country uses the single-country validator.
+        """
+        policy = self.iteration_policy
+        start_time = time.time()
+        jobs = [(country, perspective) for country in host_countries for perspective in self.agents]
+        prompts = {
+            (country, perspective): generate_perspective_specific_prompt(
+                perspective, profile_with_codes, country, available_features, self.agents[perspective].prompt_style,
+                self.agents[perspective].prompt_pruning
+            )
+            for country, perspective in jobs
+        }
+        prefixes = {perspective: agent.prompt_prefix(available_features) for perspective, agent in self.agents.items()}
+        for _, perspective in jobs:
+            self.agents[perspective]._record_pruning(prefixes[perspective])
+        spans: Dict[Tuple[str, str], List[LLMCallSpan]] = {job: [] for job in jobs}
+        actions: Dict[Tuple[str, str], List[str]] = {job: [] for job in jobs}
+        assessment_ids = {job: str(uuid.uuid4()) for job in jobs}
+        traces: Dict[Tuple[str, str], AssessmentTrace] = {}
+        
+        # The first selector call of every assessment is made whatever the budget
+        budget.force_acquire(len(jobs))
+        pending = jobs
+        
+        for iteration in range(max_iterations):
+            logger.info(f"Grouped validation - iteration {iteration + 1} ({len(pending)} assessments)")
+            
+            def select(job: Tuple[str, str]) -> AgentResponse:
+                country, perspective = job
+                round_spans: List[LLMCallSpan] = []
+                response = self.agents[perspective]._get_selector_response(
+                    prompts[job], profile_with_codes, country, round_spans, prefixes[perspective]
+                )
+                for span in round_spans:
+                    span.iteration = iteration + 1
+                spans[job].extend(round_spans)
+                return response
+            
+            selector_responses = dict(zip(pending, self._map(select, pending)))
+            
+            # Decide per assessment whether it joins its perspective's validator group
+            verdicts: Dict[Tuple[str, str], ValidatorResponse] = {}
+            groups: Dict[str, Dict[str, AgentResponse]] = {}
+            grounding: Dict[str, Dict[str, ValidatorResponse]] = {}
+            for perspective in self.agents:
+                perspective_responses = {
+                    country: selector_responses[(country, job_perspective)]
+                    for country, job_perspective in pending if job_perspective == perspective
+                }
+                grounding[perspective] = self.agents[perspective]._check_grounding(
+                    perspective_responses, available_features
+                )
+            
+            for job in pending:
+                country, perspective = job
+                if country in grounding[perspective]:
+                    verdicts[job] = grounding[perspective][country]
+                    actions[job].append(GROUNDING_REJECTED)
+                    continue
+                
+                action = policy.validation_action(
+                    selector_responses[job].normalized_confidence, len(available_features),
+                    f"{perspective}|{country}|{profile_with_codes}|{iteration}"
+                )
+                if action == SKIP_VALIDATION:
+                    verdicts[job] = ValidatorResponse(
+                        is_valid=True,
+                        feedback=f"Validation skipped by the {policy.name} policy (high-confidence response)",
+                        issues=["validation_skipped"]
+                    )
+                else:
+                    groups.setdefault(perspective, {})[country] = selector_responses[job]
+                actions[job].append(action)
+            
+            def validate(perspective: str) -> Dict[str, ValidatorResponse]:
+                agent = self.agents[perspective]
+                responses = groups[perspective]
+                group_spans: List[LLMCallSpan] = []
+                exhausted = not budget.try_acquire()
+                if exhausted:
+                    result = {
+                        country: ValidatorResponse(
+                            is_valid=False,
+                            feedback="Validation not run: call budget exhausted",
+                            issues=["budget_exhausted"]
+                        )
+                        for country in responses
+                    }
+                elif len(responses) == 1:
+                    country, response = next(iter(responses.items()))
+                    result = {country: agent._validate_response(
+                        profile_with_codes, country, response, available_features, group_spans
+                    )}
+                else:
+                    result = agent._validate_countries(profile_with_codes, responses, available_features, group_spans)
+                
+                for span in group_spans:
+                    span.iteration = iteration + 1
+                for country in responses:
+                    spans[(country, perspective)].extend(group_spans)
+                    if exhausted:
+                        actions[(country, perspective)][-1] = BUDGET_EXHAUSTED
+                return result
+            
+            perspectives = list(groups)
+            for perspective, result in zip(perspectives, self._map(validate, perspectives)):
+                for country, verdict in result.items():
+                    verdicts[(country, perspective)] = verdict
+            
+            retry = []
+            for job in pending:
+                country, perspective = job
+                selector_response = selector_responses[job]
+                validator_response = verdicts[job]
+                
+                # Accept the response when valid, out of iterations, or out of budget for a retry
+                finished = (validator_response.is_valid or iteration == max_iterations - 1
+                            or actions[job][-1] == BUDGET_EXHAUSTED)
+                if not finished and not budget.try_acquire():
+                    actions[job].append(BUDGET_EXHAUSTED)
+                    finished = True
+                
+                if not finished:
+                    prompts[job] = self.agents[perspective]._update_prompt_with_feedback(
+                        prompts[job], validator_response.feedback
+                    )
+                    retry.append(job)
+                    continue
+                
+                traces[job] = AssessmentTrace(
+                    agent_type=perspective,
+                    host_country=country,
+                    profile_features=available_features,
+                    prompt=PromptText.of(prompts[job], prefixes[perspective]),
+                    selector_iterations=iteration + 1,
+                    selector_final_score=selector_response.score,
+                    selector_final_reasoning=selector_response.reasoning,
+                    selector_confidence=selector_response.normalized_confidence,
+                    validator_feedback=validator_response.feedback,
+                    validator_issues=validator_response.issues,
+                    is_validated=validator_response.is_valid,
+                    assessment_id=assessment_ids[job],
+                    timestamp=datetime.now().isoformat(),
+                    processing_time_ms=int((time.time() - start_time) * 1000),
+                    llm_calls=spans[job],
+                    iteration_policy=policy.name,
+                    policy_actions=actions[job],
+                    fallbacks=_fallback_roles(selector_response, validator_response)
+                )
+            
+            if not retry:
+                break
+            pending = retry
+        
+        return traces
+    
+    def _retry_divergent(self, traces: Dict[Tuple[str, str], AssessmentTrace], host_countries: List[str],
+                         profile_with_codes: str, available_features: List[str], budget: CallBudget):
+        """
+        Give unvalidated assessments extra iterations in host countries where the
+        perspectives disagree by at least the policy's divergence threshold
+        """
+        policy = self.iteration_policy
+        preliminary = {
+            country: {perspective: traces[(country, perspective)].selector_final_score for perspective in self.agents}
+            for country in host_countries
+        }
+        
+        jobs = []
+        for country in policy.diverging_countries(preliminary):
+            for perspective in self.agents:
+                if not traces[(country, perspective)].is_validated and budget.try_acquire():
+                    jobs.append((country, perspective))
+        if not jobs:
+            return
+        
+        logger.info(f"Divergent scores: re-assessing {len(jobs)} unvalidated assessments")
+        
+        def run(job: Tuple[str, str]) -> AssessmentTrace:
+            country, perspective = job
+            return self.agents[perspective].continue_assessment(
+                traces[job], profile_with_codes, available_features,
+                policy.divergence_extra_iterations, policy, budget
+            )
+        
+        traces.update(zip(jobs, self._map(run, jobs)))
+    
+    def _map(self, fn, items: List[Any]) -> List[Any]:
+        """
+        Apply fn to items, fanning out over a bounded thread pool when max_concurrency > 1;
+        results come back in item order either way
+        
+        Batch workers share the pool, so it is created under a lock. A call made from one
+        of the pool's own threads runs inline: waiting on the pool from inside it could
+        leave no free worker for the inner tasks.
+        """
+        if self.max_concurrency == 1 or getattr(self._pool_thread, "active", False):
+            return [fn(item) for item in items]
+        
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="assessment"
+                )
+            executor = self._executor
+        
+        def run(item: Any) -> Any:
+            self._pool_thread.active = True
+            try:
+                return fn(item)
+            finally:
+                self._pool_thread.active = False
+        
+        futures = [executor.submit(run, item) for item in items]
+        return [future.result() for future in futures]
+    
+    def close(self):
+        """Shut down the assessment thread pool, if one was started, and the backend"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.backend.close()
+
+class _SpanStatistics:
+    """Measures of one group's backend calls, kept for the summary's percentiles"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.retries = 0
+        self.wall_time_ms: List[float] = []
+        self.prompt_tokens: List[int] = []
+        self.completion_tokens: List[int] = []
+        self.time_to_first_token_ms: List[float] = []
+    
+    def add(self, span: LLMCallSpan):
+        self.calls += 1
+        self.cache_hits += span.cache_hit
+        self.errors += span.error is not None
+        self.retries += span.iteration > 1
+        self.wall_time_ms.append(span.wall_time_ms)
+        if span.prompt_tokens is not None:
+            self.prompt_tokens.append(span.prompt_tokens)
+        if span.completion_tokens is not None:
+            self.completion_tokens.append(span.completion_tokens)
+        if span.time_to_first_token_ms is not None:
+            self.time_to_first_token_ms.append(span.time_to_first_token_ms)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Call count, cache hit rate, errors and p50/p95/max of each span measure"""
+        def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+            if not values:
+                return None
+            return {
+                "p50": round(float(np.percentile(values, 50)), 3),
+                "p95": round(float(np.percentile(values, 95)), 3),
+                "max": round(float(max(values)), 3)
+            }
+        
+        return {
+            "calls": self.calls,
+            "cache_hit_rate": round(self.cache_hits / self.calls, 3) if self.calls else 0.0,
+            "errors": self.errors,
+            "retries": self.retries,
+            "wall_time_ms": percentiles(self.wall_time_ms),
+            "prompt_tokens": percentiles(self.prompt_tokens),
+            "completion_tokens": percentiles(self.completion_tokens),
+            "time_to_first_token_ms": percentiles(self.time_to_first_token_ms)
+        }
+
+class RunStatistics:
+    """
+    LLM call and iteration policy statistics, updated as each refugee's assessment
+    finishes, so the summary does not need the assessments kept in memory
+    
+    Batched calls appear in the trace of every country they covered, so they are
+    counted once per perspective but once per country in the country breakdown.
+    Refugees resumed from the journal have no call spans; they are only counted.
+    """
+    
+    def __init__(self):
+        self.refugees = 0
+        self.resumed_refugees = 0
+        self.assessments = 0
+        self.validated = 0
+        self.iterations = 0
+        self.fallbacks = 0
+        self.actions: Dict[str, int] = {}
+        self.call_ids: set = set()
+        self.perspective_call_ids: set = set()
+        self.by_perspective: Dict[str, Dict[str, _SpanStatistics]] = {}
+        self.by_country: Dict[str, Dict[str, _SpanStatistics]] = {}
+    
+    @classmethod
+    def of(cls, assessments: List[RefugeeAssessment]) -> "RunStatistics":
+        statistics = cls()
+        for assessment in assessments:
+            # Assessments rebuilt from journal records are the ones without call spans
+            statistics.add(assessment, resumed=not any(trace.llm_calls for trace in assessment.assessment_traces))
+        return statistics
+    
+    def add(self, assessment: RefugeeAssessment, resumed: bool = False):
+        """
+        Add one assessed refugee (not a duplicate row reusing another's assessment)
+        
+        Args:
+            assessment: The refugee's assessment
+            resumed: The assessment was made by an earlier run and read from the journal
+        """
+        if resumed:
+            self.resumed_refugees += 1
+            return
+        self.refugees += 1
+        for trace in assessment.assessment_traces:
+            self.assessments += 1
+            self.validated += trace.is_validated
+            self.iterations += trace.selector_iterations
+            self.fallbacks += bool(trace.fallbacks)
+            for action in trace.policy_actions:
+                self.actions[action] = self.actions.get(action, 0) + 1
+            for span in trace.llm_calls:
+                self.call_ids.add(span.call_id)
+                if (trace.agent_type, span.call_id) not in self.perspective_call_ids:
+                    self.perspective_call_ids.add((trace.agent_type, span.call_id))
+                    self.by_perspective.setdefault(trace.agent_type, {}).setdefault(
+                        span.role, _SpanStatistics()
+                    ).add(span)
+                self.by_country.setdefault(trace.host_country, {}).setdefault(span.role, _SpanStatistics()).add(span)
+    
+    def llm_call_statistics(self) -> Dict[str, Any]:
+        """Per-call latency and token percentiles by perspective and by host country, split by call role"""
+        return {
+            "by_perspective": {
+                perspective: {role: spans.stats() for role, spans in roles.items()}
+                for perspective, roles in self.by_perspective.items()
+            },
+            "by_host_country": {
+                country: {role: spans.stats() for role, spans in roles.items()}
+                for country, roles in self.by_country.items()
+            }
+        }
+    
+    def policy_statistics(self, policy: IterationPolicy) -> Dict[str, Any]:
+        """Policy actions taken, calls made and convergence of the traces assessed in this run"""
+        llm_calls = len(self.call_ids)
+        return {
+            "policy": asdict(policy),
+            "assessments": self.assessments,
+            "llm_calls": llm_calls,
+            "llm_calls_per_refugee": round(llm_calls / self.refugees, 2) if self.refugees else 0.0,
+            "resumed_refugees": self.resumed_refugees,
+            "validations_skipped": self.actions.get(SKIP_VALIDATION, 0),
+            "validations_sampled": self.actions.get(SAMPLE_VALIDATION, 0),
+            "budget_exhausted": self.actions.get(BUDGET_EXHAUSTED, 0),
+            "divergence_retries": self.actions.get(DIVERGENCE_RETRY, 0),
+            "grounding_rejections": self.actions.get(GROUNDING_REJECTED, 0),
+            "acceptance_rate": round(self.validated / self.assessments, 3) if self.assessments else 0.0,
+            "mean_iterations": round(self.iterations / self.assessments, 3) if self.assessments else 0.0
+        }
 
 class DatasetProcessor:
     """
@@ -535,110 +1560,329 @@ class DatasetProcessor:
     def __init__(self, analyzer: MultiPerspectiveAnalyzer):
         self.analyzer = analyzer
         self.host_countries = ["United States", "Canada", "Germany", "Sweden", "Australia"]
+        self.dedup_stats: Dict[str, Any] = {}
+        self.run_statistics = RunStatistics()
+        self.tables = ColumnarTables()
     
     def process_dataset(self, csv_path: str, sample_size: Optional[int] = 2,
-                       output_traces: bool = True) -> Tuple[pd.DataFrame, List[RefugeeAssessment]]:
+                       output_traces: bool = True, workers: int = 1,
+                       rate_limit: Optional[float] = 2.0,
+                       max_pending: Optional[int] = None,
+                       journal_path: Optional[str] = None, resume: bool = False,
+                       id_columns: Optional[List[str]] = None,
+                       deduplicate: bool = True, start_row: int = 0,
+                       chunksize: int = 1000,
+                       trace_writer: Optional[TraceWriter] = None, max_requeues: int = 3,
+                       max_pause_s: Optional[float] = None) -> Tuple[pd.DataFrame, List[RefugeeAssessment]]:
         """
         Process dataset with comprehensive assessment and tracing
-        """
-        df = pd.read_csv(csv_path)
         
-        if sample_size:
-            df = df[:sample_size]
-        
-        assessments = []
-        detailed_traces = []
+        Args:
+            csv_path: Path to the survey CSV file
+            sample_size: Number of rows to read from start_row (None for the rest of the file)
+            output_traces: Whether to keep and return the detailed assessment traces
+                (without them the summary and Parquet tables are built incrementally)
+            workers: Number of refugees assessed in parallel
+            rate_limit: Maximum refugees started per second (None for unlimited)
+            max_pending: Maximum refugees queued or in flight (defaults to 2 x workers)
+            journal_path: JSONL journal that every finished row is appended to
+            resume: Skip rows already recorded in the journal and reuse their results
+            id_columns: Columns giving a stable respondent identity (defaults to row position)
+            deduplicate: Assess each distinct field-coded profile once and reuse the result
+                for every row that shares it
+            start_row: First data row of the CSV to read
+            chunksize: Rows parsed per chunk while streaming the CSV
+            trace_writer: Streaming trace file that every row finished in this run is
+                written to as it completes (resumed rows are already in earlier trace files)
+            max_requeues: Times a refugee is requeued after an open circuit before it fails
+            max_pause_s: Total seconds the batch may pause for an open circuit before the
+                run is aborted with BatchAborted (None to wait indefinitely)
+        """
+        row_keys: Dict[Any, str] = {}
+        result_rows = {}
+        assessments = {}
+        journal_records: Dict[str, Dict[str, Any]] = {}
+        resumed_rows: Dict[str, Any] = {}
+        resumed_duplicates = 0
+        journal = None
+        self.run_statistics = RunStatistics()
+        self.tables = ColumnarTables()
         
-        logger.info(f"Starting assessment of {len(df)} refugees")
+        if journal_path:
+            journal = AssessmentJournal(journal_path, resume=resume)
+            if resume:
+                journal_records = {record["row_key"]: record for record in journal.records()}
         
-        for idx, row in df.iterrows():
-            if idx % 50 == 0:
-                logger.info(f"Progress: {idx}/{len(df)} ({(idx/len(df)*100):.1f}%)")
-                logger.info(f"Valid assessments: {len(assessments)}")
+        # Pre-pass: stream the needed columns, validate profiles and group rows
+        # sharing the same field-coded profile
+        groups: Dict[Any, List[Any]] = {}
+        group_profiles: Dict[Any, ProfileResult] = {}
+        resumed_signatures: Dict[Any, str] = {}
+        total_rows = 0
+        rejected = 0
+        chunks = iter_survey_chunks(
+            csv_path, self.analyzer.profile_builder, chunksize=chunksize,
+            start_row=start_row, nrows=sample_size, extra_columns=id_columns
+        )
+        for chunk in chunks:
+            total_rows += len(chunk)
+            chunk_keys = row_keys_for(chunk, id_columns)
             
-            try:
-                # Comprehensive assessment
-                assessment = self.analyzer.assess_refugee_comprehensive(row, self.host_countries)
+            for idx, profile_result in self.analyzer.profile_builder.profile_results(chunk):
+                key = chunk_keys[idx]
+                row_keys[idx] = key
+                if key in journal_records:
+                    resumed_rows[key] = idx
+                    if deduplicate and profile_result.is_valid:
+                        signature = format_profile_with_field_codes(profile_result.available_features)
+                        resumed_signatures.setdefault(signature, key)
+                    continue
+                
+                if not profile_result.is_valid:
+                    logger.debug(f"Profile {key} rejected: {profile_result.rejection_reason}")
+                    rejected += 1
+                    if journal is not None:
+                        journal.append(key, idx, "rejected")
+                    continue
                 
-                if assessment is not None:
-                    assessments.append(assessment)
+                signature = format_profile_with_field_codes(profile_result.available_features) if deduplicate else idx
+                if signature not in groups:
+                    groups[signature] = []
+                    group_profiles[signature] = profile_result
+                groups[signature].append(idx)
+        
+        # Rebuild journaled rows in journal order so duplicates find their source assessment
+        if journal_records:
+            resumed = {}
+            for key, record in journal_records.items():
+                if record["status"] == "assessed" and record.get("assessment"):
+                    assessment = self._assessment_from_dict(record["assessment"])
+                elif record["status"] == "duplicate" and record["assessment"]["source_row_id"] in resumed:
+                    source = resumed[record["assessment"]["source_row_id"]]
+                    assessment = replace(source, **record["assessment"])
+                else:
+                    continue
+                resumed[key] = assessment
+                
+                if key in resumed_rows:
+                    idx = resumed_rows[key]
+                    result_rows[idx] = self._assessment_to_row(assessment)
+                    self.tables.add(assessment, idx)
+                    if assessment.source_row_id is None:
+                        self.run_statistics.add(assessment, resumed=True)
+                    if output_traces:
+                        assessments[idx] = assessment
+            logger.info(f"Resuming: {len(resumed_rows)} rows already in journal {journal_path}")
+            
+            # New rows sharing a journaled row's profile reuse its assessment; like the
+            # resumed rows they are not traced again, their source's trace is in an earlier part
+            for signature in [signature for signature in groups if resumed_signatures.get(signature) in resumed]:
+                source = resumed[resumed_signatures[signature]]
+                source_key = source.source_row_id or source.row_id
+                group_profiles.pop(signature)
+                for idx in groups.pop(signature):
+                    key = row_keys[idx]
+                    identity = {"refugee_id": str(uuid.uuid4()), "row_id": key, "source_row_id": source_key}
+                    member_assessment = replace(source, **identity)
+                    if journal is not None:
+                        journal.append(key, idx, "duplicate", identity)
+                    result_rows[idx] = self._assessment_to_row(member_assessment)
+                    self.tables.add(member_assessment, idx)
                     if output_traces:
-                        detailed_traces.append(assessment)
+                        assessments[idx] = member_assessment
+                    resumed_duplicates += 1
+            if resumed_duplicates:
+                logger.info(f"Resuming: {resumed_duplicates} new rows reuse a journaled row's assessment")
+        
+        # Rows reusing a journaled assessment are counted apart from this run's profiles
+        pending_valid = sum(len(members) for members in groups.values())
+        self.dedup_stats = {
+            "valid_rows": pending_valid,
+            "unique_profiles": len(groups),
+            "dedup_ratio": round(pending_valid / len(groups), 3) if groups else None,
+            "assessments_saved": pending_valid - len(groups),
+            "journal_reused_rows": resumed_duplicates
+        }
+        dedup_ratio = f"{self.dedup_stats['dedup_ratio']:.2f}" if groups else "n/a"
+        
+        if rejected:
+            logger.warning(f"Profiles rejected: {rejected} rows did not meet profile requirements")
+        
+        logger.info(f"Starting assessment of {len(groups)} unique profiles "
+                    f"({pending_valid} valid rows, {total_rows} rows read, "
+                    f"dedup ratio {dedup_ratio})")
+        
+        runner = BatchRunner(
+            lambda profile_result: self.analyzer.assess_profile(profile_result, self.host_countries),
+            workers=workers, rate_limit=rate_limit, max_pending=max_pending, metrics=self.analyzer.metrics,
+            circuit_breaker=self.analyzer.circuit_breaker, max_requeues=max_requeues, max_pause_s=max_pause_s
+        )
+        metrics = self.analyzer.metrics
+        if metrics is not None:
+            metrics.rows.inc(rejected, status="rejected")
+            metrics.rows.inc(resumed_duplicates, status="duplicate")
+            metrics.event("run_started", csv_path=csv_path, rows_read=total_rows, rejected=rejected,
+                          unique_profiles=len(groups), valid_rows=pending_valid, resumed_rows=len(resumed_rows),
+                          journal_reused_rows=resumed_duplicates)
+        
+        try:
+            work_items = ((signature, group_profiles[signature]) for signature in groups)
+            for signature, assessment, error in runner.run(work_items, total=len(groups)):
+                members = groups[signature]
+                if error is not None:
+                    logger.error(f"Error processing refugee {members[0]} "
+                                 f"({len(members)} rows share this profile): {str(error)}")
+                    if metrics is not None:
+                        metrics.event("profile_failed", row_key=row_keys[members[0]], rows=len(members),
+                                      error=str(error))
+                    continue
                 
-                time.sleep(0.5)  # Rate limiting
+                if metrics is not None:
+                    metrics.rows.inc(status="assessed")
+                    metrics.rows.inc(len(members) - 1, status="duplicate")
+                    metrics.event("profile_assessed", row_key=row_keys[members[0]], rows=len(members),
+                                  recommended_country=assessment.recommended_country,
+                                  recommendation_score=assessment.recommendation_score,
+                                  validation_status=assessment.validation_status,
+                                  processing_time_ms=assessment.total_processing_time_ms)
                 
-            except Exception as e:
-                logger.error(f"Error processing refugee {idx}: {str(e)}")
-                continue
+                self.run_statistics.add(assessment)
+                
+                # Fan the shared result out to every row with this profile
+                source_key = row_keys[members[0]]
+                for position, idx in enumerate(members):
+                    key = row_keys[idx]
+                    if position == 0:
+                        member_assessment = assessment
+                        member_assessment.row_id = key
+                        if journal is not None:
+                            journal.append(key, idx, "assessed", member_assessment.to_dict())
+                    else:
+                        identity = {"refugee_id": str(uuid.uuid4()), "row_id": key,
+                                    "source_row_id": source_key}
+                        member_assessment = replace(assessment, **identity)
+                        if journal is not None:
+                            journal.append(key, idx, "duplicate", identity)
+                    
+                    result_rows[idx] = self._assessment_to_row(member_assessment)
+                    self.tables.add(member_assessment, idx)
+                    if trace_writer is not None:
+                        trace_writer.write(member_assessment)
+                    if output_traces:
+                        assessments[idx] = member_assessment
+        except KeyboardInterrupt:
+            logger.warning("Interrupted; finished rows are in the journal" if journal is not None
+                           else "Interrupted; no journal configured, partial results only")
+            raise
+        except BatchAborted as e:
+            logger.error(f"{e}; finished rows are in the journal, rerun with --resume" if journal is not None
+                         else f"{e}; no journal configured, partial results only")
+            raise
+        finally:
+            if journal is not None:
+                journal.close()
         
-        # Convert to DataFrame for analysis
-        results_df = self._convert_to_dataframe(assessments)
+        if metrics is not None:
+            metrics.event("run_finished", rows_read=total_rows, valid_assessments=len(result_rows))
+        
+        # Keep input order regardless of completion order
+        results_df = pd.DataFrame([result_rows[idx] for idx in sorted(result_rows)])
+        detailed_traces = [assessments[idx] for idx in sorted(assessments)]
         
         # Log final statistics
         logger.info(f"\nAssessment Complete:")
-        logger.info(f"Total refugees: {len(df)}")
-        logger.info(f"Valid assessments: {len(assessments)}")
-        logger.info(f"Success rate: {(len(assessments)/len(df)*100):.1f}%")
+        logger.info(f"Total refugees: {total_rows}")
+        logger.info(f"Valid assessments: {len(result_rows)}")
+        logger.info(f"Success rate: {(len(result_rows)/max(total_rows, 1)*100):.1f}%")
+        logger.info(f"Deduplication: {self.dedup_stats['unique_profiles']} unique profiles for "
+                    f"{self.dedup_stats['valid_rows']} rows (ratio {dedup_ratio})"
+                    + (f", {resumed_duplicates} rows reused a journaled assessment" if resumed_duplicates else ""))
         
         return results_df, detailed_traces
     
+    def _assessment_from_dict(self, data: Dict[str, Any]) -> RefugeeAssessment:
+        """Rebuild a compact RefugeeAssessment from its asdict form (e.g. a journal record)"""
+        agents = self.analyzer.agents
+        features = data["available_features"]
+        traces = [
+            AssessmentTrace.from_dict(
+                trace, agents[trace["agent_type"]].prompt_prefix(features) if trace["agent_type"] in agents else "",
+                features
+            )
+            for trace in data.get("assessment_traces", [])
+        ]
+        return RefugeeAssessment(**{**data, "assessment_traces": traces})
+    
     def _convert_to_dataframe(self, assessments: List[RefugeeAssessment]) -> pd.DataFrame:
         """Convert assessment results to DataFrame for analysis"""
-        rows = []
+        return pd.DataFrame([self._assessment_to_row(assessment) for assessment in assessments])
+    
+    def _assessment_to_row(self, assessment: RefugeeAssessment) -> Dict[str, Any]:
+        """Flatten one assessment into a results row"""
+        row = {
+            "refugee_id": assessment.refugee_id,
+            "row_id": assessment.row_id,
+            "source_row_id": assessment.source_row_id,
+            "profile_string": assessment.profile_string,
+            "total_features": assessment.total_features,
+            "recommended_country": assessment.recommended_country,
+            "recommendation_score": assessment.recommendation_score,
+            "validation_status": assessment.validation_status,
+            "processing_time_ms": assessment.total_processing_time_ms,
+            "assessment_timestamp": assessment.assessment_timestamp
+        }
         
-        for assessment in assessments:
-            row = {
-                "refugee_id": assessment.refugee_id,
-                "profile_string": assessment.profile_string,
-                "total_features": assessment.total_features,
-                "recommended_country": assessment.recommended_country,
-                "recommendation_score": assessment.recommendation_score,
-                "validation_status": assessment.validation_status,
-                "processing_time_ms": assessment.total_processing_time_ms,
-                "assessment_timestamp": assessment.assessment_timestamp
-            }
-            
-            # Add country scores
-            for country, scores in assessment.country_scores.items():
-                country_key = country.lower().replace(" ", "_")
-                row[f"{country_key}_emotional"] = scores["emotional"]
-                row[f"{country_key}_cultural"] = scores["cultural"]
-                row[f"{country_key}_ethical"] = scores["ethical"]
-                row[f"{country_key}_weighted"] = scores["weighted"]
-            
-            # Add reasoning from recommended country traces
-            rec_traces = [t for t in assessment.assessment_traces 
-                         if t.host_country == assessment.recommended_country]
-            
-            for trace in rec_traces:
-                row[f"{trace.agent_type}_reasoning"] = trace.selector_final_reasoning
-                row[f"{trace.agent_type}_confidence"] = trace.selector_confidence
-                row[f"{trace.agent_type}_iterations"] = trace.selector_iterations
-                row[f"{trace.agent_type}_validated"] = trace.is_validated
-            
-            rows.append(row)
+        # Add country scores
+        for country, scores in assessment.country_scores.items():
+            country_key = country.lower().replace(" ", "_")
+            for perspective, score in scores.items():
+                row[f"{country_key}_{perspective}"] = score
         
-        return pd.DataFrame(rows)
+        # Add reasoning from recommended country traces
+        rec_traces = [t for t in assessment.assessment_traces 
+                     if t.host_country == assessment.recommended_country]
+        
+        for trace in rec_traces:
+            row[f"{trace.agent_type}_reasoning"] = trace.selector_final_reasoning
+            row[f"{trace.agent_type}_confidence"] = trace.selector_confidence
+            row[f"{trace.agent_type}_iterations"] = trace.selector_iterations
+            row[f"{trace.agent_type}_validated"] = trace.is_validated
+        
+        return row
     
-    def save_results(self, results_df: pd.DataFrame, traces: List[RefugeeAssessment],
-                    output_dir: str = "./results"):
-        """Save results in structured format"""
+    def save_results(self, results_df: pd.DataFrame, traces: Optional[List[RefugeeAssessment]] = None,
+                    output_dir: str = "./results", write_traces: bool = True, excel: bool = False):
+        """
+        Save results in structured format
+        
+        Args:
+            results_df: Results DataFrame from process_dataset
+            traces: Assessments with their traces (None to use the tables and statistics
+                process_dataset accumulated, e.g. when traces were streamed)
+            output_dir: Output directory
+            write_traces: Write assessment_traces.json (False when traces were streamed)
+            excel: Also write the wide refugee_assessments.xlsx sheet
+        """
         
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
         
-        # Save main results
-        results_file = output_path / "refugee_assessments.xlsx"
-        results_df.to_excel(results_file, index=False)
-        logger.info(f"Results saved: {results_file}")
+        # Save main results as normalized Parquet tables (refugees, scores, reasoning)
+        write_parquet_tables(results_df, self.tables if traces is None else traces, output_dir)
         
-        # Save detailed traces for reproducibility
-        traces_file = output_path / "assessment_traces.json"
-        traces_data = [asdict(trace) for trace in traces]
+        if excel:
+            results_file = output_path / "refugee_assessments.xlsx"
+            results_df.to_excel(results_file, index=False)
+            logger.info(f"Results saved: {results_file}")
         
-        with open(traces_file, 'w') as f:
-            json.dump(traces_data, f, indent=2)
-        logger.info(f"Traces saved: {traces_file}")
+        # Save detailed traces for reproducibility
+        if write_traces and traces is not None:
+            traces_file = output_path / "assessment_traces.json"
+            traces_data = [trace.to_dict() for trace in traces]
+            
+            with open(traces_file, 'w') as f:
+                json.dump(traces_data, f, indent=2)
+            logger.info(f"Traces saved: {traces_file}")
         
         # Save summary statistics
         summary_file = output_path / "assessment_summary.json"
@@ -648,17 +1892,27 @@ class DatasetProcessor:
             json.dump(summary, f, indent=2)
         logger.info(f"Summary saved: {summary_file}")
     
-    def _generate_summary(self, results_df: pd.DataFrame, traces: List[RefugeeAssessment]) -> Dict[str, Any]:
+    def _generate_summary(self, results_df: pd.DataFrame,
+                          traces: Optional[List[RefugeeAssessment]] = None) -> Dict[str, Any]:
         """Generate assessment summary for analysis"""
         
         total_assessments = len(results_df)
+        if traces is None:
+            run_statistics = self.run_statistics
+        else:
+            run_statistics = RunStatistics.of([assessment for assessment in traces if assessment.source_row_id is None])
+        
+        # Rows that reused a duplicate profile's assessment took no processing time of their own
+        assessed_df = results_df
+        if 'source_row_id' in results_df.columns:
+            assessed_df = results_df[results_df['source_row_id'].isna()]
         
         summary = {
             "assessment_overview": {
                 "total_refugees_assessed": total_assessments,
                 "assessment_framework": "Three-perspective Selector-Validator architecture",
-                "perspectives": ["emotional", "cultural", "ethical"],
-                "perspective_weights": {"emotional": 0.3, "cultural": 0.4, "ethical": 0.3},
+                "perspectives": list(self.analyzer.weights),
+                "perspective_weights": dict(self.analyzer.weights),
                 "host_countries": self.host_countries
             },
             "country_recommendations": results_df['recommended_country'].value_counts().to_dict(),
@@ -674,42 +1928,240 @@ class DatasetProcessor:
                 "validation_rate": float(len(results_df[results_df['validation_status'] == 'validated']) / total_assessments)
             },
             "processing_statistics": {
-                "mean_processing_time_ms": float(results_df['processing_time_ms'].mean()),
-                "total_processing_time_hours": float(results_df['processing_time_ms'].sum() / (1000 * 60 * 60))
+                "mean_processing_time_ms": float(assessed_df['processing_time_ms'].mean()),
+                "total_processing_time_hours": float(assessed_df['processing_time_ms'].sum() / (1000 * 60 * 60)),
+                "llm_calls": run_statistics.llm_call_statistics()
             }
         }
         
+        summary["deduplication"] = {
+            "valid_rows": total_assessments,
+            "unique_profiles": len(assessed_df),
+            "dedup_ratio": round(total_assessments / len(assessed_df), 3) if len(assessed_df) else 1.0,
+            "assessments_saved": total_assessments - len(assessed_df)
+        }
+        
+        summary["iteration_policy"] = run_statistics.policy_statistics(self.analyzer.iteration_policy)
+        
+        if self.analyzer.cache is not None:
+            summary["llm_cache"] = self.analyzer.cache.stats()
+        
+        if self.analyzer.coalescer is not None:
+            summary["request_coalescing"] = self.analyzer.coalescer.stats()
+        
+        summary["resilience"] = {**self.analyzer.resilient.stats(), "fallback_results": run_statistics.fallbacks}
+        
+        if isinstance(self.analyzer.backend, EndpointPool):
+            summary["endpoint_pool"] = self.analyzer.backend.stats()
+        
+        summary["prompt_cache"] = {
+            "prompt_layout": self.analyzer.prompt_layout,
+            "prompt_pruning": self.analyzer.prompt_pruning,
+            **self.analyzer.prompt_monitor.stats()
+        }
+        
+        summary["generation"] = {
+            "prompt_style": self.analyzer.prompt_style,
+            "output_budgets": {perspective: asdict(agent.output_budget)
+                               for perspective, agent in self.analyzer.agents.items()}
+        }
+        
         return summary
 
 def main():
     """
     Main execution function for refugee assessment
     """
+    parser = argparse.ArgumentParser(description="Three-Perspective Refugee Assessment System")
+    parser.add_argument("--input", default="./Dataset/D3/Anonymized HHM Data.csv",
+                        help="Path to the survey CSV file")
+    parser.add_argument("--output-dir", default="./results", help="Directory for result files")
+    parser.add_argument("--model", default="llama3", help="Ollama model name")
+    parser.add_argument("--sample-size", type=int, default=2,
+                        help="Number of rows to assess (0 for the full dataset)")
+    parser.add_argument("--start-row", type=int, default=0, help="First data row of the CSV to assess")
+    parser.add_argument("--chunksize", type=int, default=1000, help="Rows parsed per CSV chunk")
+    parser.add_argument("--workers", type=int, default=1, help="Refugees assessed in parallel")
+    parser.add_argument("--rate-limit", type=float, default=2.0,
+                        help="Maximum refugees started per second (0 for unlimited)")
+    parser.add_argument("--max-concurrency", type=int, default=1,
+                        help="Parallel country x perspective assessments per analyzer (1 = sequential)")
+    parser.add_argument("--journal", default=None,
+                        help="JSONL journal of finished rows (default: <output-dir>/assessment_journal.jsonl)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip rows already recorded in the journal")
+    parser.add_argument("--id-columns", nargs="+", default=None,
+                        help="Columns giving a stable respondent identity (default: row position)")
+    parser.add_argument("--cache-path", default=None,
+                        help="SQLite LLM response cache (default: <output-dir>/llm_cache.sqlite)")
+    parser.add_argument("--cache-max-mb", type=int, default=512, help="Response cache size budget in MB")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Assess every row even when its profile duplicates another row")
+    parser.add_argument("--batch-countries", action="store_true",
+                        help="Score all host countries in one selector call per perspective")
+    parser.add_argument("--group-validation", action="store_true",
+                        help="Score host countries separately but validate them in one call per perspective")
+    parser.add_argument("--coalesce", action="store_true",
+                        help="Share one backend call (and one sampled response) between identical "
+                             "concurrent requests")
+    parser.add_argument("--grounding-check", action="store_true",
+                        help="Reject responses citing no or unknown field codes locally, without the LLM validator")
+    parser.add_argument("--prompt-layout", choices=PROMPT_LAYOUTS, default="legacy",
+                        help="'prefix' sends the stable guidelines in the system message for KV-cache reuse")
+    parser.add_argument("--prompt-style", choices=PROMPT_STYLES, default="full",
+                        help="'compact' drops the Markdown report instructions from selector prompts")
+    parser.add_argument("--prune-prompt", action="store_true",
+                        help="Send only the guidelines for each profile's fields and the agent's perspective")
+    parser.add_argument("--selector-max-tokens", type=int, default=None,
+                        help="Cap on tokens generated per selector call (Ollama num_predict)")
+    parser.add_argument("--validator-max-tokens", type=int, default=None,
+                        help="Cap on tokens generated per validator call")
+    parser.add_argument("--reasoning-max-chars", type=int, default=None,
+                        help="Cap on selector reasoning length in characters")
+    parser.add_argument("--feedback-max-chars", type=int, default=None,
+                        help="Cap on validator feedback length in characters")
+    parser.add_argument("--keep-alive", default=None,
+                        help="How long Ollama keeps the model loaded between calls (e.g. 30m, -1)")
+    parser.add_argument("--num-ctx", type=int, default=None,
+                        help="Ollama context window in tokens (must fit the full prompt)")
+    parser.add_argument("--backend", choices=["ollama", "openai", "mock"], default="ollama",
+                        help="LLM backend: local Ollama, an OpenAI-compatible server, or the offline mock")
+    parser.add_argument("--base-url", default=None,
+                        help="Server URL for the ollama/openai backends (e.g. http://localhost:8000/v1)")
+    parser.add_argument("--endpoints", nargs="+", default=None,
+                        help="Several server URLs of the same model; calls go to the least busy healthy one")
+    parser.add_argument("--no-warm-up", action="store_true",
+                        help="Do not preload the model on every --endpoints server before assessing")
+    parser.add_argument("--call-timeout", type=float, default=120.0,
+                        help="Seconds before an LLM call attempt is abandoned (0 for no deadline)")
+    parser.add_argument("--max-retries", type=int, default=2,
+                        help="Retries of a failed LLM call, with jittered exponential backoff")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Send a duplicate request when a call is slower than the recent p95 latency")
+    parser.add_argument("--breaker-failures", type=int, default=5,
+                        help="Consecutive failed calls that open the circuit and pause the batch (0 to disable)")
+    parser.add_argument("--breaker-reset", type=float, default=30.0,
+                        help="Seconds the circuit stays open before a probe call is tried")
+    parser.add_argument("--max-requeues", type=int, default=3,
+                        help="Times a refugee is requeued after an open circuit before it is reported as failed")
+    parser.add_argument("--max-pause", type=float, default=600.0,
+                        help="Total seconds the batch may pause for an open circuit before aborting (0 for no limit)")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY"),
+                        help="API key for the openai backend (default: $OPENAI_API_KEY)")
+    parser.add_argument("--mock-latency-ms", type=float, default=50.0, help="Mock backend mean latency per call")
+    parser.add_argument("--mock-jitter-ms", type=float, default=0.0, help="Mock backend latency standard deviation")
+    parser.add_argument("--mock-failure-rate", type=float, default=0.0, help="Fraction of mock calls that fail")
+    parser.add_argument("--mock-score-weights", type=float, nargs=10, default=None,
+                        help="Relative weights of mock scores 1..10 (default: uniform)")
+    parser.add_argument("--mock-seed", type=int, default=0, help="Seed for mock responses")
+    parser.add_argument("--iteration-policy", choices=sorted(POLICIES), default="fixed",
+                        help="Selector/validator loop policy: 'fixed' validates every response; 'adaptive' "
+                             "and 'economy' skip validation of confident responses and cap calls per refugee")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on http://127.0.0.1:<port>/metrics")
+    parser.add_argument("--event-log", default=None, help="JSON-lines file of pipeline events")
+    parser.add_argument("--excel", action="store_true",
+                        help="Also write the wide refugee_assessments.xlsx sheet (Parquet tables are always written)")
+    parser.add_argument("--trace-format", choices=["jsonl", "json"], default="jsonl",
+                        help="'jsonl' streams traces as rows finish; 'json' writes one indented file at the end")
+    parser.add_argument("--trace-compression", choices=COMPRESSIONS, default="none",
+                        help="Compression of the streamed JSONL trace file")
+    parser.add_argument("--prompt-refs", action="store_true",
+                        help="Store each distinct prompt once in a prompt table referenced from the traces")
+    args = parser.parse_args()
+    
     logger.info("Starting Three-Perspective Refugee Assessment System v2")
     
+    # Configuration
+    input_file = args.input
+    sample_size = args.sample_size or None
+    journal_path = args.journal or str(Path(args.output_dir) / "assessment_journal.jsonl")
+    
+    if Path(journal_path).exists() and not args.resume:
+        parser.error(f"Journal already exists: {journal_path} (use --resume to continue it, or remove it)")
+    
     # Initialize system
-    analyzer = MultiPerspectiveAnalyzer(model_name="llama3")
-    processor = DatasetProcessor(analyzer)
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(
+            args.cache_path or str(Path(args.output_dir) / "llm_cache.sqlite"),
+            max_bytes=args.cache_max_mb * 1024 * 1024
+        )
+    max_connections = max(args.max_concurrency * args.workers, 2)
     
-    # Configuration
-    input_file = "./Dataset/D3/Anonymized HHM Data.csv"
-    sample_size = 2  # For demonstration
+    def make_backend(base_url: Optional[str]) -> LLMBackend:
+        if args.backend == "ollama":
+            return create_backend("ollama", args.model, max_connections, keep_alive=args.keep_alive,
+                                  num_ctx=args.num_ctx, base_url=base_url)
+        if args.backend == "openai":
+            return create_backend("openai", args.model, max_connections, base_url=base_url,
+                                  api_key=args.api_key)
+        return create_backend(
+            "mock", latency_ms=args.mock_latency_ms, latency_jitter_ms=args.mock_jitter_ms,
+            failure_rate=args.mock_failure_rate, seed=args.mock_seed,
+            score_weights=dict(zip(range(1, 11), args.mock_score_weights)) if args.mock_score_weights else None
+        )
+    
+    if args.endpoints:
+        backend = EndpointPool([make_backend(url) for url in args.endpoints], names=args.endpoints)
+    else:
+        backend = make_backend(args.base_url)
+    output_budgets = None
+    budget = OutputBudget(selector_max_tokens=args.selector_max_tokens, validator_max_tokens=args.validator_max_tokens,
+                          reasoning_max_chars=args.reasoning_max_chars, feedback_max_chars=args.feedback_max_chars)
+    if budget != OutputBudget():
+        output_budgets = {perspective: budget for perspective in PERSPECTIVE_CONFIGS}
+    metrics = None
+    if args.metrics_port is not None or args.event_log:
+        metrics = PipelineMetrics(event_log_path=args.event_log)
+        if args.metrics_port is not None:
+            metrics.serve(args.metrics_port)
+    analyzer = MultiPerspectiveAnalyzer(model_name=args.model, max_concurrency=args.max_concurrency,
+                                        cache=cache, batch_countries=args.batch_countries,
+                                        prompt_layout=args.prompt_layout, backend=backend, metrics=metrics,
+                                        iteration_policy=POLICIES[args.iteration_policy],
+                                        group_validation=args.group_validation,
+                                        grounding_checker=GroundingChecker() if args.grounding_check else None,
+                                        coalesce_requests=args.coalesce, warm_up=not args.no_warm_up,
+                                        resilience=ResilienceConfig(
+                                            timeout_s=args.call_timeout or None, max_retries=args.max_retries,
+                                            hedge=args.hedge, breaker_failures=args.breaker_failures or None,
+                                            breaker_reset_s=args.breaker_reset
+                                        ),
+                                        prompt_style=args.prompt_style, output_budgets=output_budgets,
+                                        prompt_pruning=args.prune_prompt)
+    processor = DatasetProcessor(analyzer)
     
     if not Path(input_file).exists():
         logger.error(f"Dataset file not found: {input_file}")
         return
     
+    trace_writer = None
+    if args.trace_format == "jsonl":
+        traces_file, prompts_file = trace_paths(args.output_dir, args.trace_compression, keep_existing=args.resume)
+        trace_writer = TraceWriter(str(traces_file), compression=args.trace_compression,
+                                   prompt_refs=args.prompt_refs, prompts_path=str(prompts_file),
+                                   prefixes=[agent.system_prefix for agent in analyzer.agents.values()])
+    
     try:
-        # Process dataset
+        # Process dataset; streamed traces are not also kept in memory
         logger.info("Processing dataset with multi-agent architecture...")
-        results_df, traces = processor.process_dataset(input_file, sample_size=sample_size)
+        results_df, traces = processor.process_dataset(
+            input_file, sample_size=sample_size, output_traces=trace_writer is None, workers=args.workers,
+            rate_limit=args.rate_limit or None, journal_path=journal_path,
+            resume=args.resume, id_columns=args.id_columns, deduplicate=not args.no_dedup,
+            start_row=args.start_row, chunksize=args.chunksize, trace_writer=trace_writer,
+            max_requeues=args.max_requeues, max_pause_s=args.max_pause or None
+        )
         
         if len(results_df) == 0:
             logger.warning("No valid assessments generated")
             return
         
         # Save results
-        processor.save_results(results_df, traces)
+        processor.save_results(results_df, traces if trace_writer is None else None, output_dir=args.output_dir,
+                               excel=args.excel)
         
         # Display summary
         logger.info(f"\nAssessment Summary:")
@@ -729,6 +2181,26 @@ def main():
     except Exception as e:
         logger.error(f"Assessment failed: {str(e)}")
         raise
+    finally:
+        analyzer.close()
+        if trace_writer is not None:
+            trace_writer.close()
+            logger.info(f"Traces saved: {trace_writer.stats()}")
+        if metrics is not None:
+            metrics.close()
+        prompt_stats = analyzer.prompt_monitor.stats()
+        logger.info(f"Prompt cache: {prompt_stats['overall']}")
+        if "pruning" in prompt_stats:
+            logger.info(f"Prompt pruning: {prompt_stats['pruning']['overall']}")
+        if analyzer.coalescer is not None:
+            logger.info(f"Request coalescing: {analyzer.coalescer.stats()}")
+        logger.info(f"Resilience: {analyzer.resilient.stats()}")
+        if isinstance(analyzer.backend, EndpointPool):
+            for endpoint in analyzer.backend.stats()["per_endpoint"]:
+                logger.info(f"Endpoint {endpoint['name']}: {endpoint}")
+        if cache is not None:
+            logger.info(f"LLM cache: {cache.stats()}")
+            cache.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
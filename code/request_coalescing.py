@@ -0,0 +1,108 @@
+"""
+Request Coalescing for Refugee Assessment System
+
+This module collapses identical backend requests that are in flight at the
+same time (single-flight). When concurrent assessments send the same selector
+or validator messages, for example parallel runs over the same profile, the
+first caller makes the backend call and later callers wait for its result.
+The response cache cannot catch these requests, because none of them has
+completed yet.
+
+Followers receive a deep copy of the leader's parsed response, because
+agents modify validator responses in place (lenient override). A failed
+leader call is re-raised in every follower.
+
+Coalescing is opt-in. The key is the prompt alone, so identical concurrent
+requests get one shared sample where separate calls would each draw their own;
+with a sampling model, results can then differ from a sequential run.
+"""
+
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+
+from llm_backends import LLMBackend, LLMResult
+from llm_cache import cache_key
+
+logger = logging.getLogger(__name__)
+
+class CoalescingBackend(LLMBackend):
+    """
+    Backend wrapper that shares one call between identical concurrent requests
+
+    Requests are identical when model, messages, response schema and generation
+    cap match (the response cache key). Counters are available from stats().
+    """
+
+    def __init__(self, backend: LLMBackend):
+        self.backend = backend
+        self.model_name = backend.model_name
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.calls = 0
+        self.backend_calls = 0
+        self.coalesced = 0
+        self.shared_errors = 0
+        self.max_waiters = 0
+        self._waiters: Dict[str, int] = {}
+
+    def invoke(self, messages: List[Any], schema: Type[BaseModel],
+               max_tokens: Optional[int] = None) -> LLMResult:
+        key = cache_key(self.model_name, messages, schema, max_tokens)
+
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self._waiters[key] = 0
+                self.backend_calls += 1
+            else:
+                self.coalesced += 1
+                self._waiters[key] += 1
+                self.max_waiters = max(self.max_waiters, self._waiters[key])
+
+        if not leader:
+            try:
+                result = future.result()
+            except Exception:
+                with self._lock:
+                    self.shared_errors += 1
+                raise
+            # No tokens were spent on this caller's behalf
+            return LLMResult(result.parsed.model_copy(deep=True), cached=result.cached)
+
+        try:
+            result = self.backend.invoke(messages, schema, max_tokens)
+        except Exception as e:
+            with self._lock:
+                del self._in_flight[key]
+                del self._waiters[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            del self._waiters[key]
+        # Followers copy from the leader's response, so give the leader its own copy too
+        future.set_result(LLMResult(result.parsed.model_copy(deep=True), result.usage, result.cached))
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "backend_calls": self.backend_calls,
+                "coalesced": self.coalesced,
+                "coalesced_rate": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+                "shared_errors": self.shared_errors,
+                "max_waiters": self.max_waiters
+            }
+
+    def close(self):
+        self.backend.close()
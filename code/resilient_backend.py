@@ -0,0 +1,310 @@
+"""
+Resilient Backend for Refugee Assessment System
+
+This module wraps a backend with the failure handling that agent calls
+otherwise lack:
+
+- a deadline per attempt, so one hung call cannot stall a whole refugee
+- retries with jittered exponential backoff for transient errors (connection,
+  timeout and server errors; a parse error is returned at once, since the
+  same request would fail the same way)
+- optional hedging: if an attempt has not answered after the recent p95
+  latency of its response type, a duplicate request is sent and the first
+  answer wins
+- a circuit breaker that opens after consecutive transient failures and then
+  fails calls fast with CircuitOpenError. The batch runner pauses, and
+  requeues the profiles, instead of filling the results with fallback scores.
+
+Attempts that pass their deadline are abandoned rather than cancelled, since
+a blocking HTTP call cannot be interrupted. They run on daemon threads, so a
+hung call never blocks the interpreter from exiting.
+"""
+
+import time
+import random
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Type
+
+import numpy as np
+from pydantic import BaseModel
+
+from llm_backends import BackendError, LLMBackend, LLMResult, TransientBackendError, is_transient_error
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(BackendError):
+    """The circuit breaker is open: the backend is failing and calls are not being sent"""
+
+class DeadlineExceeded(TransientBackendError):
+    """A backend call attempt did not answer within its deadline"""
+
+@dataclass(frozen=True)
+class ResilienceConfig:
+    """Deadline, retry, hedging and circuit breaker settings of ResilientBackend"""
+    # Seconds an attempt may take before it is abandoned (None for no deadline)
+    timeout_s: Optional[float] = 120.0
+    # Further attempts after a failed one
+    max_retries: int = 2
+    # Backoff before retry n is drawn uniformly from [0, min(backoff_max_s, backoff_base_s * 2**n)]
+    backoff_base_s: float = 0.5
+    backoff_max_s: float = 8.0
+    # Send a duplicate request when an attempt is slower than this quantile of recent latencies
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    # Successful calls of a response type needed before its hedge delay is trusted
+    hedge_min_samples: int = 20
+    # Consecutive transient failures that open the breaker (None to disable it)
+    breaker_failures: Optional[int] = 5
+    # Seconds the breaker stays open before a probe call is let through
+    breaker_reset_s: float = 30.0
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Closed: calls pass. Open: calls are refused until reset_seconds have passed.
+    Half-open: one probe call passes; its success closes the breaker, its failure
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opens = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._cond = threading.Condition()
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now (in half-open state, claims the single probe)"""
+        with self._cond:
+            if self.state == "open" and time.monotonic() >= self._opened_at + self.reset_seconds:
+                self.state = "half_open"
+                self._probe_in_flight = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._cond:
+            self.consecutive_failures = 0
+            if self.state != "closed":
+                logger.info("Circuit breaker closed: backend calls are succeeding again")
+            self.state = "closed"
+            self._probe_in_flight = False
+            self._cond.notify_all()
+
+    def record_failure(self):
+        with self._cond:
+            self.consecutive_failures += 1
+            if self.state == "half_open" or (
+                    self.state == "closed" and self.consecutive_failures >= self.failure_threshold):
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+                self.opens += 1
+                logger.warning(f"Circuit breaker opened after {self.consecutive_failures} consecutive "
+                               f"failures; retrying in {self.reset_seconds:g}s")
+                self._cond.notify_all()
+
+    def wait_until_closed(self) -> float:
+        """
+        Block while calls would be refused: until the open period has passed, or
+        until a half-open probe has finished
+
+        Returns:
+            Seconds waited
+        """
+        start = time.monotonic()
+        with self._cond:
+            while self.state != "closed":
+                if self.state == "open":
+                    remaining = self._opened_at + self.reset_seconds - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                elif self._probe_in_flight:
+                    self._cond.wait(self.reset_seconds)
+                else:
+                    break
+        return time.monotonic() - start
+
+class ResilientBackend(LLMBackend):
+    """
+    Backend wrapper adding deadlines, retries with backoff, hedging and a circuit breaker
+
+    Args:
+        backend: Backend to call (a single server or an EndpointPool)
+        config: Resilience settings
+    """
+
+    def __init__(self, backend: LLMBackend, config: Optional[ResilienceConfig] = None):
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.config = config or ResilienceConfig()
+        self.breaker = (CircuitBreaker(self.config.breaker_failures, self.config.breaker_reset_s)
+                        if self.config.breaker_failures else None)
+
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failed_calls = 0
+        self.refused_calls = 0
+
+    def invoke(self, messages: List[Any], schema: Type[BaseModel],
+               max_tokens: Optional[int] = None) -> LLMResult:
+        config = self.config
+        with self._lock:
+            self.calls += 1
+
+        for attempt in range(config.max_retries + 1):
+            if self.breaker is not None and not self.breaker.allow():
+                with self._lock:
+                    self.refused_calls += 1
+                raise CircuitOpenError(f"Circuit open for {self.model_name}; call not sent")
+
+            if attempt:
+                with self._lock:
+                    self.retries += 1
+                time.sleep(random.uniform(0, min(config.backoff_max_s, config.backoff_base_s * 2 ** (attempt - 1))))
+
+            try:
+                result = self._attempt(messages, schema, max_tokens)
+            except Exception as e:
+                if not is_transient_error(e):
+                    # The backend answered; a retry would get the same unusable response
+                    if self.breaker is not None:
+                        self.breaker.record_success()
+                    with self._lock:
+                        self.failed_calls += 1
+                    raise
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+                if attempt == config.max_retries:
+                    with self._lock:
+                        self.failed_calls += 1
+                    raise
+                logger.warning(f"{schema.__name__} call failed (attempt {attempt + 1} of "
+                               f"{config.max_retries + 1}): {e}")
+                continue
+
+            if self.breaker is not None:
+                self.breaker.record_success()
+            return result
+
+    def _attempt(self, messages: List[Any], schema: Type[BaseModel], max_tokens: Optional[int]) -> LLMResult:
+        """One attempt, with its deadline and, when enabled, a hedged duplicate"""
+        config = self.config
+        with self._lock:
+            self.attempts += 1
+        hedge_delay = self._hedge_delay(schema.__name__) if config.hedge else None
+        if config.timeout_s is None and hedge_delay is None:
+            return self._timed(messages, schema, max_tokens)
+
+        start = time.monotonic()
+        deadline = start + config.timeout_s if config.timeout_s is not None else None
+        futures = [self._start(messages, schema, max_tokens)]
+
+        if hedge_delay is not None:
+            done, _ = wait(futures, timeout=self._remaining(deadline, hedge_delay))
+            if not done and (deadline is None or time.monotonic() < deadline):
+                with self._lock:
+                    self.hedges += 1
+                futures.append(self._start(messages, schema, max_tokens))
+
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=self._remaining(deadline), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+
+        if error is not None and not pending:
+            raise error
+        with self._lock:
+            self.timeouts += 1
+        raise DeadlineExceeded(f"{schema.__name__} call exceeded its {config.timeout_s:g}s deadline")
+
+    @staticmethod
+    def _remaining(deadline: Optional[float], cap: Optional[float] = None) -> Optional[float]:
+        remaining = max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+        if cap is None:
+            return remaining
+        return cap if remaining is None else min(cap, remaining)
+
+    def _start(self, messages: List[Any], schema: Type[BaseModel], max_tokens: Optional[int]) -> Future:
+        """Run one backend call on a daemon thread"""
+        future: Future = Future()
+
+        def run():
+            try:
+                future.set_result(self._timed(messages, schema, max_tokens))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="llm-attempt", daemon=True).start()
+        return future
+
+    def _timed(self, messages: List[Any], schema: Type[BaseModel], max_tokens: Optional[int]) -> LLMResult:
+        """Call the backend and record the latency of a successful call for hedging"""
+        start = time.monotonic()
+        result = self.backend.invoke(messages, schema, max_tokens)
+        if self.config.hedge:
+            with self._lock:
+                self._latencies.setdefault(schema.__name__, deque(maxlen=500)).append(time.monotonic() - start)
+        return result
+
+    def _hedge_delay(self, schema_name: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None while too few latencies are known"""
+        with self._lock:
+            latencies = list(self._latencies.get(schema_name, ()))
+        if len(latencies) < self.config.hedge_min_samples:
+            return None
+        return float(np.quantile(latencies, self.config.hedge_quantile))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "calls": self.calls,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "hedged_requests": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "failed_calls": self.failed_calls,
+                "refused_calls": self.refused_calls
+            }
+        if self.breaker is not None:
+            stats["circuit_state"] = self.breaker.state
+            stats["circuit_opens"] = self.breaker.opens
+        return stats
+
+    def health_check(self) -> bool:
+        return self.backend.health_check()
+
+    def warm_up(self):
+        self.backend.warm_up()
+
+    def close(self):
+        self.backend.close()
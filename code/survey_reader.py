@@ -0,0 +1,121 @@
+"""
+Survey Reader for Refugee Assessment System
+
+This module streams the household survey CSV in chunks, parsing only the
+columns that ProfileBuilder.feature_mappings can use (plus any identity
+columns) with explicit dtypes. Row-range limits are applied by the parser,
+so a small sample never parses the rest of the file.
+"""
+
+import math
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from profile_builder import ProfileBuilder
+
+logger = logging.getLogger(__name__)
+
+# Standard features parsed as numbers; every other mapped column is read as text
+NUMERIC_FEATURES = {'age', 'household_size', 'depend_ratio'}
+# Numeric features kept as Python ints so "28" never becomes "28.0" in one chunk but not another
+INTEGER_FEATURES = {'age', 'household_size'}
+
+def _parse_number(text: str) -> Any:
+    """Parse a numeric survey cell, keeping non-numeric answers (e.g. "Don't know") as text"""
+    text = text.strip()
+    if not text:
+        return math.nan
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+def _as_integers(series: pd.Series) -> pd.Series:
+    """Object column with integral floats restored to ints (pandas turns int + NaN into float)"""
+    return pd.Series(
+        [int(v) if isinstance(v, float) and v.is_integer() else v for v in series],
+        index=series.index, dtype=object
+    )
+
+def survey_schema(csv_path: str, builder: ProfileBuilder,
+                  extra_columns: Optional[List[str]] = None) -> Tuple[List[str], Dict[str, Any], Dict[str, Any]]:
+    """
+    Work out which columns to parse and how, from the CSV header only
+
+    Args:
+        csv_path: Path to the survey CSV file
+        builder: ProfileBuilder whose feature mappings define the needed columns
+        extra_columns: Additional columns to keep (e.g. respondent id columns)
+
+    Returns:
+        Tuple of (usecols, dtype, converters) for pandas.read_csv
+    """
+    header = set(pd.read_csv(csv_path, nrows=0).columns)
+
+    numeric_columns = set()
+    for feature_name in NUMERIC_FEATURES:
+        numeric_columns.update(builder.feature_mappings.get(feature_name, []))
+
+    usecols = []
+    for columns in builder.feature_mappings.values():
+        usecols.extend(col for col in columns if col in header and col not in usecols)
+    for col in extra_columns or []:
+        if col in header and col not in usecols:
+            usecols.append(col)
+
+    converters = {col: _parse_number for col in usecols if col in numeric_columns}
+    dtype = {col: str for col in usecols if col not in converters}
+    return usecols, dtype, converters
+
+def iter_survey_chunks(csv_path: str, builder: ProfileBuilder, chunksize: int = 1000,
+                       start_row: int = 0, nrows: Optional[int] = None,
+                       extra_columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream the survey CSV as DataFrame chunks of the needed columns only
+
+    Chunk indexes are the data-row positions in the file (0 = first row after the
+    header), so row keys stay stable whatever range is read.
+
+    Args:
+        csv_path: Path to the survey CSV file
+        builder: ProfileBuilder whose feature mappings define the needed columns
+        chunksize: Rows per chunk
+        start_row: First data row to read
+        nrows: Maximum number of rows to read (None for the rest of the file)
+        extra_columns: Additional columns to keep (e.g. respondent id columns)
+
+    Yields:
+        DataFrame chunks
+    """
+    usecols, dtype, converters = survey_schema(csv_path, builder, extra_columns)
+    integer_columns = [
+        col for feature_name in INTEGER_FEATURES
+        for col in builder.feature_mappings.get(feature_name, []) if col in converters
+    ]
+    logger.info(f"Reading {len(usecols)} columns from {csv_path} "
+                f"(rows {start_row}-{start_row + nrows - 1 if nrows else 'end'}, chunks of {chunksize})")
+
+    reader = pd.read_csv(
+        csv_path,
+        usecols=usecols,
+        dtype=dtype,
+        converters=converters,
+        skiprows=range(1, start_row + 1) if start_row else None,
+        nrows=nrows,
+        chunksize=chunksize
+    )
+
+    offset = start_row
+    with reader:
+        for chunk in reader:
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            for col in integer_columns:
+                chunk[col] = _as_integers(chunk[col])
+            offset += len(chunk)
+            yield chunk
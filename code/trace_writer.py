@@ -0,0 +1,217 @@
+"""
+Trace Writer for Refugee Assessment System
+
+This module streams detailed assessment traces to a JSONL file, one
+assessment per line, as assessments finish, instead of serializing every
+trace at the end of a run. The file can be gzip- or zstd-compressed.
+
+Every trace carries its full selector prompt (`prompt_used`), which is most
+of a trace's size and repeats across retries and duplicate rows. With
+`prompt_refs` enabled, each distinct prompt is written once to a sidecar
+prompt table, and traces carry a `prompt_ref` hash in its place. Prompts that
+start with one of the given shared prefixes (the perspective guidelines, which
+are nearly all of a prompt) are stored as a reference to the prefix plus the
+remaining text. read_traces() puts the prompts back.
+"""
+
+import io
+import gzip
+import json
+import hashlib
+import threading
+import logging
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+def trace_paths(output_dir: str, compression: str = "none", stem: str = "assessment_traces",
+                keep_existing: bool = False):
+    """
+    Trace file and prompt table paths for an output directory
+    
+    With keep_existing (a resumed run) the first unused numbered part, e.g.
+    assessment_traces.1.jsonl, is returned so earlier traces are not overwritten.
+    """
+    suffix = SUFFIXES[compression]
+    output_path = Path(output_dir)
+    name = stem
+    part = 0
+    while keep_existing and (output_path / f"{name}.jsonl{suffix}").exists():
+        part += 1
+        name = f"{stem}.{part}"
+    return output_path / f"{name}.jsonl{suffix}", output_path / f"{name}.prompts.jsonl{suffix}"
+
+def _default_prompts_path(path: Path) -> Path:
+    name = path.name.replace(".jsonl", ".prompts.jsonl", 1)
+    return path.with_name(name if name != path.name else f"{name}.prompts")
+
+def _compression_for(path: Path) -> str:
+    for compression, suffix in SUFFIXES.items():
+        if suffix and path.name.endswith(suffix):
+            return compression
+    return "none"
+
+def _open_text(path: Path, mode: str, compression: str, level: Optional[int] = None):
+    """Open a text stream with the given compression ("w" or "r")"""
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=level or 6)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise RuntimeError("zstd trace compression requires the 'zstandard' package") from e
+        if mode == "w":
+            stream = zstandard.ZstdCompressor(level=level or 3).stream_writer(open(path, "wb"), closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def prompt_ref(prompt: str) -> str:
+    """Stable reference of a prompt in the prompt table"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:20]
+
+class TraceWriter:
+    """
+    Thread-safe streaming writer of assessment traces
+
+    Args:
+        path: JSONL trace file (compression is taken from the argument, not the suffix)
+        compression: "none", "gzip" or "zstd"
+        prompt_refs: Store each distinct prompt once in prompts_path and reference it from traces
+        prompts_path: Prompt table file (defaults to "<stem>.prompts.jsonl" next to path)
+        prefixes: Shared prompt prefixes stored once in the prompt table (e.g. build_system_prefix)
+        level: Compression level (None for the codec default)
+    """
+
+    def __init__(self, path: str, compression: str = "none", prompt_refs: bool = False,
+                 prompts_path: Optional[str] = None, prefixes: Optional[Iterable[str]] = None,
+                 level: Optional[int] = None):
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown trace compression: {compression}")
+
+        self.path = Path(path)
+        self.compression = compression
+        self.prompt_refs = prompt_refs
+        self.prompts_path = Path(prompts_path) if prompts_path else _default_prompts_path(self.path)
+        self.prefixes: List[str] = sorted(set(prefixes or []), key=len, reverse=True)
+
+        self.assessments_written = 0
+        self.prompts_written = 0
+        self.prompt_chars_saved = 0
+        self._seen_prompts: Set[str] = set()
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = _open_text(self.path, "w", compression, level)
+        self._prompts = _open_text(self.prompts_path, "w", compression, level) if prompt_refs else None
+
+    def write(self, assessment: Any):
+        """Append one assessment (a RefugeeAssessment or its asdict form)"""
+        # Compact traces carry their prompt prefix, which may be one not known up front (pruned guidelines)
+        prefixes = {trace.prompt.prefix for trace in getattr(assessment, "assessment_traces", [])
+                    if getattr(getattr(trace, "prompt", None), "prefix", "")}
+        if hasattr(assessment, "to_dict"):
+            data = assessment.to_dict()
+        else:
+            data = asdict(assessment) if is_dataclass(assessment) else dict(assessment)
+
+        with self._lock:
+            if self.prompt_refs and not prefixes.issubset(self.prefixes):
+                self.prefixes = sorted(prefixes.union(self.prefixes), key=len, reverse=True)
+            if self.prompt_refs:
+                traces = []
+                for trace in data.get("assessment_traces", []):
+                    prompt = trace.pop("prompt_used", None)
+                    if prompt is not None:
+                        trace["prompt_ref"] = self._store_prompt(prompt)
+                    traces.append(trace)
+                data["assessment_traces"] = traces
+
+            self._file.write(json.dumps(data, default=str) + "\n")
+            self.assessments_written += 1
+
+    def _store_prompt(self, prompt: str) -> str:
+        """Write a prompt to the prompt table unless already there; returns its reference"""
+        ref = prompt_ref(prompt)
+        if ref in self._seen_prompts:
+            self.prompt_chars_saved += len(prompt)
+            return ref
+        self._seen_prompts.add(ref)
+
+        prefix = next((prefix for prefix in self.prefixes if prompt != prefix and prompt.startswith(prefix)), None)
+        if prefix is None:
+            record = {"prompt_ref": ref, "prompt": prompt}
+        else:
+            record = {"prompt_ref": ref, "prefix_ref": self._store_prompt(prefix), "suffix": prompt[len(prefix):]}
+            self.prompt_chars_saved += len(prefix)
+        self._prompts.write(json.dumps(record) + "\n")
+        self.prompts_written += 1
+        return ref
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": str(self.path),
+                "compression": self.compression,
+                "assessments": self.assessments_written,
+                "prompt_table": str(self.prompts_path) if self.prompt_refs else None,
+                "prompt_table_entries": self.prompts_written,
+                "prompt_chars_deduplicated": self.prompt_chars_saved
+            }
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+            if self._prompts is not None and not self._prompts.closed:
+                self._prompts.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_traces(path: str, prompts_path: Optional[str] = None,
+                resolve_prompts: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over the assessments of a trace file as dictionaries
+
+    Args:
+        path: Trace file written by TraceWriter (compression taken from the suffix)
+        prompts_path: Prompt table (defaults to the TraceWriter naming next to path)
+        resolve_prompts: Replace prompt_ref with the prompt_used text when a prompt table exists
+
+    Yields:
+        Assessment dictionaries in the asdict shape of RefugeeAssessment
+    """
+    path = Path(path)
+    prompts: Dict[str, str] = {}
+    if resolve_prompts:
+        table = Path(prompts_path) if prompts_path else _default_prompts_path(path)
+        if table.exists():
+            with _open_text(table, "r", _compression_for(table)) as f:
+                for line in f:
+                    record = json.loads(line)
+                    if "prefix_ref" in record:
+                        prompts[record["prompt_ref"]] = prompts[record["prefix_ref"]] + record["suffix"]
+                    else:
+                        prompts[record["prompt_ref"]] = record["prompt"]
+
+    with _open_text(path, "r", _compression_for(path)) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if prompts:
+                for trace in data.get("assessment_traces", []):
+                    ref = trace.pop("prompt_ref", None)
+                    if ref is not None:
+                        trace["prompt_used"] = prompts[ref]
+            yield data